@@ -26,11 +26,119 @@ class Config:
     AZURE_SPEECH_KEY = os.environ.get("AZURE_SPEECH_KEY")
     AZURE_REGION = os.environ.get("AZURE_REGION")
 
+    # Native threads for blocking Azure Speech SDK waits (recognition / synthesis)
+    SDK_THREADPOOL_SIZE = int(os.environ.get("SDK_THREADPOOL_SIZE", 8))
+
+    # Voice activity detection before audio is sent to Azure (clients may override per session)
+    VAD_ENABLED = os.environ.get("VAD_ENABLED", "true").lower() in ("1", "true", "yes")
+    VAD_FRAME_MS = int(os.environ.get("VAD_FRAME_MS", 20))
+    VAD_ENERGY_THRESHOLD_DB = float(os.environ.get("VAD_ENERGY_THRESHOLD_DB", -45))
+    VAD_ZCR_THRESHOLD = float(os.environ.get("VAD_ZCR_THRESHOLD", 0.25))
+    VAD_MAX_SILENCE_MS = int(os.environ.get("VAD_MAX_SILENCE_MS", 600))
+
+    # LRU cache of recognition results keyed by audio fingerprint + language
+    RECOGNITION_CACHE_MAX_ENTRIES = int(os.environ.get("RECOGNITION_CACHE_MAX_ENTRIES", 2000))
+
+    # Realtime audio is coalesced into fixed frames before it is pushed to the recognizer
+    REALTIME_FRAME_MS = int(os.environ.get("REALTIME_FRAME_MS", 100))
+    REALTIME_JITTER_MAX_MS = int(os.environ.get("REALTIME_JITTER_MAX_MS", 2000))
+    REALTIME_JITTER_TARGET_MS = int(os.environ.get("REALTIME_JITTER_TARGET_MS", 200))
+
+    # Backlog limit for a realtime session's ffmpeg transcoder (compressed audio input)
+    REALTIME_TRANSCODER_MAX_BUFFER_BYTES = int(os.environ.get("REALTIME_TRANSCODER_MAX_BUFFER_BYTES", 2 * 1024 * 1024))
+
+    # Pool of pre-connected speech recognizers per language
+    SPEECH_POOL_SIZE_PER_LANGUAGE = int(os.environ.get("SPEECH_POOL_SIZE_PER_LANGUAGE", 2))
+    SPEECH_POOL_MAX_SIZE = int(os.environ.get("SPEECH_POOL_MAX_SIZE", 16))
+    SPEECH_POOL_IDLE_SECONDS = float(os.environ.get("SPEECH_POOL_IDLE_SECONDS", 60))
+    SPEECH_POOL_PREWARM_LANGUAGES = os.environ.get("SPEECH_POOL_PREWARM_LANGUAGES", "")
+
+    # Long uploads are split at pauses and up to SPEECH_SEGMENT_CONCURRENCY segments recognized at once
+    SPEECH_SEGMENT_CONCURRENCY = int(os.environ.get("SPEECH_SEGMENT_CONCURRENCY", 4))
+    SPEECH_SEGMENT_MAX_SECONDS = float(os.environ.get("SPEECH_SEGMENT_MAX_SECONDS", 30))
+    SPEECH_SEGMENT_MIN_SILENCE_MS = int(os.environ.get("SPEECH_SEGMENT_MIN_SILENCE_MS", 300))
+
+    # Concurrent upload decodes (0 = one per CPU core) and how many may wait before uploads are rejected
+    TRANSCODE_MAX_WORKERS = int(os.environ.get("TRANSCODE_MAX_WORKERS", 0))
+    TRANSCODE_MAX_QUEUE = int(os.environ.get("TRANSCODE_MAX_QUEUE", 16))
+
+    # Background transcription jobs (/speech/transcribe-and-translate with async=true)
+    TRANSCRIPTION_JOB_CONCURRENCY = int(os.environ.get("TRANSCRIPTION_JOB_CONCURRENCY", 2))
+    TRANSCRIPTION_JOB_MAX_QUEUE = int(os.environ.get("TRANSCRIPTION_JOB_MAX_QUEUE", 20))
+    TRANSCRIPTION_JOB_RETAIN_SECONDS = float(os.environ.get("TRANSCRIPTION_JOB_RETAIN_SECONDS", 3600))
+    # Queued uploads are kept in memory up to this size, then spooled to disk
+    TRANSCRIPTION_JOB_SPOOL_MAX_MEMORY = int(os.environ.get("TRANSCRIPTION_JOB_SPOOL_MAX_MEMORY", 16 * 1024 * 1024))
+
     # DeepL keys (Load from environment variables)
     DEEPL_API_KEY = os.environ.get("DEEPL_API_KEY")
     # Provide a default URL if the environment variable isn't set
     DEEPL_API_URL = os.environ.get("DEEPL_API_URL", "https://api-free.deepl.com/v2/translate")
 
+    # Azure AI Translator (optional second translation provider)
+    AZURE_TRANSLATOR_KEY = os.environ.get("AZURE_TRANSLATOR_KEY")
+    AZURE_TRANSLATOR_REGION = os.environ.get("AZURE_TRANSLATOR_REGION")
+    AZURE_TRANSLATOR_ENDPOINT = os.environ.get("AZURE_TRANSLATOR_ENDPOINT", "https://api.cognitive.microsofttranslator.com")
+
+    # Translation providers in preference order ('deepl', 'azure', 'fake'); unconfigured ones are skipped
+    TRANSLATION_PROVIDERS = os.environ.get("TRANSLATION_PROVIDERS", "deepl,azure")
+    # Race a second provider when the primary is slower than its p95 latency
+    TRANSLATION_HEDGING = os.environ.get("TRANSLATION_HEDGING", "true").lower() in ("1", "true", "yes")
+    TRANSLATION_HEDGE_DEFAULT_DELAY_MS = float(os.environ.get("TRANSLATION_HEDGE_DEFAULT_DELAY_MS", 800))
+    TRANSLATION_HEDGE_MIN_DELAY_MS = float(os.environ.get("TRANSLATION_HEDGE_MIN_DELAY_MS", 50))
+    # Circuit breaker and AIMD concurrency limit for outbound provider calls (per provider)
+    TRANSLATION_BREAKER_FAILURE_THRESHOLD = int(os.environ.get("TRANSLATION_BREAKER_FAILURE_THRESHOLD", 5))
+    TRANSLATION_BREAKER_RESET_SECONDS = float(os.environ.get("TRANSLATION_BREAKER_RESET_SECONDS", 30))
+    TRANSLATION_LIMIT_INITIAL = int(os.environ.get("TRANSLATION_LIMIT_INITIAL", 10))
+    TRANSLATION_LIMIT_MIN = int(os.environ.get("TRANSLATION_LIMIT_MIN", 1))
+    TRANSLATION_LIMIT_MAX = int(os.environ.get("TRANSLATION_LIMIT_MAX", 50))
+    TRANSLATION_LIMIT_MAX_WAIT_MS = float(os.environ.get("TRANSLATION_LIMIT_MAX_WAIT_MS", 2000))
+    TRANSLATION_LIMIT_LATENCY_THRESHOLD_MS = float(os.environ.get("TRANSLATION_LIMIT_LATENCY_THRESHOLD_MS", 3000))
+    # Fake provider settings (offline benchmarking)
+    FAKE_TRANSLATION_LATENCY_MS = float(os.environ.get("FAKE_TRANSLATION_LATENCY_MS", 100))
+    FAKE_TRANSLATION_JITTER_MS = float(os.environ.get("FAKE_TRANSLATION_JITTER_MS", 50))
+    FAKE_TRANSLATION_ERROR_RATE = float(os.environ.get("FAKE_TRANSLATION_ERROR_RATE", 0.0))
+
+    # Offline phrasebook (JSON glossary compiled into Aho-Corasick automata per language pair)
+    PHRASEBOOK_PATH = os.environ.get(
+        "PHRASEBOOK_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "phrasebook.json")
+    )
+
+    # Translation cache (in-process LRU with TTL expiry)
+    TRANSLATION_CACHE_MAX_ENTRIES = int(os.environ.get("TRANSLATION_CACHE_MAX_ENTRIES", 5000))
+    TRANSLATION_CACHE_TTL_SECONDS = float(os.environ.get("TRANSLATION_CACHE_TTL_SECONDS", 3600))
+    TRANSLATION_CACHE_MAX_BYTES = int(os.environ.get("TRANSLATION_CACHE_MAX_BYTES", 8 * 1024 * 1024))
+
+    # Persistent translation memory (SQLite file, empty path disables it)
+    TRANSLATION_MEMORY_PATH = os.environ.get("TRANSLATION_MEMORY_PATH", "translation_memory.db")
+    TRANSLATION_MEMORY_MAX_ENTRIES = int(os.environ.get("TRANSLATION_MEMORY_MAX_ENTRIES", 200000))
+
+    # Micro-batching of concurrent DeepL requests (window 0 disables batching)
+    TRANSLATION_BATCH_WINDOW_MS = float(os.environ.get("TRANSLATION_BATCH_WINDOW_MS", 5))
+    TRANSLATION_BATCH_MAX_SIZE = int(os.environ.get("TRANSLATION_BATCH_MAX_SIZE", 50))
+    TRANSLATION_BATCH_RESULT_TIMEOUT_SECONDS = float(os.environ.get("TRANSLATION_BATCH_RESULT_TIMEOUT_SECONDS", 30))
+
+    # Maximum concurrent provider calls for multi-target translation
+    TRANSLATION_MAX_CONCURRENCY = int(os.environ.get("TRANSLATION_MAX_CONCURRENCY", 8))
+
+    # Per-room and per-socket translation budgets (token buckets; 0 disables a limit)
+    TRANSLATION_ROOM_CHARS_PER_MINUTE = int(os.environ.get("TRANSLATION_ROOM_CHARS_PER_MINUTE", 20000))
+    TRANSLATION_ROOM_REQUESTS_PER_MINUTE = int(os.environ.get("TRANSLATION_ROOM_REQUESTS_PER_MINUTE", 300))
+    TRANSLATION_SID_CHARS_PER_MINUTE = int(os.environ.get("TRANSLATION_SID_CHARS_PER_MINUTE", 10000))
+    TRANSLATION_SID_REQUESTS_PER_MINUTE = int(os.environ.get("TRANSLATION_SID_REQUESTS_PER_MINUTE", 120))
+
+    # Texts longer than this are split into sentences and translated in parallel
+    TRANSLATION_SEGMENT_MIN_CHARS = int(os.environ.get("TRANSLATION_SEGMENT_MIN_CHARS", 500))
+
+    # Realtime partial-hypothesis translation (opt-in per session via 'translate_partials')
+    PARTIAL_TRANSLATION_DEBOUNCE_MS = float(os.environ.get("PARTIAL_TRANSLATION_DEBOUNCE_MS", 300))
+    PARTIAL_TRANSLATION_MIN_WORDS = int(os.environ.get("PARTIAL_TRANSLATION_MIN_WORDS", 2))
+    # Partials are charged to their own budgets so they never use up the ones for final results
+    PARTIAL_TRANSLATION_ROOM_CHARS_PER_MINUTE = int(os.environ.get("PARTIAL_TRANSLATION_ROOM_CHARS_PER_MINUTE", 40000))
+    PARTIAL_TRANSLATION_ROOM_REQUESTS_PER_MINUTE = int(os.environ.get("PARTIAL_TRANSLATION_ROOM_REQUESTS_PER_MINUTE", 1200))
+    PARTIAL_TRANSLATION_SID_CHARS_PER_MINUTE = int(os.environ.get("PARTIAL_TRANSLATION_SID_CHARS_PER_MINUTE", 20000))
+    PARTIAL_TRANSLATION_SID_REQUESTS_PER_MINUTE = int(os.environ.get("PARTIAL_TRANSLATION_SID_REQUESTS_PER_MINUTE", 600))
+
     # Add any other configuration variables your app needs here
     # Example: DATABASE_URL = os.environ.get('DATABASE_URL')
 
@@ -41,6 +41,33 @@ def health_check():
         logging.error(f"Health check failed: {e}")
         return jsonify({"status": "error", "details": str(e)}), 500
 
+@main_bp.route('/metrics')
+def metrics():
+    """Exposes service counters (cache hit rates etc.) for monitoring."""
+    try:
+        t_service = current_app.translation_service
+        s_service = current_app.speech_service
+        jobs = getattr(current_app, 'transcription_jobs', None)
+        transcoder = getattr(current_app, 'transcode_executor', None)
+        return jsonify({
+            "translation": t_service.get_stats() if hasattr(t_service, 'get_stats') else {},
+            "speech": s_service.get_stats() if hasattr(s_service, 'get_stats') else {},
+            "transcription_jobs": jobs.stats() if jobs else {},
+            "transcoding": transcoder.stats() if transcoder else {}
+        })
+    except Exception as e:
+        logging.error(f"Metrics collection failed: {e}")
+        return jsonify({"status": "error", "details": str(e)}), 500
+
+@main_bp.route('/metrics/rooms/<room_id>')
+def room_usage(room_id):
+    """Reports translation budget usage for a single room."""
+    limiter = getattr(current_app.translation_service, 'rate_limiter', None)
+    usage = limiter.usage(room_id) if limiter else None
+    if usage is None:
+        return jsonify({"error": f"No translation usage recorded for room {room_id}"}), 404
+    return jsonify({"room_id": room_id, "usage": usage})
+
 # Add any other general-purpose routes for your application here.
 # For example, a route to show API documentation or info.
 @main_bp.route('/info')
@@ -69,32 +96,20 @@ def translate_text():
         
         logging.info(f"Translation request: '{text}' from {source_language} to {target_language}")
         
-        # Simple mock translations
-        translations = {
-            'lv': {
-                'test': 'tests',
-                'testing': 'testēšana',
-                'hello': 'sveiki',
-                'world': 'pasaule',
-                'thank you': 'paldies',
-                'goodbye': 'uz redzēšanos'
-            }
-        }
-        
-        # Get target language code without region
-        target_code = target_language.split('-')[0].lower()
-        
-        # Check if we have translations for this language
-        if target_code in translations:
-            # Check if we have a translation for this text
-            lower_text = text.lower()
-            for eng, trans in translations[target_code].items():
-                if eng in lower_text:
-                    return jsonify({
-                        'translated_text': trans,
-                        'source_language': source_language,
-                        'target_language': target_language
-                    })
+        # Offline phrasebook translation (single pass, longest match wins)
+        phrasebook = getattr(current_app.translation_service, 'phrasebook', None)
+        if phrasebook:
+            translated, replacements = phrasebook.translate(
+                text,
+                None if source_language == 'auto' else source_language,
+                target_language
+            )
+            if replacements:
+                return jsonify({
+                    'translated_text': translated,
+                    'source_language': source_language,
+                    'target_language': target_language
+                })
         
         # Default fallback translation
         return jsonify({
@@ -1,14 +1,18 @@
 from flask import Blueprint, request, jsonify, current_app
 import logging
 # import azure.cognitiveservices.speech as speechsdk # Not needed if using SpeechService
-from pydub import AudioSegment
 from werkzeug.utils import secure_filename
-import os
 # import requests # Not needed if using TranslationService
 import tempfile # For temporary file handling
 import json # To parse target languages
+import shutil
 from .. import socketio 
 from ..services.tts_service import TTSService
+from ..services.recognition_cache import RecognitionCache
+from .streaming import segmented_translation_response
+from ..services.transcription_jobs import JobQueueFull
+from ..services.transcode_executor import TranscoderOverloaded
+from ..utils.audio import TranscodeError
 
 # Remove the direct import of translation module if not used elsewhere
 # from app.routes.translation import simple_translation
@@ -19,10 +23,8 @@ logging.basicConfig(level=logging.DEBUG)
 # Rename bp to speech_bp to match the import in __init__.py
 speech_bp = Blueprint('speech', __name__)
 
-# Define temporary file paths (Consider making these configurable)
-UPLOAD_TEMP_DIR = "temp_audio" # Use a directory
-if not os.path.exists(UPLOAD_TEMP_DIR):
-    os.makedirs(UPLOAD_TEMP_DIR)
+# Uploads are read (and, if compressed, piped to ffmpeg) in chunks of this size
+UPLOAD_READ_SIZE = 64 * 1024
 # UPLOAD_TEMP_FILENAME = "temp_upload_audio" # Filenames will be dynamic
 # CONVERTED_WAV_FILENAME = "temp_converted.wav" # Filenames will be dynamic
 
@@ -85,51 +87,45 @@ def transcribe_and_translate_audio():
         return jsonify({"error": f"Invalid 'target_languages' format: {e}"}), 400
 
     filename = secure_filename(file.filename or 'audio.upload')
-    upload_path = os.path.join(UPLOAD_TEMP_DIR, f"upload_{filename}")
-    wav_path = os.path.join(UPLOAD_TEMP_DIR, f"converted_{os.path.splitext(filename)[0]}.wav")
+
+    # Job mode: transcribe the whole file in the background and report progress to the room
+    if request.form.get('async', '').lower() in ('1', 'true', 'yes'):
+        return _submit_transcription_job(file, filename, source_language, target_languages, room_id)
 
     try:
-        # --- Save and Convert Audio ---
-        logger.info(f"Saving uploaded file to: {upload_path}")
-        file.save(upload_path)
-        logger.info(f"Attempting to convert {upload_path} to WAV format at {wav_path}")
+        # --- Convert and Recognize Audio (streamed) ---
+        # 16kHz mono WAV is passed through, other PCM WAV is converted in process and
+        # only compressed uploads are piped through ffmpeg. PCM is fed to the recognizer
+        # as it arrives; nothing is written to disk.
+        # Retried uploads are recognized from cache (decoding is lazy, so ffmpeg never starts)
+        fingerprint = RecognitionCache.fingerprint_stream(file.stream, UPLOAD_READ_SIZE)
         try:
-            audio = AudioSegment.from_file(upload_path)
-            audio.export(wav_path, format="wav")
-            logger.info(f"Audio successfully converted to WAV: {wav_path}")
-        except Exception as e:
-            logger.error(f"Error converting audio file: {e}", exc_info=True)
-            if os.path.exists(upload_path): os.remove(upload_path)
+            # Decodes share a CPU-sized pool of slots; a full queue is rejected with 503
+            decoder, pcm_chunks = current_app.transcode_executor.decode(file.stream, UPLOAD_READ_SIZE)
+            logger.info(f"Starting streamed decoding ({decoder}) and speech recognition for {filename}, language: {source_language}")
+            recognized_text = speech_service.recognize_speech_from_stream(
+                pcm_chunks, source_language, fingerprint=fingerprint
+            )
+        except TranscoderOverloaded as e:
+            logger.warning(f"Rejecting upload {filename} for room {room_id}: {e}")
+            return jsonify({"error": str(e), "queue_depth": e.queue_depth}), 503
+        except TranscodeError as e:
+            logger.error(f"Error converting audio file: {e}")
             return jsonify({"error": f"Audio conversion failed: {e}"}), 500
-
-        # --- Speech Recognition ---
-        logger.info(f"Starting speech recognition for language: {source_language} using file: {wav_path}")
-        
-        recognized_text = speech_service.recognize_speech_from_file(wav_path, source_language)
         
         if not recognized_text:
-            logger.warning(f"No text recognized from audio file: {wav_path}")
+            logger.warning(f"No text recognized from audio file: {filename}")
             return jsonify({"error": "No speech could be recognized"}), 400
 
         # --- Translation ---
-        translations = {}
-        
-        for target_language in target_languages:
-            if target_language == source_language:
-                translations[target_language] = recognized_text
-                continue
-                
-            try:
-                translated_text = translation_service.translate_text(
-                    recognized_text,
-                    source_language,
-                    target_language
-                )
-                translations[target_language] = translated_text
-                logger.info(f"Translated to {target_language}: {translated_text[:50]}...")
-            except Exception as e:
-                logger.error(f"Error translating to {target_language}: {str(e)}")
-                translations[target_language] = f"[Translation error: {str(e)}]"
+        # All target languages are translated concurrently (same-language targets pass through)
+        translations = translation_service.translate_many(
+            recognized_text,
+            source_language,
+            target_languages
+        )
+        for target_language, translated_text in translations.items():
+            logger.info(f"Translated to {target_language}: {translated_text[:50]}...")
         
         # --- Prepare final data ---
         # Removed TTS files from the response
@@ -152,15 +148,126 @@ def transcribe_and_translate_audio():
         logger.exception(f"An error occurred during transcription/translation for room {room_id}: {e}")
         socketio.emit('translation_error', {'error': str(e)}, room=room_id)
         return jsonify({"error": f"An internal error occurred: {str(e)}"}), 500
+
+def _submit_transcription_job(file, filename, source_language, target_languages, room_id):
+    """Queues an upload for background transcription and returns its job id (202)."""
+    jobs = current_app.transcription_jobs
+    # The request stream is gone once we respond, so keep the upload (in memory up to a limit)
+    upload = tempfile.SpooledTemporaryFile(max_size=current_app.config.get('TRANSCRIPTION_JOB_SPOOL_MAX_MEMORY', 16 * 1024 * 1024))
+    shutil.copyfileobj(file.stream, upload, UPLOAD_READ_SIZE)
+    upload_size = upload.tell()
+    upload.seek(0)
+
+    try:
+        job = jobs.submit(
+            _run_transcription_job,
+            current_app.speech_service, current_app.translation_service, current_app.transcode_executor,
+            upload, upload_size, source_language, target_languages, room_id,
+            current_app.config.get('TRANSCRIPTION_JOB_SPOOL_MAX_MEMORY', 16 * 1024 * 1024),
+            meta={'room_id': room_id, 'filename': filename, 'source_language': source_language}
+        )
+    except JobQueueFull as e:
+        upload.close()
+        logger.warning(f"Rejecting transcription job for room {room_id}: {e}")
+        return jsonify({"error": str(e), "queue_depth": e.queue_depth}), 503
+
+    logger.info(f"Accepted transcription job {job.id} for {filename} ({upload_size} bytes), room: {room_id}")
+    return jsonify({
+        'job_id': job.id,
+        'status': job.status,
+        'queue_depth': jobs.queue_depth,
+        'status_url': f"/speech/jobs/{job.id}"
+    }), 202
+
+def _run_transcription_job(job, speech_service, translation_service, transcode_executor, upload, upload_size,
+                           source_language, target_languages, room_id, spool_max_memory):
+    """
+    Transcribes a whole upload with continuous recognition. Each utterance is translated
+    and emitted to the room as 'translation_result' as soon as it is recognized, followed
+    by a 'transcription_progress' event.
+
+    Translations are charged to the room's budget. Languages it refuses are listed in
+    the utterance's 'rate_limited' field, counted per language in the job status and
+    final result, and reported to the room as 'translation_error'.
+    """
+    pcm = tempfile.SpooledTemporaryFile(max_size=spool_max_memory)
+    rate_limited = job.meta.setdefault('rate_limited', {})
+    try:
+        socketio.emit('transcription_progress', job.snapshot(include_result=False), room=room_id)
+        # Decode up front so the transcoding slot is not held while recognition paces the reads.
+        # Jobs are admission-controlled by the job queue already, so they wait for a slot instead of failing
+        decoder, pcm_size = transcode_executor.decode_to_file(upload, pcm, UPLOAD_READ_SIZE)
+        logger.info(f"Transcription job {job.id}: decoded {upload_size} bytes to {pcm_size} bytes of PCM ({decoder})")
+        pcm_chunks = iter(lambda: pcm.read(UPLOAD_READ_SIZE), b'')
+        # Segments split at pauses are recognized in parallel; utterances arrive in time order
+        for utterance in speech_service.iter_recognize_segmented(pcm_chunks, source_language):
+            refused = []
+
+            def _on_rate_limited(target_language, error):
+                refused.append(target_language)
+                rate_limited[target_language] = rate_limited.get(target_language, 0) + 1
+                socketio.emit('translation_error', {
+                    'original': utterance['text'],
+                    'message': f'Translation rate limit reached: {error}',
+                    'code': 'rate_limited',
+                    'room_id': room_id,
+                    'job_id': job.id,
+                    'source_language': source_language,
+                    'target_language': target_language,
+                }, room=room_id)
+
+            translations = translation_service.translate_many(
+                utterance['text'], source_language, target_languages, room_id=room_id, on_error=_on_rate_limited
+            )
+            result = {
+                'original': utterance['text'],
+                'source_language': source_language,
+                'translations': translations,
+                'rate_limited': refused,
+                'job_id': job.id,
+                'index': len(job.utterances),
+                'offset_ms': utterance['offset_ms'],
+                'duration_ms': utterance['duration_ms'],
+                'segment': utterance['segment'],
+            }
+            job.utterances.append(result)
+            socketio.emit('translation_result', result, room=room_id)
+
+            # Share of the PCM handed to recognition so far (segmenting reads slightly ahead)
+            job.progress = min(0.99, pcm.tell() / pcm_size) if pcm_size else 0.0
+            progress = job.snapshot(include_result=False)
+            progress['audio_seconds'] = round((utterance['offset_ms'] + utterance['duration_ms']) / 1000.0, 2)
+            socketio.emit('transcription_progress', progress, room=room_id)
+    except Exception as e:
+        socketio.emit('transcription_job_failed', {'job_id': job.id, 'error': str(e)}, room=room_id)
+        raise
     finally:
-        # Clean up temporary files
-        for path in [upload_path, wav_path]:
-            if os.path.exists(path):
-                try:
-                    os.remove(path)
-                    logger.debug(f"Removed temporary file: {path}")
-                except Exception as e:
-                    logger.warning(f"Failed to remove temporary file {path}: {e}")
+        upload.close()
+        pcm.close()
+
+    result = {
+        'original': ' '.join(u['original'] for u in job.utterances),
+        'source_language': source_language,
+        'translations': {
+            language: ' '.join(u['translations'][language] for u in job.utterances if language in u['translations'])
+            for language in target_languages
+        },
+        'utterances': job.utterances,
+        'rate_limited': dict(rate_limited),
+    }
+    socketio.emit('transcription_job_completed', {'job_id': job.id, 'utterances': len(job.utterances)}, room=room_id)
+    logger.info(f"Transcription job {job.id} completed with {len(job.utterances)} utterances")
+    return result
+
+@speech_bp.route('/jobs/<job_id>', methods=['GET'])
+def transcription_job_status(job_id):
+    """Returns the status, progress and (once completed) result of a transcription job."""
+    job = current_app.transcription_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown or expired job {job_id}"}), 404
+    data = job.snapshot()
+    data['queue_depth'] = current_app.transcription_jobs.queue_depth
+    return jsonify(data)
 
 # Refactored /translate route using TranslationService
 @speech_bp.route('/translate', methods=['POST'])
@@ -183,6 +290,15 @@ def translate_text_route():
 
     logger.info(f"Received translation request: '{text[:50]}...' from '{source_language}' to '{target_language}'")
 
+    # Optional streaming of sentence segments ('ndjson' response or 'socket' events to room_id)
+    stream = data.get('stream')
+    if stream:
+        return segmented_translation_response(
+            translation_service, text, target_language, source_language,
+            'socket' if stream == 'socket' else 'ndjson',
+            room_id=data.get('room_id')
+        )
+
     try:
         # Use the translate method from the service
         # Note: The existing TranslationService.translate method needs review/update
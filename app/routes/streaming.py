@@ -0,0 +1,69 @@
+import json
+import logging
+
+from flask import Response, jsonify, stream_with_context
+
+from .. import socketio
+
+logger = logging.getLogger(__name__)
+
+
+def segmented_translation_response(translation_service, text, target_language, source_language, stream, room_id=None):
+    """
+    Translates long text sentence by sentence and streams segment results to the client.
+
+    Args:
+        translation_service: The app's TranslationService
+        text (str): Text to translate
+        target_language (str): Target language code
+        source_language (str): Source language as sent by the client (echoed back)
+        stream (str): 'ndjson' to stream newline-delimited JSON in the HTTP response,
+                      'socket' to emit 'translation_segment' events to room_id
+        room_id (str, optional): Room to emit segment events to in 'socket' mode
+
+    Returns:
+        A Flask response
+    """
+    segments = translation_service.iter_translate_segments(text, target_language)
+
+    if stream == 'socket':
+        if not room_id:
+            return jsonify({"error": "room_id is required for socket streaming"}), 400
+        results = []
+        for result in segments:
+            results.append(result)
+            socketio.emit('translation_segment', {
+                'index': result['index'],
+                'original': result['source'],
+                'translation': result['translation'],
+                'error': result['error'],
+                'target_language': target_language,
+                'room_id': room_id
+            }, room=room_id)
+        return jsonify({
+            'translated_text': translation_service.join_segments(results),
+            'segments': len(results),
+            'source_language': source_language,
+            'target_language': target_language
+        })
+
+    def generate():
+        results = []
+        for result in segments:
+            results.append(result)
+            yield json.dumps({
+                'index': result['index'],
+                'original': result['source'],
+                'translation': result['translation'],
+                'error': result['error']
+            }, ensure_ascii=False) + "\n"
+        yield json.dumps({
+            'done': True,
+            'translated_text': translation_service.join_segments(results),
+            'segments': len(results),
+            'source_language': source_language,
+            'target_language': target_language
+        }, ensure_ascii=False) + "\n"
+
+    logger.info(f"Streaming segmented translation to {target_language} as NDJSON")
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
@@ -1,6 +1,7 @@
 # import deepl # Not needed if using TranslationService exclusively
 from flask import Blueprint, request, jsonify, current_app
 from app.services.firebase_service import FirebaseService
+from app.routes.streaming import segmented_translation_response
 # from app.services.translation_service import TranslationService # Not needed if using current_app
 import logging
 import os
@@ -51,6 +52,15 @@ def translate_text_route():
 
     logging.info(f"Received translation request via blueprint: '{text[:50]}...' from '{source_language}' to '{target_language}'")
 
+    # Optional streaming of sentence segments ('ndjson' response or 'socket' events to room_id)
+    stream = data.get('stream')
+    if stream:
+        return segmented_translation_response(
+            translation_service, text, target_language, source_language,
+            'socket' if stream == 'socket' else 'ndjson',
+            room_id=data.get('room_id')
+        )
+
     try:
         # Use the translate_text method from the service
         # Ensure this method exists and handles errors appropriately in TranslationService
@@ -1,22 +1,20 @@
 import logging
-import os
-import base64
 # import threading # No longer needed for session lock
 import azure.cognitiveservices.speech as speechsdk # Keep if needed for manual_text? Maybe not.
 from flask import request, current_app
 from flask_socketio import emit, join_room, leave_room # Import room functions
 import io # Needed for handling audio bytes
-import tempfile # For temporary files
 import traceback # For detailed error logging
 import uuid
 from pydub import AudioSegment
 from io import BytesIO
-from app.utils.audio import convert_to_wav
+from app.utils.audio import decode_audio_payload, parse_wav, VoiceActivityDetector, PersistentTranscoder, TranscodeError, JitterBuffer
 import gevent.monkey
 
 from app import socketio
 from app.services.speech_service import SpeechService # Assuming SpeechService can handle bytes
 from app.services.translation_service import TranslationService # Assuming TranslationService is available
+from app.services.partial_translation import PartialTranslator
 
 # Basic setup
 logging.basicConfig(level=logging.INFO)
@@ -30,8 +28,97 @@ logger = logging.getLogger(__name__)
 # Add a dictionary to track active real-time sessions
 active_realtime_sessions = {}
 
+# Voice activity detectors for the chunked audio path, per sid
+chunk_vad_detectors = {}
+
+# Compressed realtime audio formats (client name -> ffmpeg input format)
+REALTIME_AUDIO_FORMATS = {'webm': 'webm', 'ogg': 'ogg', 'opus': 'ogg'}
+
 gevent.monkey.patch_all()
 
+def _run_on_hub(hub, handler, *args):
+    """
+    Schedules handler(*args) in a new greenlet on the given gevent hub.
+    Azure SDK events fire on native SDK threads, which must not touch
+    gevent objects owned by the main hub directly.
+    """
+    hub.loop.run_callback_threadsafe(gevent.spawn, handler, *args)
+
+def _write_session_audio(session, pcm):
+    """Pushes 16kHz mono PCM into a realtime session's recognizer, dropping long silences."""
+    if session.get('vad'):
+        pcm = session['vad'].filter(pcm)
+        if not pcm:
+            return
+    if session.get('jitter_buffer'):
+        # Coalesced into fixed frames and written by the buffer's own greenlet
+        session['jitter_buffer'].write(pcm)
+    else:
+        session['audio_stream'].write(SpeechService._sdk_buffer(pcm))
+
+def _close_audio_pipeline(session):
+    """
+    Flushes a realtime session's audio into the recognizer: first the ffmpeg
+    transcoder (if any), then the jitter buffer. Returns their stats.
+    """
+    stats = {'transcoder': None, 'jitter_buffer': None}
+    for key in ('transcoder', 'jitter_buffer'):
+        component = session.get(key)
+        if component:
+            component.close()
+            stats[key] = component.stats()
+    return stats
+
+def _end_realtime_session(session):
+    """Flushes a realtime session's audio pipeline and stops its recognizer and partial translator."""
+    pipeline_stats = _close_audio_pipeline(session)
+    session['recognizer'].stop_continuous_recognition_async()
+    if session.get('partial_translator'):
+        session['partial_translator'].stop()
+    return pipeline_stats
+
+def _create_vad(options=None):
+    """
+    Builds a voice activity detector from the VAD_* config, overridden by the
+    client's per-session options (e.g. {'energy_threshold_db': -50}), with
+    frame and silence durations clamped (see VoiceActivityDetector.from_options).
+    Returns None if VAD is disabled globally or by the client.
+    """
+    config = current_app.config
+    options = options if isinstance(options, dict) else {}
+    if not config.get('VAD_ENABLED', True) or options.get('enabled') is False:
+        return None
+    defaults = {
+        'frame_ms': config.get('VAD_FRAME_MS', 20),
+        'energy_threshold_db': config.get('VAD_ENERGY_THRESHOLD_DB', -45.0),
+        'zcr_threshold': config.get('VAD_ZCR_THRESHOLD', 0.25),
+        'max_silence_ms': config.get('VAD_MAX_SILENCE_MS', 600),
+    }
+    try:
+        return VoiceActivityDetector.from_options(options, defaults)
+    except (TypeError, ValueError, OverflowError) as e:
+        logger.warning(f"Invalid VAD options {options}: {e}; using defaults")
+        return VoiceActivityDetector(**defaults)
+
+# Bounds for a client-requested realtime frame duration
+REALTIME_FRAME_MS_RANGE = (20, 500)
+
+def _realtime_frame_ms(value):
+    """
+    Returns the client's requested jitter buffer frame duration clamped to
+    REALTIME_FRAME_MS_RANGE, or REALTIME_FRAME_MS if it is missing or invalid.
+    """
+    default = current_app.config.get('REALTIME_FRAME_MS', 100)
+    if value is None:
+        return default
+    try:
+        frame_ms = int(value)
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid frame_ms {value!r}; using {default}ms")
+        return default
+    low, high = REALTIME_FRAME_MS_RANGE
+    return min(high, max(low, frame_ms))
+
 @socketio.on('connect')
 def on_connect():
     logger.info(f"Client connected: {request.sid}")
@@ -42,12 +129,13 @@ def on_disconnect():
     # No specific session cleanup needed anymore for recognition
     logger.info(f"Client disconnected: {request.sid}")
     # If using rooms, Flask-SocketIO handles leaving rooms on disconnect by default
+    chunk_vad_detectors.pop(request.sid, None)
 
     # Clean up any active real-time session
     if request.sid in active_realtime_sessions:
         try:
             session = active_realtime_sessions[request.sid]
-            session['recognizer'].stop_continuous_recognition_async()
+            _end_realtime_session(session)
             del active_realtime_sessions[request.sid]
             logger.info(f"[{request.sid}] Cleaned up real-time session on disconnect")
         except Exception as e:
@@ -98,6 +186,18 @@ def handle_join_room(data):
 #     pass # Remove implementation
 
 
+def _rate_limited_payload(error, original, source_language, target_language, room_id):
+    """translation_error payload for a target refused by the room/socket translation budget."""
+    return {
+        'original': original,
+        'message': f'Translation rate limit reached: {error}',
+        'code': 'rate_limited',
+        'room_id': room_id,
+        'source_language': source_language,
+        'target_language': target_language,
+    }
+
+
 # --- Keep Manual Text Handler (if needed) ---
 @socketio.on('manual_text')
 def on_manual_text(data):
@@ -146,15 +246,12 @@ def on_manual_text(data):
 
 
         translations = {}
-        for target_language in target_languages:
-            # base_target_lang = target_language.split('-')[0]
-            # Skip if source and target are the same (optional, depends on service)
-            # if base_source_lang == base_target_lang: continue
-
-            # Translate the text (assuming translate method exists)
-            # Adjust method name and parameters as needed for your TranslationService
-            translated = translation_service.translate(text, target_language, source_language)
+        # Translate into all target languages concurrently and emit each result as it finishes
+        def _on_rate_limited(target_language, error):
+            emit('translation_error', _rate_limited_payload(error, text, source_language, target_language, room_id))
 
+        for target_language, translated in translation_service.iter_translate_many(
+                text, source_language, target_languages, room_id=room_id, sid=sid, on_error=_on_rate_limited):
             if translated:
                 logger.info(f"[{sid}] Translated manual text: '{text}' -> '{translated}' for {target_language}")
                 translations[target_language] = translated
@@ -195,8 +292,8 @@ def handle_audio_chunk(data):
     """Handles receiving an audio chunk from a client."""
     sid = request.sid
     room_id = data.get('room_id')
-    audio_chunk_b64 = data.get('audio')
-    audio_chunk_bytes = base64.b64decode(audio_chunk_b64) if audio_chunk_b64 else None
+    # Binary attachment (preferred) or base64 string
+    audio_chunk_bytes = decode_audio_payload(data.get('audio'))
     source_language = data.get('language')
     target_languages = data.get('target_languages', [])
 
@@ -207,6 +304,19 @@ def handle_audio_chunk(data):
 
     logger.info(f"[{sid}] Received audio chunk for room '{room_id}', lang: {source_language}, targets: {target_languages}")
 
+    # Skip chunks without speech before they reach Azure
+    if sid not in chunk_vad_detectors or 'vad' in data:
+        chunk_vad_detectors[sid] = _create_vad(data.get('vad'))
+    vad = chunk_vad_detectors[sid]
+    if vad:
+        wav = parse_wav(audio_chunk_bytes)
+        pcm = wav.data if wav else audio_chunk_bytes
+        # Only 16-bit mono at the detector's rate can be classified; anything else is passed through
+        if (wav is None or (wav.bits_per_sample == 16 and wav.channels == 1 and wav.sample_rate == vad.sample_rate)) \
+                and not vad.is_speech(pcm):
+            logger.info(f"[{sid}] Skipping silent audio chunk for room {room_id}")
+            return
+
     try:
         # Get services from app context
         speech_service = current_app.speech_service
@@ -217,15 +327,8 @@ def handle_audio_chunk(data):
             emit('error', {'message': 'Backend services not available.'}) # Emit to sender
             return
 
-        # Save audio bytes to a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_audio_file:
-            temp_audio_file.write(audio_chunk_bytes)
-            temp_audio_path = temp_audio_file.name
-
-        try:
-            recognized_text = speech_service.recognize_speech_from_file(temp_audio_path, language=source_language)
-        finally:
-            os.remove(temp_audio_path)
+        # Recognize straight from the decoded bytes (no temporary file)
+        recognized_text = speech_service.recognize_speech_from_bytes(audio_chunk_bytes, language=source_language)
 
         if not recognized_text:
             logger.info(f"[{sid}] No speech recognized from chunk for room {room_id}.")
@@ -249,9 +352,14 @@ def handle_audio_chunk(data):
             socketio.emit('translation_result', result_data, room=room_id)
         else:
             logger.info(f"[{sid}] Translating '{recognized_text[:30]}...' from {source_language} to {target_languages} for room {room_id}")
-            for target_lang in target_languages:
+            # Translate into all target languages concurrently and emit each result as it finishes
+            def _on_rate_limited(target_lang, error):
+                emit('translation_error', _rate_limited_payload(error, recognized_text, source_language, target_lang, room_id))
+
+            for target_lang, translated in translation_service.iter_translate_many(
+                    recognized_text, source_language, target_languages,
+                    room_id=room_id, sid=sid, on_error=_on_rate_limited):
                 try:
-                    translated = translation_service.translate(recognized_text, target_lang, source_language)
                     if translated:
                         translations[target_lang] = translated
                         logger.info(f"[{sid}] Translated to {target_lang} for room '{room_id}': '{translated[:30]}...'")
@@ -303,8 +411,23 @@ def on_start_realtime_recognition(data):
         emit('error', {'message': 'Room ID is required for real-time recognition'})
         return
     
+    audio_format = (data.get('audio_format') or 'pcm').lower()
+    if audio_format != 'pcm' and audio_format not in REALTIME_AUDIO_FORMATS:
+        emit('error', {'message': f'Unsupported audio format: {audio_format}'})
+        return
+    
+    # A repeated start replaces the sid's session; its ffmpeg process, jitter buffer and recognizer must not leak
+    previous = active_realtime_sessions.pop(sid, None)
+    if previous:
+        logger.info(f"[{sid}] Replacing existing real-time session for room '{previous['room_id']}'")
+        try:
+            _end_realtime_session(previous)
+        except Exception as e:
+            logger.error(f"[{sid}] Error closing previous real-time session: {e}", exc_info=True)
+    
     # Get services from the app context
     speech_service = current_app.speech_service
+    translation_service = current_app.translation_service
     
     # Create a speech recognizer for this session
     recognizer_data = speech_service.create_recognizer(language)
@@ -312,25 +435,78 @@ def on_start_realtime_recognition(data):
         emit('error', {'message': 'Failed to create speech recognizer'})
         return
     
+    # Optionally translate partial hypotheses (opt-in per session)
+    partial_translator = None
+    if data.get('translate_partials') and target_languages:
+        def _emit_partial_translation(text, translations):
+            socketio.emit('realtime_translation', {
+                'original': text,
+                'translations': translations,
+                'source_language': language,
+                'room_id': room_id,
+                'is_final': False
+            }, room=room_id)
+
+        # Partials are charged to their own budgets; a refused one is skipped (and counted),
+        # the final translation still goes out
+        partial_translator = PartialTranslator(
+            lambda text: translation_service.translate_many(text, language, target_languages,
+                                                            room_id=room_id, sid=sid, partial=True,
+                                                            on_error=partial_translator.record_refused),
+            _emit_partial_translation,
+            debounce_ms=current_app.config.get('PARTIAL_TRANSLATION_DEBOUNCE_MS', 300),
+            min_words=current_app.config.get('PARTIAL_TRANSLATION_MIN_WORDS', 2),
+        )
+    
     # Store session data
+    # Services are kept on the session because recognizer callbacks run outside the app context
     active_realtime_sessions[sid] = {
         'room_id': room_id,
         'language': language,
         'target_languages': target_languages,
         'recognizer': recognizer_data['recognizer'],
         'audio_stream': recognizer_data['audio_stream'],
+        'translation_service': translation_service,
+        'partial_translator': partial_translator,
+        'vad': _create_vad(data.get('vad')),
+        'jitter_buffer': JitterBuffer(
+            recognizer_data['audio_stream'].write,
+            frame_ms=_realtime_frame_ms(data.get('frame_ms')),
+            max_depth_ms=current_app.config.get('REALTIME_JITTER_MAX_MS', 2000),
+            target_depth_ms=current_app.config.get('REALTIME_JITTER_TARGET_MS', 200),
+            name=sid,
+        ),
         'partial_result': '',
         'last_final_result': ''
     }
     
+    # Compressed input (MediaRecorder WebM/Opus) is decoded by one ffmpeg process for the whole session
+    if audio_format != 'pcm':
+        session = active_realtime_sessions[sid]
+        transcoder = PersistentTranscoder(
+            lambda pcm: _write_session_audio(session, pcm),
+            input_format=REALTIME_AUDIO_FORMATS[audio_format],
+            max_buffered_bytes=current_app.config.get('REALTIME_TRANSCODER_MAX_BUFFER_BYTES', 2 * 1024 * 1024),
+            name=sid,
+        )
+        try:
+            session['transcoder'] = transcoder.start()
+        except TranscodeError as e:
+            logger.error(f"[{sid}] Failed to start audio transcoder: {e}")
+            session['jitter_buffer'].close()
+            del active_realtime_sessions[sid]
+            emit('error', {'message': f'Failed to start audio transcoder: {e}'})
+            return
+
     # Set up event handlers for the recognizer
     recognizer = recognizer_data['recognizer']
+    hub = gevent.get_hub()
     
     # Handle intermediate results (real-time updates)
-    recognizer.recognizing.connect(lambda evt: handle_recognizing(evt, sid))
+    recognizer.recognizing.connect(lambda evt: _run_on_hub(hub, handle_recognizing, evt, sid))
     
     # Handle final recognition results
-    recognizer.recognized.connect(lambda evt: handle_recognized(evt, sid))
+    recognizer.recognized.connect(lambda evt: _run_on_hub(hub, handle_recognized, evt, sid))
     
     # Start continuous recognition
     recognizer.start_continuous_recognition_async()
@@ -363,6 +539,10 @@ def handle_recognizing(evt, sid):
         'room_id': room_id
     }, room=room_id)
 
+    # Translate the stable part of the hypothesis if the session opted in
+    if session.get('partial_translator'):
+        session['partial_translator'].update(partial_text)
+
 def handle_recognized(evt, sid):
     """Handle final recognition results"""
     if sid not in active_realtime_sessions:
@@ -381,6 +561,10 @@ def handle_recognized(evt, sid):
     
     # Update the session's last final result
     session['last_final_result'] = final_text
+
+    # Pending partial translations are superseded by the final one
+    if session.get('partial_translator'):
+        session['partial_translator'].finalize()
     
     # Emit the final transcription
     socketio.emit('realtime_transcription', {
@@ -403,32 +587,26 @@ def process_realtime_translation(sid, text):
     source_language = session['language']
     target_languages = session['target_languages']
     
-    # Get translation service
-    translation_service = current_app.translation_service
+    # Get translation service (stored on the session; no app context in recognizer callbacks)
+    translation_service = session['translation_service']
     
-    # Process translations for each target language
-    translations = {}
-    for target_lang in target_languages:
-        try:
-            translated = translation_service.translate_text(
-                text, 
-                target_lang, 
-                source_language
-            )
-            
-            if translated:
-                translations[target_lang] = translated
-                logger.info(f"[{sid}] Translated to {target_lang}: '{translated[:30]}...'")
-        except Exception as e:
-            logger.error(f"[{sid}] Error translating to {target_lang}: {e}", exc_info=True)
-            translations[target_lang] = f"[Translation error: {str(e)}]"
+    # Translate into all target languages concurrently and emit once all are done
+    def _on_rate_limited(target_lang, error):
+        socketio.emit('translation_error',
+                      _rate_limited_payload(error, text, source_language, target_lang, room_id), room=sid)
+
+    translations = translation_service.translate_many(text, source_language, target_languages,
+                                                      room_id=room_id, sid=sid, on_error=_on_rate_limited)
+    for target_lang, translated in translations.items():
+        logger.info(f"[{sid}] Translated to {target_lang}: '{translated[:30]}...'")
     
     # Emit the translation results
     socketio.emit('realtime_translation', {
         'original': text,
         'translations': translations,
         'source_language': source_language,
-        'room_id': room_id
+        'room_id': room_id,
+        'is_final': True
     }, room=room_id)
 
 @socketio.on('realtime_audio_chunk')
@@ -449,11 +627,17 @@ def on_realtime_audio_chunk(data):
         return
     
     try:
-        # Decode the base64 audio data
-        audio_bytes = base64.b64decode(audio_data)
+        # Binary attachment (preferred) or base64 string
+        audio_bytes = decode_audio_payload(audio_data)
+        
+        if session.get('transcoder'):
+            # Compressed chunk: the session's ffmpeg process decodes it and pushes the PCM
+            if not session['transcoder'].write(audio_bytes):
+                logger.warning(f"[{sid}] Audio transcoder backlog full or stopped; chunk dropped")
+            return
         
-        # Push the audio data to the stream
-        session['audio_stream'].write(audio_bytes)
+        # Push the PCM audio data to the stream (long silences are dropped)
+        _write_session_audio(session, audio_bytes)
         
     except Exception as e:
         logger.error(f"[{sid}] Error processing real-time audio chunk: {e}", exc_info=True)
@@ -471,8 +655,8 @@ def on_stop_realtime_recognition(data):
     room_id = session['room_id']
     
     try:
-        # Stop the recognizer
-        session['recognizer'].stop_continuous_recognition_async()
+        # Flush any audio still being decoded or buffered, then stop the recognizer
+        pipeline_stats = _end_realtime_session(session)
         
         # Clean up the session
         del active_realtime_sessions[sid]
@@ -481,7 +665,10 @@ def on_stop_realtime_recognition(data):
         
         emit('realtime_recognition_stopped', {
             'message': 'Real-time recognition stopped',
-            'room_id': room_id
+            'room_id': room_id,
+            'vad': session['vad'].stats() if session.get('vad') else None,
+            'transcoder': pipeline_stats['transcoder'],
+            'jitter_buffer': pipeline_stats['jitter_buffer']
         })
         
     except Exception as e:
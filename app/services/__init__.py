@@ -1,6 +1,8 @@
 import logging
 from .translation_service import TranslationService
 from .speech_service import SpeechService
+from .transcription_jobs import TranscriptionJobManager
+from .transcode_executor import TranscodeExecutor
 # Import other services if needed
 
 logger = logging.getLogger(__name__)
@@ -12,6 +14,15 @@ def initialize_services(app):
         # Initialize your services here
         app.translation_service = TranslationService(app.config)
         app.speech_service = SpeechService(app.config)
+        app.transcode_executor = TranscodeExecutor(
+            max_workers=app.config.get('TRANSCODE_MAX_WORKERS') or None,
+            max_queue=app.config.get('TRANSCODE_MAX_QUEUE', 16),
+        )
+        app.transcription_jobs = TranscriptionJobManager(
+            max_concurrent=app.config.get('TRANSCRIPTION_JOB_CONCURRENCY', 2),
+            max_queue=app.config.get('TRANSCRIPTION_JOB_MAX_QUEUE', 20),
+            retain_seconds=app.config.get('TRANSCRIPTION_JOB_RETAIN_SECONDS', 3600),
+        )
         # Initialize other services and attach them to 'app'
         # e.g., app.firebase_service = FirebaseService(app.config)
 
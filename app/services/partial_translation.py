@@ -0,0 +1,130 @@
+import logging
+
+import gevent
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+
+def stable_prefix(previous, current):
+    """
+    Returns the word prefix two consecutive recognition hypotheses agree on.
+
+    The last word of the current hypothesis is excluded because the recognizer
+    is usually still extending it.
+    """
+    if not previous or not current:
+        return ""
+    previous_words = previous.split()
+    current_words = current.split()
+    count = 0
+    for old, new in zip(previous_words, current_words[:-1]):
+        if old != new:
+            break
+        count += 1
+    return " ".join(current_words[:count])
+
+
+class PartialTranslator:
+    """
+    Translates the stable prefix of realtime partial hypotheses for one session.
+
+    Each recognizing event updates the hypothesis; a translation is only
+    scheduled when the committed (stable) prefix changes, and at most one is
+    started per debounce interval. Translations are serialized: while one is
+    in flight, newer prefixes only replace the text of the next run, which is
+    scheduled once the current one returns, so superseded partials never
+    reach the provider. A call already in flight is not killed (it may be
+    shared with other callers through the batcher and single-flight), but a
+    result older than what listeners have already seen is discarded.
+    """
+
+    def __init__(self, translate, emit, debounce_ms=300, min_words=2):
+        """
+        Args:
+            translate (callable): fn(text) -> dict of target language to translation
+            emit (callable): fn(text, translations) called with each fresh partial translation
+            debounce_ms (float): Minimum interval between partial translation calls
+            min_words (int): Minimum stable prefix length (in words) worth translating
+        """
+        self.translate = translate
+        self.emit = emit
+        self.debounce = max(0.0, float(debounce_ms)) / 1000.0
+        self.min_words = max(1, int(min_words))
+
+        self._hypothesis = ""
+        self._committed = ""
+        self._generation = 0
+        self._emitted_generation = 0
+        self._timer = None
+        self._in_flight = False
+
+        self.updates = 0
+        self.translations = 0
+        self.dropped = 0
+        self.refused = 0
+
+    def update(self, partial_text):
+        """Feeds a new partial hypothesis (call from a greenlet on the app's hub)."""
+        self.updates += 1
+        prefix = stable_prefix(self._hypothesis, partial_text)
+        self._hypothesis = partial_text
+        if len(prefix.split()) < self.min_words or prefix == self._committed:
+            return
+        self._committed = prefix
+        self._generation += 1
+        self._schedule()
+
+    def finalize(self):
+        """Resets state when the utterance is final; in-flight partial results are dropped."""
+        self._hypothesis = ""
+        self._committed = ""
+        self._generation += 1
+        self._emitted_generation = self._generation
+        if self._timer is not None:
+            self._timer.kill(block=False)
+            self._timer = None
+
+    def _schedule(self):
+        if self._timer is None and not self._in_flight:
+            self._timer = gevent.spawn_later(self.debounce, self._run)
+
+    def record_refused(self, target_language, error):
+        """Counts a target language whose partial translation was refused by the rate limiter."""
+        self.refused += 1
+
+    def stop(self):
+        self.finalize()
+
+    def _run(self):
+        self._timer = None
+        generation, text = self._generation, self._committed
+        if not text or generation <= self._emitted_generation:
+            self.dropped += 1
+            return
+        self.translations += 1
+        self._in_flight = True
+        try:
+            translations = self.translate(text)
+        except Exception as e:
+            logger.error(f"Partial translation failed: {e}", exc_info=True)
+            return
+        finally:
+            self._in_flight = False
+            # Prefixes committed while this call was in flight get one follow-up run
+            if self._generation > generation and self._committed:
+                self._schedule()
+        # A newer partial (or the final result) may have been emitted meanwhile
+        if generation <= self._emitted_generation:
+            self.dropped += 1
+            return
+        self._emitted_generation = generation
+        self.emit(text, translations)
+
+    def stats(self):
+        return {
+            'updates': self.updates,
+            'translations': self.translations,
+            'dropped': self.dropped,
+            'refused': self.refused,
+        }
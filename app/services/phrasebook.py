@@ -0,0 +1,246 @@
+import json
+import logging
+import os
+import threading
+from collections import deque
+
+from app.utils.languages import resolve_language
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+
+def _base_code(code_or_name):
+    """Phrasebooks are keyed by base language ('en', 'lv'), whatever form the caller uses."""
+    if not code_or_name or code_or_name == 'auto':
+        return None
+    language = resolve_language(code_or_name)
+    if language:
+        return language.code.split('-')[0]
+    return code_or_name.strip().lower().split('-')[0]
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton for case-insensitive, whole-word phrase replacement.
+
+    Matching is a single pass over the text, so the cost depends on the text
+    length and the number of matches, not on the number of phrases.
+    """
+
+    def __init__(self, phrases):
+        """
+        Args:
+            phrases (dict): source phrase -> replacement
+        """
+        self._goto = [{}]
+        self._fail = [0]
+        self._length = [0]        # length of the phrase ending at this node (0 if none)
+        self._replacement = [None]
+        self._output_link = [0]   # nearest node on the fail chain that ends a phrase
+        self.size = 0
+        for phrase, replacement in phrases.items():
+            self._add(phrase.lower(), replacement)
+        self._build()
+
+    def _add(self, phrase, replacement):
+        if not phrase.strip():
+            return
+        node = 0
+        for ch in phrase:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._length.append(0)
+                self._replacement.append(None)
+                self._output_link.append(0)
+            node = nxt
+        if not self._length[node]:
+            self.size += 1
+        self._length[node] = len(phrase)
+        self._replacement[node] = replacement
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                failed = self._fail[child]
+                self._output_link[child] = failed if self._length[failed] else self._output_link[failed]
+
+    def find(self, text):
+        """
+        Returns non-overlapping whole-word matches as (start, end, replacement),
+        preferring the leftmost and then the longest phrase.
+        """
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # Some characters change length when lowercased; keep offsets aligned
+            lowered = "".join(ch if len(ch.lower()) != 1 else ch.lower() for ch in text)
+
+        candidates = []
+        node = 0
+        goto, fail = self._goto, self._fail
+        for index, ch in enumerate(lowered):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            match = node if self._length[node] else self._output_link[node]
+            end = index + 1
+            while match:
+                start = end - self._length[match]
+                if self._is_boundary(text, start, end):
+                    candidates.append((start, -self._length[match], self._replacement[match]))
+                match = self._output_link[match]
+
+        candidates.sort()
+        matches = []
+        position = 0
+        for start, negative_length, replacement in candidates:
+            if start >= position:
+                end = start - negative_length
+                matches.append((start, end, replacement))
+                position = end
+        return matches
+
+    @staticmethod
+    def _is_boundary(text, start, end):
+        before_ok = start == 0 or not text[start - 1].isalnum()
+        after_ok = end == len(text) or not text[end].isalnum()
+        return before_ok and after_ok
+
+    def replace(self, text):
+        """Returns (new_text, match_count) with every matched phrase replaced."""
+        matches = self.find(text)
+        if not matches:
+            return text, 0
+        parts = []
+        position = 0
+        for start, end, replacement in matches:
+            parts.append(text[position:start])
+            parts.append(replacement)
+            position = end
+        parts.append(text[position:])
+        return "".join(parts), len(matches)
+
+
+class Phrasebook:
+    """
+    Offline glossary of phrase translations per language pair.
+
+    The glossary file is JSON of the form
+        {"en": {"lv": {"thank you": "paldies", ...}, ...}, ...}
+    and each language pair is compiled into an Aho-Corasick automaton on first use.
+    """
+
+    DEFAULT_SOURCE = 'en'
+
+    def __init__(self, entries=None):
+        """
+        Args:
+            entries (dict): source base code -> target base code -> {phrase: translation}
+        """
+        self._entries = {}
+        self._automata = {}
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.replacements = 0
+        self.exact_hits = 0
+        for source, targets in (entries or {}).items():
+            for target, phrases in targets.items():
+                self.add_phrases(source, target, phrases)
+
+    @classmethod
+    def from_file(cls, path):
+        """Loads a phrasebook from a JSON glossary file."""
+        with open(path, encoding='utf-8') as f:
+            entries = json.load(f)
+        phrasebook = cls(entries)
+        logger.info(f"Phrasebook loaded from {path}: {phrasebook.size} phrases in {len(phrasebook._entries)} language pairs")
+        return phrasebook
+
+    @property
+    def size(self):
+        return sum(len(phrases) for phrases in self._entries.values())
+
+    def add_phrases(self, source_language, target_language, phrases):
+        """Adds phrases for a language pair; its automaton is rebuilt on next use."""
+        pair = (_base_code(source_language), _base_code(target_language))
+        with self._lock:
+            table = self._entries.setdefault(pair, {})
+            for phrase, translation in phrases.items():
+                table[" ".join(phrase.lower().split())] = translation
+            self._automata.pop(pair, None)
+
+    def _automaton(self, pair):
+        automaton = self._automata.get(pair)
+        if automaton is None:
+            with self._lock:
+                automaton = self._automata.get(pair)
+                if automaton is None and pair in self._entries:
+                    automaton = AhoCorasick(self._entries[pair])
+                    self._automata[pair] = automaton
+        return automaton
+
+    def _pair(self, source_language, target_language):
+        return (_base_code(source_language) or self.DEFAULT_SOURCE, _base_code(target_language))
+
+    def lookup(self, text, source_language, target_language):
+        """Returns the glossary translation if the whole text is a known phrase, else None."""
+        if not text:
+            return None
+        table = self._entries.get(self._pair(source_language, target_language))
+        if not table:
+            return None
+        translation = table.get(" ".join(text.lower().split()))
+        if translation is not None:
+            self.exact_hits += 1
+        return translation
+
+    def translate(self, text, source_language, target_language):
+        """
+        Replaces every known phrase in text with its translation (longest match wins).
+
+        Returns:
+            tuple: (translated_text, number_of_replacements)
+        """
+        self.lookups += 1
+        if not text:
+            return text, 0
+        automaton = self._automaton(self._pair(source_language, target_language))
+        if automaton is None:
+            return text, 0
+        translated, count = automaton.replace(text)
+        self.replacements += count
+        return translated, count
+
+    def stats(self):
+        return {
+            'phrases': self.size,
+            'language_pairs': len(self._entries),
+            'compiled_pairs': len(self._automata),
+            'lookups': self.lookups,
+            'replacements': self.replacements,
+            'exact_hits': self.exact_hits,
+        }
+
+
+def load_phrasebook(path):
+    """Loads the phrasebook at path, returning None if it is missing or invalid."""
+    if not path or not os.path.exists(path):
+        logger.info(f"No phrasebook found at {path}; offline phrase translation disabled")
+        return None
+    try:
+        return Phrasebook.from_file(path)
+    except Exception as e:
+        logger.error(f"Failed to load phrasebook from {path}: {e}", exc_info=True)
+        return None
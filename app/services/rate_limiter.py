@@ -0,0 +1,205 @@
+import logging
+import threading
+import time
+
+from .resilience import ProviderUnavailableError
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+
+class RateLimitExceeded(ProviderUnavailableError):
+    """A room or socket has used up its translation budget."""
+
+    def __init__(self, scope, key, resource):
+        self.scope = scope
+        self.key = key
+        self.resource = resource
+        super().__init__(f"Translation {resource} budget exceeded for {scope} '{key}'")
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at rate_per_minute / 60 tokens per second.
+
+    The bucket holds at most one minute's worth of tokens, so a client can burst
+    up to its per-minute budget and is then held to the sustained rate.
+    """
+
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute)
+        self.refill_per_second = self.capacity / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.refill_per_second)
+            self._updated = now
+
+    def available(self, now=None):
+        self._refill(now if now is not None else time.monotonic())
+        return self._tokens
+
+    def consume(self, amount):
+        self._tokens -= amount
+
+    def is_full(self, now=None):
+        return self.available(now) >= self.capacity
+
+
+class _Budget:
+    """Character and request buckets plus usage counters for one room or socket."""
+
+    __slots__ = ('chars', 'requests', 'used_chars', 'used_requests', 'rejected', 'degraded', 'last_used')
+
+    def __init__(self, chars_per_minute, requests_per_minute):
+        self.chars = TokenBucket(chars_per_minute) if chars_per_minute else None
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.used_chars = 0
+        self.used_requests = 0
+        self.rejected = 0
+        self.degraded = 0
+        self.last_used = time.monotonic()
+
+    def exhausted(self, chars, now):
+        """Returns the name of the exhausted resource, or None if the call fits."""
+        if self.requests is not None and self.requests.available(now) < 1:
+            return 'request'
+        if self.chars is not None and self.chars.available(now) < chars:
+            return 'character'
+        return None
+
+    def charge(self, chars, now):
+        if self.requests is not None:
+            self.requests.consume(1)
+        if self.chars is not None:
+            self.chars.consume(chars)
+        self.used_chars += chars
+        self.used_requests += 1
+        self.last_used = now
+
+    def is_idle(self, now):
+        return all(bucket is None or bucket.is_full(now) for bucket in (self.chars, self.requests))
+
+    def snapshot(self, now):
+        return {
+            'chars': self.used_chars,
+            'requests': self.used_requests,
+            'rejected': self.rejected,
+            'degraded': self.degraded,
+            'chars_available': int(self.chars.available(now)) if self.chars else None,
+            'requests_available': int(self.requests.available(now)) if self.requests else None,
+        }
+
+
+class TranslationRateLimiter:
+    """
+    Per-room and per-socket translation budgets, counted in characters and requests.
+
+    A call is charged against both the room and the socket buckets, and only if
+    both have enough tokens; otherwise RateLimitExceeded is raised and nothing is
+    consumed. A budget of 0 disables that particular limit.
+    """
+
+    # Budgets whose buckets are full again are dropped after this long without use
+    IDLE_SECONDS = 600
+    PRUNE_EVERY = 1000
+
+    def __init__(self, room_chars_per_minute=20000, room_requests_per_minute=300,
+                 sid_chars_per_minute=10000, sid_requests_per_minute=120):
+        """
+        Args:
+            room_chars_per_minute (int): Characters a room may send to providers per minute
+            room_requests_per_minute (int): Provider requests a room may make per minute
+            sid_chars_per_minute (int): Characters a single socket may send per minute
+            sid_requests_per_minute (int): Provider requests a single socket may make per minute
+        """
+        self.limits = {
+            'room': (max(0, int(room_chars_per_minute)), max(0, int(room_requests_per_minute))),
+            'sid': (max(0, int(sid_chars_per_minute)), max(0, int(sid_requests_per_minute))),
+        }
+        self._budgets = {'room': {}, 'sid': {}}
+        self._lock = threading.Lock()
+        self._checks = 0
+
+        self.allowed = 0
+        self.rejected = 0
+        self.degraded = 0
+
+        logger.info(f"TranslationRateLimiter init - room: {self.limits['room']}, sid: {self.limits['sid']} (chars, requests per minute)")
+
+    @property
+    def enabled(self):
+        return any(any(limits) for limits in self.limits.values())
+
+    def _budget_locked(self, scope, key):
+        budgets = self._budgets[scope]
+        budget = budgets.get(key)
+        if budget is None:
+            budget = budgets[key] = _Budget(*self.limits[scope])
+        return budget
+
+    def acquire(self, chars, room_id=None, sid=None):
+        """
+        Charges one provider request of chars characters to the room and socket.
+
+        Raises:
+            RateLimitExceeded: if either budget is exhausted (nothing is charged)
+        """
+        scopes = [(scope, key) for scope, key in (('room', room_id), ('sid', sid))
+                  if key and any(self.limits[scope])]
+        if not scopes:
+            return
+        now = time.monotonic()
+        with self._lock:
+            budgets = [(scope, key, self._budget_locked(scope, key)) for scope, key in scopes]
+            for scope, key, budget in budgets:
+                resource = budget.exhausted(chars, now)
+                if resource:
+                    budget.rejected += 1
+                    self.rejected += 1
+                    raise RateLimitExceeded(scope, key, resource)
+            for _, _, budget in budgets:
+                budget.charge(chars, now)
+            self.allowed += 1
+            self._checks += 1
+            if self._checks % self.PRUNE_EVERY == 0:
+                self._prune_locked(now)
+
+    def record_degraded(self, room_id=None, sid=None):
+        """Counts an over-budget request that was answered from the cache instead."""
+        with self._lock:
+            self.degraded += 1
+            for scope, key in (('room', room_id), ('sid', sid)):
+                budget = self._budgets[scope].get(key) if key else None
+                if budget is not None:
+                    budget.degraded += 1
+
+    def _prune_locked(self, now):
+        for budgets in self._budgets.values():
+            idle = [key for key, budget in budgets.items()
+                    if now - budget.last_used > self.IDLE_SECONDS and budget.is_idle(now)]
+            for key in idle:
+                del budgets[key]
+
+    def usage(self, room_id):
+        """Returns the usage snapshot for one room, or None if it has not translated anything."""
+        with self._lock:
+            budget = self._budgets['room'].get(room_id)
+            return budget.snapshot(time.monotonic()) if budget else None
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            return {
+                'enabled': self.enabled,
+                'room_limits': dict(zip(('chars_per_minute', 'requests_per_minute'), self.limits['room'])),
+                'sid_limits': dict(zip(('chars_per_minute', 'requests_per_minute'), self.limits['sid'])),
+                'allowed': self.allowed,
+                'rejected': self.rejected,
+                'degraded': self.degraded,
+                'tracked_sids': len(self._budgets['sid']),
+                'rooms': {room: budget.snapshot(now) for room, budget in self._budgets['room'].items()},
+            }
@@ -0,0 +1,102 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+
+class RecognitionCache:
+    """
+    Bounded LRU cache of speech recognition results keyed by an audio fingerprint.
+
+    Retried uploads and chunks re-sent after a reconnect carry byte-identical
+    audio, so their transcripts can be returned without another Azure
+    recognition. Only successful (non-empty) transcripts are stored.
+    """
+
+    def __init__(self, max_entries=2000):
+        """
+        Args:
+            max_entries (int): Maximum number of cached transcripts (0 disables the cache)
+        """
+        self.max_entries = max(0, int(max_entries))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        logger.info(f"RecognitionCache init - max_entries: {self.max_entries}")
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    @staticmethod
+    def fingerprint(*parts):
+        """
+        Hashes audio buffers (bytes, bytearray or memoryview) and format
+        descriptors into a 128-bit hex fingerprint without copying the buffers.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for part in parts:
+            if isinstance(part, str):
+                part = part.encode('utf-8')
+            elif not isinstance(part, (bytes, bytearray, memoryview)):
+                part = repr(part).encode('utf-8')
+            digest.update(part)
+        return digest.hexdigest()
+
+    @staticmethod
+    def fingerprint_stream(stream, chunk_size=64 * 1024):
+        """
+        Fingerprints a seekable binary stream in chunks and rewinds it,
+        so the caller can still read it afterwards.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        start = stream.tell()
+        for chunk in iter(lambda: stream.read(chunk_size), b''):
+            digest.update(chunk)
+        stream.seek(start)
+        return digest.hexdigest()
+
+    def get(self, fingerprint, language):
+        """Returns the cached transcript for the audio and language, or None."""
+        if not self.enabled or not fingerprint:
+            return None
+        key = (fingerprint, (language or '').lower())
+        with self._lock:
+            text = self._entries.get(key)
+            if text is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return text
+
+    def set(self, fingerprint, language, text):
+        if not self.enabled or not fingerprint or not text:
+            return
+        key = (fingerprint, (language or '').lower())
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,230 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import gevent
+from gevent.event import Event
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+
+class ProviderUnavailableError(Exception):
+    """Raised when an outbound call is refused locally instead of being sent."""
+
+
+class CircuitOpenError(ProviderUnavailableError):
+    """The provider's circuit breaker is open."""
+
+
+class ConcurrencyLimitExceeded(ProviderUnavailableError):
+    """No concurrency slot became free within the allowed wait."""
+
+
+class CircuitBreaker:
+    """
+    Fails fast while a provider is unhealthy.
+
+    CLOSED: calls pass; consecutive failures are counted.
+    OPEN: calls are refused until reset_seconds have passed.
+    HALF_OPEN: a single probe call is let through; its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=5, reset_seconds=30.0):
+        self.name = name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_seconds = max(0.0, float(reset_seconds))
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+        self.opened_count = 0
+        self.rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state_locked()
+
+    def _current_state_locked(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def is_available(self):
+        """True if a call would currently be allowed (without reserving the probe slot)."""
+        with self._lock:
+            state = self._current_state_locked()
+            return state == self.CLOSED or (state == self.HALF_OPEN and not self._probe_in_flight)
+
+    def before_call(self):
+        """Reserves permission for one call or raises CircuitOpenError."""
+        with self._lock:
+            state = self._current_state_locked()
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            self.rejected += 1
+        raise CircuitOpenError(f"Circuit for {self.name} is open")
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"Circuit for {self.name} closed after successful probe")
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.opened_count += 1
+                    logger.warning(f"Circuit for {self.name} opened after {self._consecutive_failures} consecutive failures")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def record_ignored(self):
+        """Releases a probe slot for a call whose outcome says nothing about provider health."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def snapshot(self):
+        with self._lock:
+            state = self._current_state_locked()
+            return {
+                'state': state,
+                'consecutive_failures': self._consecutive_failures,
+                'opened_count': self.opened_count,
+                'rejected': self.rejected,
+                'retry_in_s': round(max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at)), 1)
+                if state == self.OPEN else 0.0,
+            }
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD limit on concurrent outbound calls.
+
+    The limit grows by roughly one per limit's worth of fast successful calls
+    (additive increase) and is halved when the provider signals overload or
+    responds slower than latency_threshold (multiplicative decrease). Callers
+    beyond the limit wait up to max_wait for a slot and are then rejected.
+    """
+
+    def __init__(self, name, initial_limit=10, min_limit=1, max_limit=50, max_wait_ms=2000,
+                 latency_threshold_ms=3000, decrease_cooldown_ms=1000):
+        self.name = name
+        self.min_limit = max(1, int(min_limit))
+        self.max_limit = max(self.min_limit, int(max_limit))
+        self._limit = float(min(self.max_limit, max(self.min_limit, initial_limit)))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.latency_threshold = float(latency_threshold_ms) / 1000.0
+        self.decrease_cooldown = max(0.0, float(decrease_cooldown_ms)) / 1000.0
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiters = deque()
+        self._last_decrease = 0.0
+        # Waiting is coordinated on the hub that created the limiter
+        self._hub = gevent.get_hub()
+
+        self.rejected = 0
+        self.decreases = 0
+        self.peak_in_flight = 0
+
+    @property
+    def limit(self):
+        return int(self._limit)
+
+    def _try_acquire_locked(self):
+        if self._in_flight < int(self._limit):
+            self._in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self._in_flight)
+            return True
+        return False
+
+    @contextmanager
+    def acquire(self):
+        """Holds one concurrency slot for the duration of the block."""
+        with self._lock:
+            acquired = self._try_acquire_locked()
+            waiter = None
+            if not acquired and self.max_wait > 0 and gevent.get_hub() is self._hub:
+                waiter = Event()
+                self._waiters.append(waiter)
+
+        if not acquired and waiter is not None:
+            deadline = time.monotonic() + self.max_wait
+            while not acquired:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not waiter.wait(remaining):
+                    break
+                with self._lock:
+                    acquired = self._try_acquire_locked()
+                    if not acquired:
+                        waiter.clear()
+                        self._waiters.appendleft(waiter)
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+        if not acquired:
+            with self._lock:
+                self.rejected += 1
+            raise ConcurrencyLimitExceeded(f"{self.name}: {self._in_flight} calls in flight (limit {self.limit})")
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._wake_locked()
+
+    def _wake_locked(self):
+        free = int(self._limit) - self._in_flight
+        while free > 0 and self._waiters:
+            self._waiters.popleft().set()
+            free -= 1
+
+    def on_success(self, latency):
+        if latency > self.latency_threshold:
+            self.on_overload()
+            return
+        with self._lock:
+            self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+            self._wake_locked()
+
+    def on_overload(self):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_decrease < self.decrease_cooldown:
+                return
+            self._last_decrease = now
+            self._limit = max(self.min_limit, self._limit / 2.0)
+            self.decreases += 1
+            logger.warning(f"{self.name}: overload signalled, concurrency limit reduced to {int(self._limit)}")
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'limit': int(self._limit),
+                'in_flight': self._in_flight,
+                'waiting': len(self._waiters),
+                'peak_in_flight': self.peak_in_flight,
+                'decreases': self.decreases,
+                'rejected': self.rejected,
+            }
@@ -0,0 +1,122 @@
+import logging
+import threading
+import time
+
+import gevent
+from gevent.monkey import get_original
+from gevent.threadpool import ThreadPool
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+
+class SDKExecutor:
+    """
+    Runs blocking native calls (Azure Speech SDK future.get() waits) on a
+    bounded pool of real threads.
+
+    Callers on the gevent hub wait cooperatively on the result, so the worker
+    keeps serving other sockets while recognition or synthesis is running.
+    Calls made off the main hub (e.g., from SDK callback threads) run inline,
+    as there is no event loop to keep free there.
+    """
+
+    def __init__(self, max_workers=8):
+        """
+        Args:
+            max_workers (int): Number of native threads available for blocking SDK calls
+        """
+        self.max_workers = max(1, int(max_workers))
+        self._pool = ThreadPool(self.max_workers)
+        self._hub = gevent.get_hub()
+        # Counters are updated from pool threads too, so use a real (unpatched) lock
+        self._lock = get_original('threading', 'Lock')()
+
+        self._busy = 0
+        self._in_flight = 0
+        self.submitted = 0
+        self.inline = 0
+        self.saturated = 0
+        self.peak_busy = 0
+        self._queue_wait_total = 0.0
+        self._run_total = 0.0
+        self._completed = 0
+
+        logger.info(f"SDKExecutor init - max_workers: {self.max_workers}")
+
+    def run(self, fn, *args, **kwargs):
+        """
+        Calls fn(*args, **kwargs) on a pool thread and waits for it without blocking the hub.
+
+        Returns:
+            The return value of fn; exceptions raised by fn are re-raised here.
+        """
+        if gevent.get_hub() is not self._hub:
+            with self._lock:
+                self.inline += 1
+            return fn(*args, **kwargs)
+
+        submitted_at = time.perf_counter()
+        with self._lock:
+            self.submitted += 1
+            if self._in_flight >= self.max_workers:
+                # Every thread is occupied; this call queues behind them
+                self.saturated += 1
+            self._in_flight += 1
+
+        def _call():
+            started_at = time.perf_counter()
+            with self._lock:
+                self._busy += 1
+                self.peak_busy = max(self.peak_busy, self._busy)
+                self._queue_wait_total += started_at - submitted_at
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._busy -= 1
+                    self._in_flight -= 1
+                    self._completed += 1
+                    self._run_total += time.perf_counter() - started_at
+
+        return self._pool.spawn(_call).get()
+
+    def wait(self, future):
+        """Waits for an SDK ResultFuture (e.g., recognize_once_async()) cooperatively."""
+        return self.run(future.get)
+
+    def stats(self):
+        with self._lock:
+            completed = self._completed
+            return {
+                'max_workers': self.max_workers,
+                'busy': self._busy,
+                'queued': self._in_flight - self._busy,
+                'peak_busy': self.peak_busy,
+                'submitted': self.submitted,
+                'completed': completed,
+                'inline': self.inline,
+                'saturated': self.saturated,
+                'saturation_rate': round(self.saturated / self.submitted, 4) if self.submitted else 0.0,
+                'avg_queue_wait_ms': round(self._queue_wait_total / completed * 1000, 3) if completed else None,
+                'avg_run_ms': round(self._run_total / completed * 1000, 3) if completed else None,
+            }
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_sdk_executor(max_workers=None):
+    """
+    Returns the process-wide SDK executor, creating it on first use.
+
+    max_workers only applies to the first call (initialize_services passes the
+    configured SDK_THREADPOOL_SIZE before any service uses the executor).
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = SDKExecutor(max_workers or 8)
+    return _executor
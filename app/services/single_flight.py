@@ -0,0 +1,91 @@
+import logging
+import threading
+
+import gevent
+from gevent.event import AsyncResult
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Suppresses duplicate concurrent calls for the same key.
+
+    The first caller for a key runs the function; callers that arrive while it
+    is still running wait for and share its result (or exception) instead of
+    issuing their own request.
+    """
+
+    def __init__(self, name="single_flight"):
+        self.name = name
+        self._in_flight = {}  # key -> AsyncResult
+        self._lock = threading.Lock()
+        # Waiting is coordinated on the hub that created this object; callers on
+        # other native threads (e.g. Azure SDK callbacks) run their call directly.
+        self._hub = gevent.get_hub()
+
+        self.calls = 0
+        self.executions = 0
+        self.suppressed = 0
+
+    def do(self, key, fn):
+        """
+        Runs fn() for key unless an identical call is already in flight.
+
+        Args:
+            key (hashable): Identity of the call
+            fn (callable): Zero-argument function producing the result
+
+        Returns:
+            The result of fn(), possibly computed by another caller
+        """
+        if gevent.get_hub() is not self._hub:
+            with self._lock:
+                self.calls += 1
+                self.executions += 1
+            return fn()
+
+        with self._lock:
+            self.calls += 1
+            pending = self._in_flight.get(key)
+            if pending is None:
+                pending = AsyncResult()
+                self._in_flight[key] = pending
+                is_leader = True
+                self.executions += 1
+            else:
+                is_leader = False
+                self.suppressed += 1
+
+        if not is_leader:
+            logger.debug(f"[{self.name}] Waiting on in-flight call for duplicate key")
+            return pending.get()
+
+        try:
+            value = fn()
+        except Exception as e:
+            pending.set_exception(e)
+            raise
+        except BaseException as e:
+            # The leader was killed (e.g. GreenletExit); followers must not wait forever,
+            # but re-raising GreenletExit in them would end their greenlets silently
+            pending.set_exception(RuntimeError(f"In-flight call was interrupted: {e!r}"))
+            raise
+        else:
+            pending.set(value)
+            return value
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def stats(self):
+        """Returns a snapshot of duplicate-suppression counters for monitoring."""
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'executions': self.executions,
+                'suppressed': self.suppressed,
+                'in_flight': len(self._in_flight),
+                'suppression_rate': round(self.suppressed / self.calls, 4) if self.calls else 0.0,
+            }
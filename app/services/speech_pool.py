@@ -0,0 +1,207 @@
+import logging
+import threading
+import time
+from collections import deque
+
+import gevent
+import azure.cognitiveservices.speech as speechsdk
+
+from app.utils.languages import azure_locale
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+
+class RecognizerPool:
+    """
+    Per-language pool of ready-to-use Azure speech recognizers.
+
+    SpeechConfig objects are built once per language and shared. Recognizers
+    reading from a PushAudioInputStream are built ahead of time and their
+    service connection is opened immediately, so the websocket and auth
+    handshake are already done when a caller takes one. A recognizer (and its
+    audio stream) serves a single session, so every acquire() schedules a
+    background refill for that language.
+
+    Ready recognizers unused for idle_seconds are closed, because the service
+    drops idle connections anyway.
+
+    Languages are resolved to their Azure locale through the language registry
+    ('lv', 'Latvian' -> 'lv-LV'); unknown codes are passed to the SDK as given.
+    """
+
+    def __init__(self, subscription, region, size_per_language=2, max_size=16, idle_seconds=60,
+                 latency_window=500):
+        """
+        Args:
+            subscription (str): Azure Speech key
+            region (str): Azure Speech region
+            size_per_language (int): Ready recognizers kept per language and mode (0 disables pre-warming)
+            max_size (int): Upper bound on ready recognizers across all languages
+            idle_seconds (float): Ready recognizers older than this are closed
+            latency_window (int): Number of acquire latencies kept for percentiles
+        """
+        self.subscription = subscription
+        self.region = region
+        self.size_per_language = max(0, int(size_per_language))
+        self.max_size = max(0, int(max_size))
+        self.idle_seconds = max(0.0, float(idle_seconds))
+
+        self._configs = {}
+        # (language, continuous) -> deque of ready entries, oldest first
+        self._ready = {}
+        self._refilling = set()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+        self.evicted = 0
+        self.errors = 0
+        self._acquire_latencies = deque(maxlen=latency_window)
+
+        logger.info(f"RecognizerPool init - size_per_language: {self.size_per_language}, max_size: {self.max_size}, idle: {self.idle_seconds}s")
+
+    def speech_config(self, language):
+        """Returns the shared SpeechConfig for a recognition language."""
+        language = azure_locale(language, default=language)
+        config = self._configs.get(language)
+        if config is None:
+            config = speechsdk.SpeechConfig(subscription=self.subscription, region=self.region)
+            config.speech_recognition_language = language
+            self._configs[language] = config
+        return config
+
+    def _build(self, language, continuous):
+        audio_stream = speechsdk.audio.PushAudioInputStream()
+        audio_config = speechsdk.audio.AudioConfig(stream=audio_stream)
+        recognizer = speechsdk.SpeechRecognizer(speech_config=self.speech_config(language), audio_config=audio_config)
+        # Opening the connection up front moves the connect/auth round trip out of the request path
+        connection = speechsdk.Connection.from_recognizer(recognizer)
+        connection.open(continuous)
+        with self._lock:
+            self.created += 1
+        return {
+            'recognizer': recognizer,
+            'audio_stream': audio_stream,
+            'connection': connection,
+            'language': language,
+            'created_at': time.monotonic(),
+        }
+
+    @staticmethod
+    def _close(entry):
+        try:
+            entry['connection'].close()
+        except Exception as e:
+            logger.debug(f"Error closing pooled recognizer connection: {e}")
+
+    def _evict_idle_locked(self, now):
+        expired = []
+        for entries in self._ready.values():
+            while entries and now - entries[0]['created_at'] > self.idle_seconds:
+                expired.append(entries.popleft())
+        self.evicted += len(expired)
+        return expired
+
+    def _ready_count_locked(self):
+        return sum(len(entries) for entries in self._ready.values())
+
+    def acquire(self, language, continuous=True):
+        """
+        Takes a ready recognizer for the language, building one if none is pooled.
+
+        Args:
+            language (str): Recognition language (e.g., 'lv-LV')
+            continuous (bool): Whether the connection is opened for continuous recognition
+
+        Returns:
+            dict: {'recognizer', 'audio_stream', 'connection', 'language', 'created_at'}
+        """
+        start = time.perf_counter()
+        language = azure_locale(language, default=language)
+        key = (language, continuous)
+        with self._lock:
+            expired = self._evict_idle_locked(time.monotonic())
+            entries = self._ready.get(key)
+            entry = entries.popleft() if entries else None
+            if entry is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        for stale in expired:
+            self._close(stale)
+
+        if entry is None:
+            entry = self._build(language, continuous)
+
+        with self._lock:
+            self._acquire_latencies.append(time.perf_counter() - start)
+        self._schedule_refill(key)
+        return entry
+
+    def prewarm(self, languages, continuous=True):
+        """Fills the pool for the given languages in the background."""
+        for language in languages:
+            self._schedule_refill((azure_locale(language, default=language), continuous))
+
+    def _schedule_refill(self, key):
+        if not self.size_per_language:
+            return
+        with self._lock:
+            if key in self._refilling:
+                return
+            self._refilling.add(key)
+        gevent.spawn(self._refill, key)
+
+    def _refill(self, key):
+        language, continuous = key
+        try:
+            while True:
+                with self._lock:
+                    expired = self._evict_idle_locked(time.monotonic())
+                    ready = len(self._ready.get(key, ()))
+                    full = ready >= self.size_per_language or self._ready_count_locked() >= self.max_size
+                for stale in expired:
+                    self._close(stale)
+                if full:
+                    return
+                try:
+                    entry = self._build(language, continuous)
+                except Exception as e:
+                    with self._lock:
+                        self.errors += 1
+                    logger.error(f"Failed to pre-warm recognizer for {language}: {e}")
+                    return
+                with self._lock:
+                    self._ready.setdefault(key, deque()).append(entry)
+                gevent.sleep(0)
+        finally:
+            with self._lock:
+                self._refilling.discard(key)
+
+    def close(self):
+        """Closes every ready recognizer connection."""
+        with self._lock:
+            entries = [entry for ready in self._ready.values() for entry in ready]
+            self._ready.clear()
+        for entry in entries:
+            self._close(entry)
+
+    def stats(self):
+        with self._lock:
+            acquisitions = self.hits + self.misses
+            latencies = sorted(self._acquire_latencies)
+            return {
+                'ready': {f"{language}{'' if continuous else ' (once)'}": len(entries)
+                          for (language, continuous), entries in self._ready.items()},
+                'configs': len(self._configs),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / acquisitions, 4) if acquisitions else 0.0,
+                'created': self.created,
+                'evicted': self.evicted,
+                'errors': self.errors,
+                'acquire_ms_avg': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+                'acquire_ms_p95': round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 3) if latencies else None,
+            }
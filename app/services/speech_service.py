@@ -1,6 +1,15 @@
 import os
+import ctypes
 import logging
 import azure.cognitiveservices.speech as speechsdk
+import gevent
+from gevent.pool import Pool
+from gevent.queue import Queue
+
+from .speech_pool import RecognizerPool
+from .sdk_executor import get_sdk_executor
+from .recognition_cache import RecognitionCache
+from app.utils.audio import parse_wav, split_at_silence, VoiceActivityDetector, SPEECH_SAMPLE_RATE, SPEECH_CHANNELS, SPEECH_SAMPLE_WIDTH
 
 # Set up logger
 logger = logging.getLogger(__name__)
@@ -20,9 +29,47 @@ class SpeechService:
         logger.info(f"SpeechService init - AZURE_SPEECH_KEY: {'Set' if self.azure_key else 'Not set'}")
         logger.info(f"SpeechService init - AZURE_REGION: {self.azure_region}")
         
+        # Blocking SDK waits run on native threads so the gevent hub stays responsive
+        self.sdk_executor = get_sdk_executor(config.get('SDK_THREADPOOL_SIZE'))
+
+        # Transcripts of audio we have already recognized (retries, re-sent chunks)
+        self.recognition_cache = RecognitionCache(config.get('RECOGNITION_CACHE_MAX_ENTRIES', 2000))
+
+        # Long recordings are split at pauses and the segments recognized in parallel
+        self.segment_concurrency = max(1, int(config.get('SPEECH_SEGMENT_CONCURRENCY', 4)))
+        self.segment_options = {
+            'max_segment_ms': int(config.get('SPEECH_SEGMENT_MAX_SECONDS', 30) * 1000),
+            'min_silence_ms': config.get('SPEECH_SEGMENT_MIN_SILENCE_MS', 300),
+            'frame_ms': config.get('VAD_FRAME_MS', 20),
+            'energy_threshold_db': config.get('VAD_ENERGY_THRESHOLD_DB', -45.0),
+            'zcr_threshold': config.get('VAD_ZCR_THRESHOLD', 0.25),
+        }
+
         # Check if Azure Speech is configured
+        self.recognizer_pool = None
         if not self.azure_key or not self.azure_region:
             logger.warning("Azure Speech not fully configured")
+        else:
+            # Shared SpeechConfigs and pre-connected recognizers per language
+            self.recognizer_pool = RecognizerPool(
+                self.azure_key,
+                self.azure_region,
+                size_per_language=config.get('SPEECH_POOL_SIZE_PER_LANGUAGE', 2),
+                max_size=config.get('SPEECH_POOL_MAX_SIZE', 16),
+                idle_seconds=config.get('SPEECH_POOL_IDLE_SECONDS', 60),
+            )
+            prewarm = [lang.strip() for lang in (config.get('SPEECH_POOL_PREWARM_LANGUAGES') or '').split(',') if lang.strip()]
+            if prewarm:
+                self.recognizer_pool.prewarm(prewarm)
+
+    def get_stats(self):
+        """Returns speech service counters for monitoring."""
+        return {
+            'recognizer_pool': self.recognizer_pool.stats() if self.recognizer_pool else None,
+            'sdk_executor': self.sdk_executor.stats(),
+            'recognition_cache': self.recognition_cache.stats(),
+            'vad': VoiceActivityDetector.total_stats(),
+        }
     
     def create_recognizer(self, language):
         """Create a speech recognizer for the given language"""
@@ -31,21 +78,8 @@ class SpeechService:
             return None
             
         try:
-            # Create speech config
-            speech_config = speechsdk.SpeechConfig(subscription=self.azure_key, region=self.azure_region)
-            speech_config.speech_recognition_language = language
-            
-            # Create audio stream
-            audio_stream = speechsdk.audio.PushAudioInputStream()
-            audio_config = speechsdk.audio.AudioConfig(stream=audio_stream)
-            
-            # Create recognizer
-            recognizer = speechsdk.SpeechRecognizer(speech_config=speech_config, audio_config=audio_config)
-            
-            return {
-                'recognizer': recognizer,
-                'audio_stream': audio_stream
-            }
+            # Take a pre-connected recognizer (push stream input) from the pool
+            return self.recognizer_pool.acquire(language, continuous=True)
         except Exception as e:
             logger.error(f"Failed to create recognizer: {e}")
             return None
@@ -58,12 +92,9 @@ class SpeechService:
 
         logger.info(f"SpeechService: Recognizing speech from file: {audio_filename}, Language: {language}")
         try:
-            speech_config = speechsdk.SpeechConfig(subscription=self.azure_key, region=self.azure_region)
-
-            # --- Explicitly set the recognition language ---
-            speech_config.speech_recognition_language = language
-            logger.info(f"SpeechService: Set speech_recognition_language to: {speech_config.speech_recognition_language}")
-            # --- End Change ---
+            # Shared per-language config (recognition language already set)
+            speech_config = self.recognizer_pool.speech_config(language)
+            logger.info(f"SpeechService: Using speech_recognition_language: {speech_config.speech_recognition_language}")
 
             # Assuming audio_filename is a WAV file suitable for direct use
             audio_config = speechsdk.audio.AudioConfig(filename=audio_filename)
@@ -74,33 +105,302 @@ class SpeechService:
             speech_recognizer = speechsdk.SpeechRecognizer(speech_config=speech_config, audio_config=audio_config)
 
             logger.info("SpeechService: Starting recognize_once_async()...")
-            # Use recognize_once_async().get() for a blocking call that waits for the result
-            result = speech_recognizer.recognize_once_async().get()
-            logger.info(f"SpeechService: Recognition result status: {result.reason}")
-
-            # Check the result
-            if result.reason == speechsdk.ResultReason.RecognizedSpeech:
-                # Log detected language from response properties if available for debugging
-                detected_lang_info = result.properties.get(speechsdk.PropertyId.SpeechServiceResponse_JsonResult, '{}')
-                logger.info(f"SpeechService: Recognized: '{result.text}' (Language info from SDK: {detected_lang_info})")
-                return result.text
-            elif result.reason == speechsdk.ResultReason.NoMatch:
-                logger.warning(f"SpeechService: No speech could be recognized from file: {audio_filename}. Reason: {result.no_match_details}")
-                return None
-            elif result.reason == speechsdk.ResultReason.Canceled:
-                cancellation_details = result.cancellation_details
-                logger.error(f"SpeechService: Speech Recognition canceled: {cancellation_details.reason}")
-                if cancellation_details.reason == speechsdk.CancellationReason.Error:
-                    logger.error(f"SpeechService: Error details: {cancellation_details.error_details}")
-                return None
-            else:
-                 logger.error(f"SpeechService: Unexpected recognition result reason: {result.reason}")
-                 return None
+            # Wait for the result on a pool thread; only this greenlet blocks
+            result = self.sdk_executor.wait(speech_recognizer.recognize_once_async())
+            return self._result_text(result, f"file: {audio_filename}")
 
         except Exception as e:
             logger.error(f"SpeechService: Error during recognition for {audio_filename} ({language}): {e}", exc_info=True)
             return None
 
+    def recognize_speech_from_bytes(self, audio, language='en-US'):
+        """
+        Recognizes speech from audio held in memory, without a filesystem round trip.
+
+        Args:
+            audio (bytes | bytearray | memoryview): A PCM WAV file, or raw 16kHz mono
+                16-bit PCM if there is no WAV header
+            language (str): Recognition language (e.g., 'lv-LV')
+
+        Returns:
+            str: Recognized text, or None if nothing was recognized
+        """
+        if not self.azure_key or not self.azure_region:
+            logger.error("Cannot recognize speech: Azure Speech not configured.")
+            return None
+        if not audio:
+            return None
+
+        wav = parse_wav(audio)
+        if wav is not None:
+            samples = wav.data
+            audio_format = (wav.sample_rate, wav.bits_per_sample, wav.channels)
+        else:
+            samples = memoryview(audio).cast('B')
+            audio_format = (SPEECH_SAMPLE_RATE, SPEECH_SAMPLE_WIDTH * 8, SPEECH_CHANNELS)
+
+        # Keyed on the samples, not the container, so the same audio with a different header still hits
+        fingerprint = self.recognition_cache.fingerprint(samples, audio_format)
+        cached = self.recognition_cache.get(fingerprint, language)
+        if cached is not None:
+            logger.info(f"SpeechService: Recognition cache hit for {len(samples)} bytes of audio ({language})")
+            return cached
+
+        logger.info(f"SpeechService: Recognizing {len(samples)} bytes of audio ({audio_format[0]}Hz, {audio_format[1]}-bit, {audio_format[2]}ch), Language: {language}")
+        try:
+            if audio_format == (SPEECH_SAMPLE_RATE, SPEECH_SAMPLE_WIDTH * 8, SPEECH_CHANNELS):
+                # Default push stream format: take a pre-connected recognizer
+                entry = self.recognizer_pool.acquire(language, continuous=False)
+                speech_recognizer, audio_stream = entry['recognizer'], entry['audio_stream']
+            else:
+                stream_format = speechsdk.audio.AudioStreamFormat(
+                    samples_per_second=audio_format[0], bits_per_sample=audio_format[1], channels=audio_format[2])
+                audio_stream = speechsdk.audio.PushAudioInputStream(stream_format=stream_format)
+                speech_recognizer = speechsdk.SpeechRecognizer(
+                    speech_config=self.recognizer_pool.speech_config(language),
+                    audio_config=speechsdk.audio.AudioConfig(stream=audio_stream))
+
+            audio_stream.write(self._sdk_buffer(samples))
+            audio_stream.close()
+            result = self.sdk_executor.wait(speech_recognizer.recognize_once_async())
+            text = self._result_text(result, f"{len(samples)} bytes of audio")
+            self.recognition_cache.set(fingerprint, language, text)
+            return text
+
+        except Exception as e:
+            logger.error(f"SpeechService: Error during in-memory recognition ({language}): {e}", exc_info=True)
+            return None
+
+    def recognize_speech_from_stream(self, pcm_chunks, language='en-US', fingerprint=None):
+        """
+        Recognizes speech from 16kHz mono 16-bit PCM arriving in chunks (e.g., from
+        app.utils.audio.transcode_stream).
+
+        Recognition starts before the first chunk is written, so decoding and
+        recognition overlap instead of running one after the other.
+
+        Args:
+            pcm_chunks (iterable): bytes-like PCM chunks
+            language (str): Recognition language (e.g., 'lv-LV')
+            fingerprint (str, optional): RecognitionCache fingerprint of the source audio.
+                On a cache hit pcm_chunks is never iterated, so a lazy decoder never runs.
+
+        Returns:
+            str: Recognized text, or None if nothing was recognized
+
+        Raises:
+            Exceptions raised while producing pcm_chunks (e.g., TranscodeError)
+        """
+        if not self.azure_key or not self.azure_region:
+            logger.error("Cannot recognize speech: Azure Speech not configured.")
+            return None
+
+        cached = self.recognition_cache.get(fingerprint, language)
+        if cached is not None:
+            logger.info(f"SpeechService: Recognition cache hit for streamed audio {fingerprint} ({language})")
+            return cached
+
+        try:
+            entry = self.recognizer_pool.acquire(language, continuous=False)
+            speech_recognizer, audio_stream = entry['recognizer'], entry['audio_stream']
+            future = speech_recognizer.recognize_once_async()
+        except Exception as e:
+            logger.error(f"SpeechService: Error starting streamed recognition ({language}): {e}", exc_info=True)
+            return None
+
+        total = 0
+        try:
+            for chunk in pcm_chunks:
+                if chunk:
+                    audio_stream.write(self._sdk_buffer(chunk))
+                    total += len(chunk)
+        finally:
+            # Closing the stream ends the recognition even if the producer failed
+            audio_stream.close()
+
+        logger.info(f"SpeechService: Streamed {total} bytes of PCM for recognition, Language: {language}")
+        try:
+            result = self.sdk_executor.wait(future)
+            text = self._result_text(result, f"{total} bytes of streamed audio")
+            self.recognition_cache.set(fingerprint, language, text)
+            return text
+        except Exception as e:
+            logger.error(f"SpeechService: Error during streamed recognition ({language}): {e}", exc_info=True)
+            return None
+
+    def iter_recognize_continuous(self, pcm_chunks, language='en-US'):
+        """
+        Runs continuous recognition over 16kHz mono 16-bit PCM arriving in chunks and
+        yields every recognized utterance, so files longer than one utterance are
+        transcribed completely.
+
+        Args:
+            pcm_chunks (iterable): bytes-like PCM chunks (e.g., from transcode_stream)
+            language (str): Recognition language (e.g., 'lv-LV')
+
+        Yields:
+            dict: {'text', 'offset_ms', 'duration_ms'} per utterance, in audio order
+
+        Raises:
+            RuntimeError: if Azure Speech is not configured or recognition is canceled with an error
+            Exceptions raised while producing pcm_chunks (e.g., TranscodeError)
+        """
+        if not self.azure_key or not self.azure_region:
+            raise RuntimeError("Azure Speech not configured")
+
+        entry = self.recognizer_pool.acquire(language, continuous=True)
+        recognizer, audio_stream = entry['recognizer'], entry['audio_stream']
+
+        # SDK events fire on native threads; hand them to this greenlet through the hub
+        hub = gevent.get_hub()
+        events = Queue()
+        finished = object()
+
+        def _put(item):
+            hub.loop.run_callback_threadsafe(events.put, item)
+
+        def _on_recognized(evt):
+            result = evt.result
+            if result.reason == speechsdk.ResultReason.RecognizedSpeech and result.text:
+                # Offsets and durations are in 100ns ticks
+                _put({'text': result.text, 'offset_ms': result.offset // 10000, 'duration_ms': result.duration // 10000})
+
+        def _on_canceled(evt):
+            details = evt.cancellation_details
+            if details.reason == speechsdk.CancellationReason.Error:
+                _put(RuntimeError(f"Recognition canceled: {details.error_details}"))
+            _put(finished)
+
+        recognizer.recognized.connect(_on_recognized)
+        recognizer.canceled.connect(_on_canceled)
+        recognizer.session_stopped.connect(lambda evt: _put(finished))
+
+        feed_errors = []
+
+        def _feed():
+            total = 0
+            try:
+                for chunk in pcm_chunks:
+                    if chunk:
+                        audio_stream.write(self._sdk_buffer(chunk))
+                        total += len(chunk)
+            except Exception as e:
+                # Re-raised to the consumer once the session has stopped
+                feed_errors.append(e)
+            finally:
+                # End of stream stops the session once the remaining audio is recognized
+                audio_stream.close()
+                logger.info(f"SpeechService: Streamed {total} bytes of PCM for continuous recognition, Language: {language}")
+
+        self.sdk_executor.wait(recognizer.start_continuous_recognition_async())
+        writer = gevent.spawn(_feed)
+        try:
+            while True:
+                item = events.get()
+                if item is finished:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+            writer.join()
+            if feed_errors:
+                raise feed_errors[0]
+        finally:
+            writer.kill()
+            try:
+                self.sdk_executor.wait(recognizer.stop_continuous_recognition_async())
+            except Exception as e:
+                logger.debug(f"SpeechService: Error stopping continuous recognition: {e}")
+
+    def iter_recognize_segmented(self, pcm_chunks, language='en-US', concurrency=None):
+        """
+        Transcribes a long recording by splitting it at pauses (split_at_silence) and
+        recognizing up to `concurrency` segments at a time, each in its own Azure session.
+
+        Segments are recognized while decoding continues. Utterances are yielded in time
+        order, so a segment's results wait until every earlier segment has finished.
+
+        Args:
+            pcm_chunks (iterable): bytes-like 16kHz mono 16-bit PCM chunks
+            language (str): Recognition language (e.g., 'lv-LV')
+            concurrency (int, optional): Parallel sessions (defaults to SPEECH_SEGMENT_CONCURRENCY)
+
+        Yields:
+            dict: {'text', 'offset_ms', 'duration_ms', 'segment'}, offsets relative to the whole recording
+
+        Raises:
+            The same exceptions as iter_recognize_continuous
+        """
+        concurrency = max(1, int(concurrency or self.segment_concurrency))
+        decode_errors = []
+
+        def _segments():
+            # Decoder errors end the segment stream and are re-raised after the queued segments
+            try:
+                for index, (offset_ms, pcm) in enumerate(split_at_silence(pcm_chunks, **self.segment_options)):
+                    yield index, offset_ms, pcm
+            except Exception as e:
+                decode_errors.append(e)
+
+        def _recognize(segment):
+            index, offset_ms, pcm = segment
+            utterances = list(self.iter_recognize_continuous([pcm], language))
+            for utterance in utterances:
+                utterance['offset_ms'] += offset_ms
+                utterance['segment'] = index
+            logger.info(f"SpeechService: Segment {index} at {offset_ms / 1000.0:.1f}s: {len(utterances)} utterances")
+            return utterances
+
+        pool = Pool(concurrency)
+        try:
+            # Finished segments waiting on an earlier one are bounded, which bounds buffered audio
+            for utterances in pool.imap(_recognize, _segments(), maxsize=concurrency * 2):
+                yield from utterances
+        finally:
+            pool.kill()
+        if decode_errors:
+            raise decode_errors[0]
+
+    @staticmethod
+    def _sdk_buffer(view):
+        """
+        Adapts a buffer for PushAudioInputStream.write (which only takes bytes or ctypes arrays).
+
+        Writable buffers are wrapped without a copy (the ctypes array keeps them alive);
+        read-only views (e.g., slices of a bytes payload) are copied once, which is
+        negligible next to receiving them.
+        """
+        if isinstance(view, bytes):
+            return view
+        view = memoryview(view).cast('B')
+        if view.readonly:
+            return view.tobytes()
+        return (ctypes.c_char * view.nbytes).from_buffer(view)
+
+    @staticmethod
+    def _result_text(result, source):
+        """Returns the recognized text from a recognition result, logging why there is none."""
+        logger.info(f"SpeechService: Recognition result status: {result.reason}")
+
+        # Check the result
+        if result.reason == speechsdk.ResultReason.RecognizedSpeech:
+            # Log detected language from response properties if available for debugging
+            detected_lang_info = result.properties.get(speechsdk.PropertyId.SpeechServiceResponse_JsonResult, '{}')
+            logger.info(f"SpeechService: Recognized: '{result.text}' (Language info from SDK: {detected_lang_info})")
+            return result.text
+        elif result.reason == speechsdk.ResultReason.NoMatch:
+            logger.warning(f"SpeechService: No speech could be recognized from {source}. Reason: {result.no_match_details}")
+            return None
+        elif result.reason == speechsdk.ResultReason.Canceled:
+            cancellation_details = result.cancellation_details
+            logger.error(f"SpeechService: Speech Recognition canceled: {cancellation_details.reason}")
+            if cancellation_details.reason == speechsdk.CancellationReason.Error:
+                logger.error(f"SpeechService: Error details: {cancellation_details.error_details}")
+            return None
+        else:
+             logger.error(f"SpeechService: Unexpected recognition result reason: {result.reason}")
+             return None
+
     def synthesize_speech(self, text, output_file, voice='en-US-JennyNeural'):
         """Text-to-speech conversion"""
         if not self.azure_key or not self.azure_region:
@@ -112,7 +412,7 @@ class SpeechService:
             speech_config.speech_synthesis_voice_name = voice
             audio_config = speechsdk.AudioConfig(filename=output_file) if output_file else None
             synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=audio_config)
-            result = synthesizer.speak_text_async(text).get()
+            result = self.sdk_executor.wait(synthesizer.speak_text_async(text))
 
             if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
                 logger.info(f"Speech synthesis successful for: '{text[:50]}...'")
@@ -0,0 +1,160 @@
+import logging
+import os
+import time
+
+import gevent
+from gevent.lock import BoundedSemaphore
+from gevent.threadpool import ThreadPool
+
+from app.utils.audio import decode_upload
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+
+class TranscoderOverloaded(Exception):
+    """Every transcoding slot is busy and the wait queue is full."""
+
+    def __init__(self, queue_depth):
+        self.queue_depth = queue_depth
+        super().__init__(f"Audio transcoding is overloaded ({queue_depth} uploads waiting)")
+
+
+class TranscodeExecutor:
+    """
+    Bounds concurrent upload decoding to the number of CPU cores.
+
+    ffmpeg decodes and in-process PCM conversion each hold one of max_workers
+    slots while they run. ffmpeg runs as separate processes, so up to
+    max_workers of them use separate cores while the gevent worker only
+    shuffles pipe data; conversion runs on a pool of max_workers native
+    threads, so the event loop is not blocked by NumPy work. WAV uploads that
+    are already 16kHz mono need no CPU work and take no slot. Decodes beyond
+    max_workers wait for a slot; once max_queue are waiting, new ones are
+    rejected with TranscoderOverloaded instead of piling up.
+
+    A slot is held for as long as its PCM is being read, so consumers that
+    read slower than the decoder (e.g., recognition-paced background jobs)
+    should use decode_to_file() instead of decode().
+    """
+
+    def __init__(self, max_workers=None, max_queue=16):
+        """
+        Args:
+            max_workers (int, optional): Concurrent decodes (defaults to the CPU count)
+            max_queue (int): Decodes allowed to wait for a slot before new ones are rejected
+        """
+        self.max_workers = max(1, int(max_workers or os.cpu_count() or 1))
+        self.max_queue = max(0, int(max_queue))
+        self._slots = BoundedSemaphore(self.max_workers)
+        self._threads = ThreadPool(self.max_workers)
+        self._hub = gevent.get_hub()
+
+        self.running = 0
+        self.waiting = 0
+        self.peak_running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.decoders = {}
+        self._wait_total = 0.0
+        self._started = 0
+
+        logger.info(f"TranscodeExecutor init - max_workers: {self.max_workers}, max_queue: {self.max_queue}")
+
+    def check_capacity(self):
+        """Raises TranscoderOverloaded if a new decode would have to queue behind max_queue others."""
+        if self._slots.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise TranscoderOverloaded(self.waiting)
+
+    def decode(self, stream, read_size=64 * 1024, reject=True, command=None):
+        """
+        Picks a decoder for an upload (see decode_upload) and runs it under a slot.
+
+        The slot is taken when the first PCM chunk is requested and released when
+        the chunks are exhausted or closed, so a decode that is never read (e.g., a
+        recognition cache hit) costs nothing. Passthrough decodes take no slot.
+
+        Args:
+            stream: Readable binary file object positioned at the start of the upload
+            read_size (int): Bytes read per chunk
+            reject (bool): Raise TranscoderOverloaded when the queue is full; callers that are
+                admission-controlled already (background jobs) pass False and just wait
+            command (list, optional): Overrides the ffmpeg command line
+
+        Returns:
+            tuple: (decoder name, lazy iterable of PCM chunks)
+
+        Raises:
+            TranscoderOverloaded: if reject is set and the queue is full (also from the
+                first read, if the queue filled up in between)
+        """
+        if reject:
+            self.check_capacity()
+        decoder, chunks = decode_upload(stream, read_size, command=command, run=self._run)
+        self.decoders[decoder] = self.decoders.get(decoder, 0) + 1
+        if decoder == 'passthrough':
+            return decoder, chunks
+        return decoder, self._hold_slot(chunks, reject)
+
+    def decode_to_file(self, stream, output, read_size=64 * 1024, command=None):
+        """
+        Decodes a whole upload into a binary file (e.g., a SpooledTemporaryFile), waiting
+        for a slot rather than being rejected, and rewinds it.
+
+        The slot is released as soon as decoding finishes, so a consumer that reads the
+        PCM at recognition speed does not keep CPU slots from other uploads.
+
+        Returns:
+            tuple: (decoder name, bytes of PCM written)
+        """
+        decoder, chunks = self.decode(stream, read_size, reject=False, command=command)
+        total = 0
+        for chunk in chunks:
+            output.write(chunk)
+            total += len(chunk)
+        output.seek(0)
+        return decoder, total
+
+    def _hold_slot(self, chunks, reject):
+        if reject:
+            self.check_capacity()
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        self.peak_running = max(self.peak_running, self.running)
+        self._started += 1
+        self._wait_total += time.perf_counter() - queued_at
+        try:
+            yield from chunks
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close:
+                # Stops ffmpeg right away if the consumer gave up early
+                close()
+            self.running -= 1
+            self.completed += 1
+            self._slots.release()
+
+    def _run(self, fn, *args):
+        """Runs CPU-bound conversion on a native thread, or inline off the main hub."""
+        if gevent.get_hub() is not self._hub:
+            return fn(*args)
+        return self._threads.spawn(fn, *args).get()
+
+    def stats(self):
+        return {
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'running': self.running,
+            'queue_depth': self.waiting,
+            'peak_running': self.peak_running,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'decoders': dict(self.decoders),
+            'avg_queue_wait_ms': round(self._wait_total / self._started * 1000, 3) if self._started else None,
+        }
@@ -0,0 +1,177 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import gevent
+from gevent.queue import Queue
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFull(Exception):
+    """The transcription job queue is at capacity."""
+
+    def __init__(self, queue_depth):
+        self.queue_depth = queue_depth
+        super().__init__(f"Transcription job queue is full ({queue_depth} jobs waiting)")
+
+
+class TranscriptionJob:
+    """State of one background transcription, as reported to clients."""
+
+    def __init__(self, meta=None):
+        self.id = uuid.uuid4().hex
+        self.meta = dict(meta or {})
+        self.status = 'queued'
+        self.progress = 0.0
+        self.utterances = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in ('completed', 'failed')
+
+    def snapshot(self, include_result=True):
+        data = {
+            'job_id': self.id,
+            'status': self.status,
+            'progress': round(self.progress, 4),
+            'utterances': len(self.utterances),
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'error': self.error,
+        }
+        data.update(self.meta)
+        if include_result:
+            data['result'] = self.result
+        return data
+
+
+class TranscriptionJobManager:
+    """
+    Runs long transcriptions in the background with bounded concurrency.
+
+    Jobs wait in a FIFO queue served by max_concurrent worker greenlets; once
+    max_queue jobs are waiting, submit() raises JobQueueFull instead of letting
+    the backlog grow. Finished jobs stay retrievable by id for retain_seconds
+    (at most max_retained of them).
+    """
+
+    def __init__(self, max_concurrent=2, max_queue=20, retain_seconds=3600, max_retained=500):
+        """
+        Args:
+            max_concurrent (int): Jobs processed at the same time
+            max_queue (int): Jobs allowed to wait for a worker
+            retain_seconds (float): How long finished jobs can be looked up
+            max_retained (int): Upper bound on finished jobs kept for lookup
+        """
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queue = max(0, int(max_queue))
+        self.retain_seconds = max(0.0, float(retain_seconds))
+        self.max_retained = max(0, int(max_retained))
+
+        self._queue = Queue()
+        self._jobs = OrderedDict()
+        self._workers = []
+        self._lock = threading.Lock()
+
+        self.running = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._wait_total = 0.0
+
+        logger.info(f"TranscriptionJobManager init - max_concurrent: {self.max_concurrent}, max_queue: {self.max_queue}")
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def submit(self, fn, *args, meta=None):
+        """
+        Queues fn(job, *args) to run on a worker; its return value becomes job.result.
+
+        Raises:
+            JobQueueFull: if max_queue jobs are already waiting
+        """
+        with self._lock:
+            depth = self._queue.qsize()
+            if depth >= self.max_queue:
+                self.rejected += 1
+                raise JobQueueFull(depth)
+            job = TranscriptionJob(meta)
+            self._jobs[job.id] = job
+            self.submitted += 1
+            self._prune_locked(time.time())
+        self._ensure_workers()
+        self._queue.put((job, fn, args))
+        logger.info(f"Queued transcription job {job.id} (queue depth: {self._queue.qsize()})")
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _ensure_workers(self):
+        # Workers start lazily so they run on the hub of the process serving requests
+        self._workers = [worker for worker in self._workers if not worker.dead]
+        while len(self._workers) < self.max_concurrent:
+            self._workers.append(gevent.spawn(self._work))
+
+    def _work(self):
+        while True:
+            job, fn, args = self._queue.get()
+            job.status = 'running'
+            job.started_at = time.time()
+            with self._lock:
+                self.running += 1
+                self._wait_total += job.started_at - job.created_at
+            try:
+                job.result = fn(job, *args)
+                job.progress = 1.0
+                job.status = 'completed'
+            except Exception as e:
+                logger.error(f"Transcription job {job.id} failed: {e}", exc_info=True)
+                job.error = str(e)
+                job.status = 'failed'
+            finally:
+                job.finished_at = time.time()
+                with self._lock:
+                    self.running -= 1
+                    if job.status == 'completed':
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+
+    def _prune_locked(self, now):
+        finished = [job for job in self._jobs.values() if job.finished]
+        excess = len(finished) - self.max_retained
+        for job in finished:
+            if excess > 0 or now - job.finished_at > self.retain_seconds:
+                del self._jobs[job.id]
+                excess -= 1
+
+    def stats(self):
+        with self._lock:
+            started = self.completed + self.failed + self.running
+            return {
+                'queue_depth': self._queue.qsize(),
+                'max_queue': self.max_queue,
+                'running': self.running,
+                'max_concurrent': self.max_concurrent,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'retained': len(self._jobs),
+                'avg_queue_wait_ms': round(self._wait_total / started * 1000, 3) if started else None,
+            }
@@ -0,0 +1,186 @@
+import logging
+import threading
+
+import gevent
+from gevent.event import AsyncResult
+
+from .resilience import ProviderUnavailableError
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+
+class BatchTimeout(ProviderUnavailableError):
+    """A caller gave up waiting for the batch containing its text."""
+
+
+class _PendingBatch:
+    """Texts collected for one (source, target) pair during a batch window"""
+
+    def __init__(self):
+        self.items = []  # list of (text, AsyncResult)
+        self.chars = 0
+
+
+class TranslationBatcher:
+    """
+    Coalesces concurrent single-text translation requests into batched provider calls.
+
+    Requests with the same (source, target) pair that arrive within the batch
+    window are sent as one list to ``translate_batch`` and the results are
+    fanned back out to the waiting callers. The first caller of a window
+    waits for the window to elapse and then sends the batch; a caller that
+    fills the batch to its size limit sends it immediately. If the leader is
+    killed before sending, the batch is handed to a new greenlet, and no
+    caller waits longer than result_timeout for its result.
+    """
+
+    def __init__(self, translate_batch, window_ms=5, max_batch_size=50, max_batch_chars=100000,
+                 result_timeout=30):
+        """
+        Initialize the batcher.
+
+        Args:
+            translate_batch (callable): fn(texts, source_code, target_code) -> list of translated strings
+            window_ms (float): How long to collect requests before sending (0 disables batching)
+            max_batch_size (int): Maximum number of texts per provider call
+            max_batch_chars (int): Maximum total characters per provider call
+            result_timeout (float): Seconds a caller waits for its batch before BatchTimeout is raised
+        """
+        self.translate_batch = translate_batch
+        self.window = max(0.0, float(window_ms)) / 1000.0
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_batch_chars = max(1, int(max_batch_chars))
+        self.result_timeout = max(0.0, float(result_timeout)) or None
+
+        self._pending = {}  # (source, target) -> _PendingBatch
+        self._lock = threading.Lock()
+        # Batches are coordinated on the hub that created the batcher; callers on
+        # other native threads (e.g. Azure SDK callbacks) bypass coalescing.
+        self._hub = gevent.get_hub()
+
+        self.requests = 0
+        self.batches = 0
+        self.batched_texts = 0
+        self.bypassed = 0
+        self.max_seen_batch = 0
+        self.timeouts = 0
+
+        logger.info(f"TranslationBatcher init - window: {self.window * 1000:.1f}ms, max_batch_size: {self.max_batch_size}")
+
+    @property
+    def enabled(self):
+        return self.window > 0 and self.max_batch_size > 1
+
+    def translate(self, text, source_code, target_code):
+        """
+        Translates a single text, sharing a provider call with concurrent requests.
+
+        Blocks the calling greenlet until the batch containing the text has been
+        sent. Provider exceptions are re-raised in every caller of the batch.
+
+        Raises:
+            BatchTimeout: if the batch has not been resolved within result_timeout
+        """
+        if not self.enabled or gevent.get_hub() is not self._hub:
+            self.bypassed += 1
+            return self.translate_batch([text], source_code, target_code)[0]
+
+        key = (source_code, target_code)
+        result = AsyncResult()
+        with self._lock:
+            self.requests += 1
+            batch = self._pending.get(key)
+            is_leader = batch is None
+            if is_leader:
+                batch = _PendingBatch()
+                self._pending[key] = batch
+            batch.items.append((text, result))
+            batch.chars += len(text)
+            is_full = len(batch.items) >= self.max_batch_size or batch.chars >= self.max_batch_chars
+            if is_full:
+                del self._pending[key]
+
+        if is_full:
+            self._send(key, batch)
+        elif is_leader:
+            try:
+                gevent.sleep(self.window)
+            except BaseException:
+                # Killed during the window: the other callers still need their batch sent
+                if self._claim(key, batch):
+                    gevent.spawn(self._send, key, batch)
+                raise
+            if self._claim(key, batch):
+                self._send(key, batch)
+
+        try:
+            return result.get(timeout=self.result_timeout)
+        except gevent.Timeout:
+            with self._lock:
+                self.timeouts += 1
+            raise BatchTimeout(f"No batch result for {source_code or 'auto'} -> {target_code} "
+                               f"after {self.result_timeout}s")
+
+    def _claim(self, key, batch):
+        """Removes batch from the pending map; False if a caller that filled it already sent it."""
+        with self._lock:
+            if self._pending.get(key) is not batch:
+                return False
+            del self._pending[key]
+            return True
+
+    @staticmethod
+    def _fail(batch, error):
+        # Callers block on result.get(), so every unresolved one must get an outcome
+        for _, result in batch.items:
+            if not result.ready():
+                result.set_exception(error)
+
+    def _send(self, key, batch):
+        """Sends one batch to the provider and resolves every waiting caller."""
+        source_code, target_code = key
+        # Identical texts in the same window only need to be translated once
+        unique_texts = list(dict.fromkeys(text for text, _ in batch.items))
+
+        with self._lock:
+            self.batches += 1
+            self.batched_texts += len(batch.items)
+            self.max_seen_batch = max(self.max_seen_batch, len(batch.items))
+
+        try:
+            translated = self.translate_batch(unique_texts, source_code, target_code)
+        except Exception as e:
+            self._fail(batch, e)
+            return
+        except BaseException as e:
+            self._fail(batch, RuntimeError(f"Batch send was interrupted: {e!r}"))
+            raise
+
+        if len(batch.items) > 1:
+            logger.debug(f"Sent batch of {len(unique_texts)} texts for {source_code or 'auto'} -> {target_code}")
+        try:
+            if translated is None or len(translated) != len(unique_texts):
+                raise ValueError(f"Provider returned {len(translated or ())} translations for {len(unique_texts)} texts")
+            by_text = dict(zip(unique_texts, translated))
+            for text, result in batch.items:
+                result.set(by_text[text])
+        except Exception as e:
+            logger.error(f"Could not resolve batch for {source_code or 'auto'} -> {target_code}: {e}")
+            self._fail(batch, e)
+
+    def stats(self):
+        """Returns a snapshot of batching counters for monitoring."""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'window_ms': self.window * 1000,
+                'max_batch_size': self.max_batch_size,
+                'requests': self.requests,
+                'batches': self.batches,
+                'bypassed': self.bypassed,
+                'avg_batch_size': round(self.batched_texts / self.batches, 2) if self.batches else 0.0,
+                'max_seen_batch': self.max_seen_batch,
+                'timeouts': self.timeouts,
+                'pending_pairs': len(self._pending),
+            }
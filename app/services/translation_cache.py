@@ -0,0 +1,149 @@
+import logging
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text):
+    """
+    Normalizes text for use in a cache key.
+
+    Applies Unicode NFC normalization and collapses runs of whitespace so that
+    "Thank  you " and "Thank you" share an entry. Case is preserved because
+    DeepL output depends on it.
+    """
+    if not text:
+        return ""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class TranslationCache:
+    """Bounded in-process LRU cache with TTL expiry for translated text"""
+
+    def __init__(self, max_entries=5000, ttl_seconds=3600, max_bytes=8 * 1024 * 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int): Maximum number of cached translations (0 disables the cache)
+            ttl_seconds (float): Lifetime of an entry in seconds (0 means no expiry)
+            max_bytes (int): Approximate cap on the memory used by keys and values
+        """
+        self.max_entries = max(0, int(max_entries))
+        self.ttl_seconds = max(0.0, float(ttl_seconds))
+        self.max_bytes = max(0, int(max_bytes))
+
+        # key -> (value, expires_at, size); expires_at is 0 for no expiry, -1 once counted as expired
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_hits = 0
+
+        logger.info(f"TranslationCache init - max_entries: {self.max_entries}, ttl: {self.ttl_seconds}s, max_bytes: {self.max_bytes}")
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    @staticmethod
+    def make_key(text, source_lang, target_lang):
+        """Builds a cache key from normalized text and resolved provider language codes."""
+        return (normalize_text(text), (source_lang or "").upper(), (target_lang or "").upper())
+
+    @staticmethod
+    def _entry_size(key, value):
+        # Rough UTF-8 size of the stored strings; good enough for a memory cap
+        return len(key[0].encode("utf-8")) + len(value.encode("utf-8")) + len(key[1]) + len(key[2])
+
+    def get(self, key):
+        """Returns the cached translation for key, or None on a miss or expired entry."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, size = entry
+            if expires_at and expires_at <= time.monotonic():
+                # Expired entries stay until evicted so they can be served stale by get_stale();
+                # a negative expires_at marks one whose expiry has already been counted
+                if expires_at > 0:
+                    self.expirations += 1
+                    self._entries[key] = (value, -1, size)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_stale(self, key):
+        """
+        Returns the cached translation for key even if its TTL has passed.
+        Used as a fallback while providers are unavailable.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self.stale_hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        """Stores a translation, evicting least recently used entries to respect the limits."""
+        if not self.enabled or not value:
+            return
+        size = self._entry_size(key, value)
+        if self.max_bytes and size > self.max_bytes:
+            # A single entry larger than the whole cache is not worth keeping
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else 0
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            while self._entries and (
+                len(self._entries) > self.max_entries
+                or (self.max_bytes and self._bytes > self.max_bytes)
+            ):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        """Drops all cached entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Returns a snapshot of cache counters for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'stale_hits': self.stale_hits,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from .translation_cache import normalize_text
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+
+class TranslationMemory:
+    """
+    Persistent translation memory backed by a local SQLite file.
+
+    Entries are keyed by a hash of the normalized source text and the resolved
+    language pair, so they survive worker restarts. The database runs in WAL
+    mode and is pruned back to ``max_entries`` by least recent use.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS translations (
+            key_hash TEXT PRIMARY KEY,
+            source_lang TEXT NOT NULL,
+            target_lang TEXT NOT NULL,
+            source_text TEXT NOT NULL,
+            translated_text TEXT NOT NULL,
+            last_used REAL NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations (last_used);
+    """
+
+    def __init__(self, path, max_entries=200000):
+        """
+        Open (or create) the translation memory.
+
+        Args:
+            path (str): Location of the SQLite file
+            max_entries (int): Number of entries kept after pruning
+        """
+        self.path = path
+        self.max_entries = max(1, int(max_entries))
+        # Prune once the table grows 10% past the cap so deletes happen in bulk
+        self._prune_threshold = self.max_entries + max(1, self.max_entries // 10)
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self._count = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.pruned = 0
+        self._lookup_seconds = 0.0
+
+        logger.info(f"TranslationMemory opened at {path} with {self._count} entries (max {self.max_entries})")
+
+    @staticmethod
+    def make_hash(text, source_lang, target_lang):
+        """Hashes normalized text plus the resolved language pair."""
+        material = "\x1f".join([(source_lang or "").upper(), (target_lang or "").upper(), normalize_text(text)])
+        return hashlib.sha1(material.encode("utf-8")).hexdigest()
+
+    def get(self, text, source_lang, target_lang):
+        """Returns the stored translation, or None if the memory has no entry."""
+        key_hash = self.make_hash(text, source_lang, target_lang)
+        started = time.perf_counter()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT translated_text FROM translations WHERE key_hash = ?", (key_hash,)
+            ).fetchone()
+            if row is not None:
+                self._conn.execute(
+                    "UPDATE translations SET last_used = ? WHERE key_hash = ?", (time.time(), key_hash)
+                )
+                self.hits += 1
+            else:
+                self.misses += 1
+            self._lookup_seconds += time.perf_counter() - started
+        return row[0] if row is not None else None
+
+    def put(self, text, source_lang, target_lang, translated_text):
+        """Stores a translation, pruning least recently used entries when over the cap."""
+        if not text or not translated_text:
+            return
+        self.import_entries([{
+            'source_text': text,
+            'source_lang': source_lang,
+            'target_lang': target_lang,
+            'translated_text': translated_text,
+        }])
+
+    def import_entries(self, entries):
+        """
+        Bulk-inserts translations.
+
+        Args:
+            entries (iterable): dicts with source_text, source_lang, target_lang and translated_text
+
+        Returns:
+            int: Number of entries written
+        """
+        now = time.time()
+        rows = [
+            (
+                self.make_hash(e['source_text'], e.get('source_lang'), e.get('target_lang')),
+                (e.get('source_lang') or "").upper(),
+                (e.get('target_lang') or "").upper(),
+                normalize_text(e['source_text']),
+                e['translated_text'],
+                e.get('last_used', now),
+            )
+            for e in entries
+            if e.get('source_text') and e.get('translated_text')
+        ]
+        if not rows:
+            return 0
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO translations "
+                    "(key_hash, source_lang, target_lang, source_text, translated_text, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.writes += self._conn.total_changes - before
+            # Replaced rows make this an upper bound; recount only when it crosses the threshold
+            self._count += len(rows)
+            if self._count > self._prune_threshold:
+                self._count = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+                if self._count > self._prune_threshold:
+                    self._prune_locked()
+        return len(rows)
+
+    def _prune_locked(self):
+        """Deletes least recently used entries down to max_entries. Caller holds the lock."""
+        excess = self._count - self.max_entries
+        if excess <= 0:
+            return
+        self._conn.execute(
+            "DELETE FROM translations WHERE key_hash IN "
+            "(SELECT key_hash FROM translations ORDER BY last_used ASC LIMIT ?)",
+            (excess,),
+        )
+        self._count -= excess
+        self.pruned += excess
+        logger.info(f"TranslationMemory pruned {excess} least recently used entries")
+
+    def export_entries(self, source_lang=None, target_lang=None):
+        """
+        Yields stored translations as dicts, optionally filtered by language pair.
+        """
+        query = "SELECT source_text, source_lang, target_lang, translated_text, last_used FROM translations"
+        conditions, params = [], []
+        if source_lang is not None:
+            conditions.append("source_lang = ?")
+            params.append(source_lang.upper())
+        if target_lang is not None:
+            conditions.append("target_lang = ?")
+            params.append(target_lang.upper())
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        for source_text, src, tgt, translated_text, last_used in rows:
+            yield {
+                'source_text': source_text,
+                'source_lang': src or None,
+                'target_lang': tgt,
+                'translated_text': translated_text,
+                'last_used': last_used,
+            }
+
+    def export_jsonl(self, path):
+        """Writes all entries to a JSON-lines file. Returns the number of entries written."""
+        count = 0
+        with open(path, 'w', encoding='utf-8') as f:
+            for entry in self.export_entries():
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                count += 1
+        return count
+
+    def import_jsonl(self, path):
+        """Loads entries from a JSON-lines file produced by export_jsonl()."""
+        with open(path, encoding='utf-8') as f:
+            return self.import_entries(json.loads(line) for line in f if line.strip())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self):
+        """Returns a snapshot of translation memory counters for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'path': self.path,
+                'entries': self._count,
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'writes': self.writes,
+                'pruned': self.pruned,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'avg_lookup_us': round(self._lookup_seconds / lookups * 1e6, 1) if lookups else 0.0,
+            }
@@ -0,0 +1,412 @@
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import deque
+
+import deepl
+import gevent
+import requests
+from gevent.event import Event
+
+from .resilience import (
+    AdaptiveConcurrencyLimiter,
+    CircuitBreaker,
+    CircuitOpenError,
+    ProviderUnavailableError,
+)
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+
+class TranslationProvider:
+    """
+    Base class for translation backends.
+
+    Providers receive already resolved DeepL-style language codes (e.g. 'LV',
+    'EN-US') and translate a list of texts in one request.
+    """
+
+    name = "base"
+
+    def translate_batch(self, texts, source_code, target_code):
+        """
+        Args:
+            texts (list): Texts to translate
+            source_code (str): DeepL source code, or None to auto-detect
+            target_code (str): DeepL target code
+
+        Returns:
+            list: Translated strings, in the same order as texts
+        """
+        raise NotImplementedError
+
+
+class DeepLProvider(TranslationProvider):
+    """DeepL API backend"""
+
+    name = "deepl"
+
+    def __init__(self, auth_key):
+        self.translator = deepl.Translator(auth_key=auth_key)
+
+    def translate_batch(self, texts, source_code, target_code):
+        results = self.translator.translate_text(
+            texts,
+            source_lang=source_code,
+            target_lang=target_code
+        )
+        return [result.text for result in results]
+
+
+class AzureTranslatorProvider(TranslationProvider):
+    """Azure AI Translator (REST API v3) backend"""
+
+    name = "azure"
+
+    # DeepL codes whose Azure Translator equivalent is not just the lowercase code
+    AZURE_CODES = {
+        'EN-US': 'en',
+        'EN-GB': 'en',
+        'PT': 'pt-pt',
+        'PT-PT': 'pt-pt',
+        'PT-BR': 'pt',
+        'ZH': 'zh-Hans',
+    }
+
+    def __init__(self, key, region=None, endpoint="https://api.cognitive.microsofttranslator.com", timeout=10):
+        self.key = key
+        self.region = region
+        self.url = endpoint.rstrip('/') + "/translate"
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    @classmethod
+    def _azure_code(cls, deepl_code):
+        if not deepl_code:
+            return None
+        return cls.AZURE_CODES.get(deepl_code.upper(), deepl_code.lower())
+
+    def translate_batch(self, texts, source_code, target_code):
+        params = {'api-version': '3.0', 'to': self._azure_code(target_code)}
+        if source_code:
+            params['from'] = self._azure_code(source_code)
+        headers = {
+            'Ocp-Apim-Subscription-Key': self.key,
+            'Content-Type': 'application/json',
+            'X-ClientTraceId': str(uuid.uuid4()),
+        }
+        if self.region:
+            headers['Ocp-Apim-Subscription-Region'] = self.region
+        response = self.session.post(
+            self.url,
+            params=params,
+            headers=headers,
+            json=[{'Text': text} for text in texts],
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return [item['translations'][0]['text'] for item in response.json()]
+
+
+class FakeTranslationProvider(TranslationProvider):
+    """
+    Offline provider with configurable latency and error rate.
+
+    Used for local development and to benchmark routing and hedging without
+    calling a real API.
+    """
+
+    def __init__(self, name="fake", latency_ms=100, jitter_ms=50, error_rate=0.0):
+        self.name = name
+        self.latency = max(0.0, float(latency_ms)) / 1000.0
+        self.jitter = max(0.0, float(jitter_ms)) / 1000.0
+        self.error_rate = max(0.0, min(1.0, float(error_rate)))
+
+    def translate_batch(self, texts, source_code, target_code):
+        gevent.sleep(self.latency + random.uniform(0, self.jitter))
+        if self.error_rate and random.random() < self.error_rate:
+            raise RuntimeError(f"{self.name}: simulated provider error")
+        return [f"[{target_code}] {text}" for text in texts]
+
+
+def is_overload_error(error):
+    """True if the provider is telling us to slow down (rate limiting, timeouts, 503)."""
+    if isinstance(error, (deepl.exceptions.TooManyRequestsException, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code in (429, 503)
+    return getattr(error, 'http_status_code', None) in (429, 503)
+
+
+def is_provider_failure(error):
+    """
+    True if the error reflects provider health rather than a bad request.
+
+    Invalid parameters (e.g. an unsupported language) must not open the circuit.
+    """
+    if isinstance(error, (ValueError, TypeError)):
+        return False
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500 or error.response.status_code in (401, 403, 429)
+    status = getattr(error, 'http_status_code', None)
+    if isinstance(error, deepl.exceptions.DeepLException) and status is not None:
+        return status >= 500 or status in (403, 429, 456)
+    return True
+
+
+class ProviderStats:
+    """Rolling latency and error statistics for one provider"""
+
+    def __init__(self, window=200):
+        self._latencies = deque(maxlen=window)
+        self._outcomes = deque(maxlen=window)  # True for success
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def record(self, latency, ok):
+        with self._lock:
+            self.requests += 1
+            self._outcomes.append(ok)
+            if ok:
+                self._latencies.append(latency)
+            else:
+                self.errors += 1
+
+    def percentile(self, pct):
+        with self._lock:
+            if not self._latencies:
+                return None
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    @property
+    def samples(self):
+        """Number of successful calls in the window (latency samples)."""
+        return len(self._latencies)
+
+    @property
+    def observations(self):
+        """Number of calls in the window, successful or not."""
+        return len(self._outcomes)
+
+    @property
+    def error_rate(self):
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return self._outcomes.count(False) / len(self._outcomes)
+
+    def snapshot(self):
+        p50 = self.percentile(50)
+        p95 = self.percentile(95)
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'error_rate': round(self.error_rate, 4),
+            'p50_ms': round(p50 * 1000, 1) if p50 is not None else None,
+            'p95_ms': round(p95 * 1000, 1) if p95 is not None else None,
+            'samples': self.samples,
+        }
+
+
+class ProviderRouter:
+    """
+    Routes translation batches across providers by observed latency and errors.
+
+    The healthiest provider is used as primary. With hedging enabled, if the
+    primary has not answered within its p95 latency, the next provider is
+    raced against it and the first successful answer wins.
+    """
+
+    def __init__(self, providers, hedging=True, hedge_default_delay_ms=800, hedge_min_delay_ms=50,
+                 min_samples=20, stats_window=200, breaker_options=None, limiter_options=None):
+        """
+        Args:
+            providers (list): TranslationProvider instances in configured preference order
+            hedging (bool): Whether to race a second provider against a slow primary
+            hedge_default_delay_ms (float): Hedge delay used until enough latency samples exist
+            hedge_min_delay_ms (float): Lower bound for the hedge delay
+            min_samples (int): Samples needed before p95 and routing decisions are trusted
+            stats_window (int): Number of recent calls kept per provider
+            breaker_options (dict): Keyword arguments for each provider's CircuitBreaker
+            limiter_options (dict): Keyword arguments for each provider's AdaptiveConcurrencyLimiter
+        """
+        if not providers:
+            raise ValueError("ProviderRouter needs at least one provider")
+        self.providers = list(providers)
+        self.hedging = bool(hedging) and len(self.providers) > 1
+        self.hedge_default_delay = max(0.0, float(hedge_default_delay_ms)) / 1000.0
+        self.hedge_min_delay = max(0.0, float(hedge_min_delay_ms)) / 1000.0
+        self.min_samples = max(1, int(min_samples))
+        self.stats = {provider.name: ProviderStats(stats_window) for provider in self.providers}
+        self.breakers = {
+            provider.name: CircuitBreaker(provider.name, **(breaker_options or {}))
+            for provider in self.providers
+        }
+        self.limiters = {
+            provider.name: AdaptiveConcurrencyLimiter(provider.name, **(limiter_options or {}))
+            for provider in self.providers
+        }
+
+        self.hedges_started = 0
+        self.hedges_won = 0
+
+        logger.info(f"ProviderRouter init - providers: {[p.name for p in self.providers]}, hedging: {self.hedging}")
+
+    def _score(self, provider):
+        stats = self.stats[provider.name]
+        if stats.observations < self.min_samples:
+            return None
+        p95 = stats.percentile(95)
+        if p95 is None:
+            p95 = self.hedge_default_delay  # Only failures in the window
+        # Penalize errors heavily: a provider failing half its calls looks 6x slower
+        return p95 * (1.0 + 10.0 * stats.error_rate)
+
+    def ranked_providers(self):
+        """
+        Providers ordered by health; unmeasured providers keep their configured order.
+        Providers whose circuit is open are left out.
+        """
+        def sort_key(indexed):
+            index, provider = indexed
+            score = self._score(provider)
+            return (score if score is not None else float('inf'), index)
+        available = [(i, p) for i, p in enumerate(self.providers) if self.breakers[p.name].is_available()]
+        return [provider for _, provider in sorted(available, key=sort_key)]
+
+    def hedge_delay(self, provider):
+        stats = self.stats[provider.name]
+        if stats.samples < self.min_samples:
+            return self.hedge_default_delay
+        return max(self.hedge_min_delay, stats.percentile(95))
+
+    def _call(self, provider, texts, source_code, target_code):
+        breaker = self.breakers[provider.name]
+        limiter = self.limiters[provider.name]
+        breaker.before_call()
+        try:
+            with limiter.acquire():
+                started = time.perf_counter()
+                try:
+                    result = provider.translate_batch(texts, source_code, target_code)
+                except Exception as e:
+                    self.stats[provider.name].record(time.perf_counter() - started, False)
+                    if is_overload_error(e):
+                        limiter.on_overload()
+                    if is_provider_failure(e):
+                        breaker.record_failure()
+                    else:
+                        breaker.record_ignored()
+                    raise
+        except ProviderUnavailableError:
+            breaker.record_ignored()
+            raise
+        latency = time.perf_counter() - started
+        self.stats[provider.name].record(latency, True)
+        limiter.on_success(latency)
+        breaker.record_success()
+        return result
+
+    def translate_batch(self, texts, source_code, target_code):
+        """Translates a batch with the best provider, hedging to the next one if it is slow."""
+        ranked = self.ranked_providers()
+        if not ranked:
+            raise CircuitOpenError("All translation providers are unavailable (circuits open)")
+        primary = ranked[0]
+        if not self.hedging or len(ranked) == 1:
+            try:
+                return self._call(primary, texts, source_code, target_code)
+            except Exception as e:
+                if len(ranked) == 1:
+                    raise
+                logger.warning(f"Provider {primary.name} failed ({e}); falling back to {ranked[1].name}")
+                return self._call(ranked[1], texts, source_code, target_code)
+
+        done = Event()
+        outcomes = []  # (provider, ok, value)
+
+        def _run(provider):
+            try:
+                outcomes.append((provider, True, self._call(provider, texts, source_code, target_code)))
+            except Exception as e:
+                outcomes.append((provider, False, e))
+            done.set()
+
+        running = [gevent.spawn(_run, primary)]
+        done.wait(self.hedge_delay(primary))
+        if not any(ok for _, ok, _ in outcomes):
+            # Primary is slow or has failed: race the next provider
+            secondary = ranked[1]
+            self.hedges_started += 1
+            logger.debug(f"Hedging {primary.name} with {secondary.name} for {source_code or 'auto'} -> {target_code}")
+            running.append(gevent.spawn(_run, secondary))
+
+        while True:
+            for provider, ok, value in outcomes:
+                if ok:
+                    if provider is not primary:
+                        self.hedges_won += 1
+                    return value
+            if len(outcomes) == len(running):
+                # Every started provider failed; surface the first error
+                raise outcomes[0][2]
+            done.clear()
+            done.wait()
+
+    def snapshot(self):
+        """Returns per-provider statistics and hedging counters for monitoring."""
+        return {
+            'order': [provider.name for provider in self.ranked_providers()],
+            'hedging': self.hedging,
+            'hedges_started': self.hedges_started,
+            'hedges_won': self.hedges_won,
+            'providers': {
+                name: dict(
+                    stats.snapshot(),
+                    circuit=self.breakers[name].snapshot(),
+                    limiter=self.limiters[name].snapshot(),
+                )
+                for name, stats in self.stats.items()
+            },
+        }
+
+
+def benchmark_router(router, requests_count=200, concurrency=20, texts_per_request=1):
+    """
+    Drives a router with synthetic traffic and reports end-to-end latency.
+
+    Intended for offline experiments with FakeTranslationProvider, e.g.:
+        router = ProviderRouter([FakeTranslationProvider('a', 100, 400), FakeTranslationProvider('b', 120, 30)])
+        benchmark_router(router)
+    """
+    from gevent.pool import Pool
+
+    latencies = []
+
+    def _one(i):
+        started = time.perf_counter()
+        try:
+            router.translate_batch([f"benchmark text {i}"] * texts_per_request, 'EN', 'DE')
+        except Exception:
+            return
+        latencies.append(time.perf_counter() - started)
+
+    Pool(concurrency).map(_one, range(requests_count))
+    latencies.sort()
+
+    def pct(p):
+        return round(latencies[min(len(latencies) - 1, int(p / 100.0 * len(latencies)))] * 1000, 1) if latencies else None
+
+    return {
+        'completed': len(latencies),
+        'p50_ms': pct(50),
+        'p95_ms': pct(95),
+        'p99_ms': pct(99),
+        'router': router.snapshot(),
+    }
@@ -1,13 +1,28 @@
 import os
 import logging
 import deepl
-import azure.cognitiveservices.speech as speechsdk
+from gevent.pool import Pool
+from .translation_cache import TranslationCache
+from .translation_batcher import TranslationBatcher
+from .single_flight import SingleFlight
+from .translation_memory import TranslationMemory
+from .translation_providers import (
+    AzureTranslatorProvider,
+    DeepLProvider,
+    FakeTranslationProvider,
+    ProviderRouter,
+)
+from .resilience import ProviderUnavailableError
+from .phrasebook import load_phrasebook
+from .rate_limiter import RateLimitExceeded, TranslationRateLimiter
+from app.utils.languages import deepl_source_code, deepl_target_code
+from app.utils.text import split_sentences
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
 class TranslationService:
-    """Service for translating text using DeepL or Azure"""
+    """Service for translating text using DeepL and/or Azure Translator"""
     
     def __init__(self, config=None):
         """Initialize the translation service with the given config"""
@@ -17,29 +32,101 @@ class TranslationService:
         self.azure_key = config.get('AZURE_SPEECH_KEY') or os.environ.get('AZURE_SPEECH_KEY')
         self.azure_region = config.get('AZURE_REGION') or os.environ.get('AZURE_REGION', 'westeurope')
         self.deepl_key = config.get('DEEPL_API_KEY') or os.environ.get('DEEPL_API_KEY')
+        self.azure_translator_key = config.get('AZURE_TRANSLATOR_KEY') or os.environ.get('AZURE_TRANSLATOR_KEY')
+        self.azure_translator_region = (config.get('AZURE_TRANSLATOR_REGION')
+                                        or os.environ.get('AZURE_TRANSLATOR_REGION')
+                                        or self.azure_region)
         
         # Log configuration (without exposing full keys)
         logger.info(f"TranslationService init - AZURE_SPEECH_KEY: {'Set' if self.azure_key else 'Not set'}")
         logger.info(f"TranslationService init - AZURE_REGION: {self.azure_region}")
         logger.info(f"TranslationService init - DEEPL_API_KEY: {'Set' if self.deepl_key else 'Not set'}")
+        logger.info(f"TranslationService init - AZURE_TRANSLATOR_KEY: {'Set' if self.azure_translator_key else 'Not set'}")
         
-        # Initialize DeepL translator if API key is provided
+        # Initialize the configured providers (in preference order)
         self.service_type = 'mock'  # Default to mock
-        self.translator = None
+        self.translator = None  # DeepL client, kept for direct access
+        self.providers = self._create_providers(config)
+        self.router = None
         
-        if self.deepl_key:
-            try:
-                self.translator = deepl.Translator(auth_key=self.deepl_key)
-                logger.info(f"Using DeepL for translation with key: {self.deepl_key[:4]}...")
-                self.service_type = 'deepl'
-            except Exception as e:
-                logger.error(f"Failed to initialize DeepL translator: {e}", exc_info=True)
-                self.translator = None
-        elif self.azure_key and self.azure_region:
-            self.service_type = 'azure'
-            logger.info("Using Azure for translation.")
+        if self.providers:
+            self.router = ProviderRouter(
+                self.providers,
+                hedging=config.get('TRANSLATION_HEDGING', True),
+                hedge_default_delay_ms=config.get('TRANSLATION_HEDGE_DEFAULT_DELAY_MS', 800),
+                hedge_min_delay_ms=config.get('TRANSLATION_HEDGE_MIN_DELAY_MS', 50),
+                breaker_options={
+                    'failure_threshold': config.get('TRANSLATION_BREAKER_FAILURE_THRESHOLD', 5),
+                    'reset_seconds': config.get('TRANSLATION_BREAKER_RESET_SECONDS', 30),
+                },
+                limiter_options={
+                    'initial_limit': config.get('TRANSLATION_LIMIT_INITIAL', 10),
+                    'min_limit': config.get('TRANSLATION_LIMIT_MIN', 1),
+                    'max_limit': config.get('TRANSLATION_LIMIT_MAX', 50),
+                    'max_wait_ms': config.get('TRANSLATION_LIMIT_MAX_WAIT_MS', 2000),
+                    'latency_threshold_ms': config.get('TRANSLATION_LIMIT_LATENCY_THRESHOLD_MS', 3000),
+                },
+            )
+            self.service_type = self.providers[0].name
+            logger.info(f"Using translation providers: {[p.name for p in self.providers]}")
         else:
             logger.warning("No translation service (DeepL or Azure) is fully configured.")
+
+        # Offline phrasebook: fallback when no provider is configured and exact-phrase pre-pass
+        self.phrasebook = load_phrasebook(config.get('PHRASEBOOK_PATH'))
+
+        # Cache of successful translations keyed on normalized text + resolved language codes
+        self.cache = TranslationCache(
+            max_entries=config.get('TRANSLATION_CACHE_MAX_ENTRIES', 5000),
+            ttl_seconds=config.get('TRANSLATION_CACHE_TTL_SECONDS', 3600),
+            max_bytes=config.get('TRANSLATION_CACHE_MAX_BYTES', 8 * 1024 * 1024),
+        )
+
+        # Persistent translation memory (SQLite) consulted after the in-process cache
+        self.memory = None
+        memory_path = config.get('TRANSLATION_MEMORY_PATH')
+        if memory_path:
+            try:
+                self.memory = TranslationMemory(
+                    memory_path,
+                    max_entries=config.get('TRANSLATION_MEMORY_MAX_ENTRIES', 200000),
+                )
+            except Exception as e:
+                logger.error(f"Failed to open translation memory at {memory_path}: {e}", exc_info=True)
+                self.memory = None
+
+        # Identical translations already in flight are shared instead of re-requested
+        self.single_flight = SingleFlight(name="translation")
+
+        # Coalesces concurrent requests for the same language pair into one provider call
+        self.batcher = TranslationBatcher(
+            self._provider_translate_batch,
+            window_ms=config.get('TRANSLATION_BATCH_WINDOW_MS', 5),
+            max_batch_size=config.get('TRANSLATION_BATCH_MAX_SIZE', 50),
+            result_timeout=config.get('TRANSLATION_BATCH_RESULT_TIMEOUT_SECONDS', 30),
+        )
+
+        # Character and request budgets per room and socket, checked before provider calls
+        self.rate_limiter = TranslationRateLimiter(
+            room_chars_per_minute=config.get('TRANSLATION_ROOM_CHARS_PER_MINUTE', 20000),
+            room_requests_per_minute=config.get('TRANSLATION_ROOM_REQUESTS_PER_MINUTE', 300),
+            sid_chars_per_minute=config.get('TRANSLATION_SID_CHARS_PER_MINUTE', 10000),
+            sid_requests_per_minute=config.get('TRANSLATION_SID_REQUESTS_PER_MINUTE', 120),
+        )
+        # Separate budgets for realtime partial translations, so frequent partials never
+        # leave a room or socket without budget for its final results
+        self.partial_rate_limiter = TranslationRateLimiter(
+            room_chars_per_minute=config.get('PARTIAL_TRANSLATION_ROOM_CHARS_PER_MINUTE', 40000),
+            room_requests_per_minute=config.get('PARTIAL_TRANSLATION_ROOM_REQUESTS_PER_MINUTE', 1200),
+            sid_chars_per_minute=config.get('PARTIAL_TRANSLATION_SID_CHARS_PER_MINUTE', 20000),
+            sid_requests_per_minute=config.get('PARTIAL_TRANSLATION_SID_REQUESTS_PER_MINUTE', 600),
+        )
+
+        # Upper bound on concurrent provider calls made by one translate_many() call
+        self.max_concurrency = max(1, int(config.get('TRANSLATION_MAX_CONCURRENCY', 8)))
+
+        # Texts longer than this are split into sentences and translated in parallel
+        self.segment_min_chars = int(config.get('TRANSLATION_SEGMENT_MIN_CHARS', 500))
         
         logger.info(f"Finished initializing TranslationService. Service type: {self.service_type}")
 
@@ -49,50 +136,148 @@ class TranslationService:
             return lang_code.split('-')[0].upper() # Take first part and uppercase
         return None # Return None if input is invalid
 
+    def _create_providers(self, config):
+        """Builds the provider list from TRANSLATION_PROVIDERS, skipping unconfigured ones."""
+        names = config.get('TRANSLATION_PROVIDERS', 'deepl,azure')
+        if isinstance(names, str):
+            names = [name.strip().lower() for name in names.split(',') if name.strip()]
+
+        providers = []
+        for name in names:
+            try:
+                if name == 'deepl' and self.deepl_key:
+                    provider = DeepLProvider(self.deepl_key)
+                    self.translator = provider.translator
+                    logger.info(f"Using DeepL for translation with key: {self.deepl_key[:4]}...")
+                elif name == 'azure' and self.azure_translator_key:
+                    provider = AzureTranslatorProvider(
+                        self.azure_translator_key,
+                        region=self.azure_translator_region,
+                        endpoint=config.get('AZURE_TRANSLATOR_ENDPOINT', 'https://api.cognitive.microsofttranslator.com'),
+                    )
+                    logger.info("Using Azure Translator for translation.")
+                elif name == 'fake':
+                    provider = FakeTranslationProvider(
+                        latency_ms=config.get('FAKE_TRANSLATION_LATENCY_MS', 100),
+                        jitter_ms=config.get('FAKE_TRANSLATION_JITTER_MS', 50),
+                        error_rate=config.get('FAKE_TRANSLATION_ERROR_RATE', 0.0),
+                    )
+                    logger.warning("Using the fake translation provider (offline testing only).")
+                else:
+                    continue
+            except Exception as e:
+                logger.error(f"Failed to initialize {name} translation provider: {e}", exc_info=True)
+                continue
+            providers.append(provider)
+        return providers
+
+    def _translate_cached(self, text, source_code, target_code, room_id=None, sid=None, partial=False):
+        """
+        Translates text with the configured providers using already resolved
+        (DeepL-style) language codes, serving repeated phrases from the
+        translation cache or the persistent translation memory and sharing
+        identical in-flight requests.
+
+        Cache misses are charged to the room_id / sid translation budgets, if given
+        (the separate partial-translation budgets if partial is set).
+
+        Raises provider exceptions (and RateLimitExceeded) to the caller; only
+        successful results are cached.
+        """
+        # Whole-text glossary phrases never need a provider round trip
+        if self.phrasebook:
+            phrase = self.phrasebook.lookup(text, source_code, target_code)
+            if phrase is not None:
+                return phrase
+
+        key = self.cache.make_key(text, source_code, target_code)
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.debug(f"Translation cache hit for {source_code or 'auto'} -> {target_code}")
+            return cached
+
+        if self.memory:
+            try:
+                remembered = self.memory.get(text, source_code, target_code)
+            except Exception as e:
+                logger.error(f"Translation memory lookup failed: {e}")
+                remembered = None
+            if remembered is not None:
+                self.cache.set(key, remembered)
+                return remembered
+
+        if room_id or sid:
+            rate_limiter = self.partial_rate_limiter if partial else self.rate_limiter
+            try:
+                rate_limiter.acquire(len(text), room_id=room_id, sid=sid)
+            except RateLimitExceeded as e:
+                stale = self.cache.get_stale(key)
+                if stale is not None:
+                    rate_limiter.record_degraded(room_id=room_id, sid=sid)
+                    logger.warning(f"{e}; serving stale cached translation")
+                    return stale
+                raise
+
+        def _fetch():
+            translated = self.batcher.translate(text, source_code, target_code)
+            self.cache.set(key, translated)
+            if self.memory:
+                try:
+                    self.memory.put(text, source_code, target_code, translated)
+                except Exception as e:
+                    logger.error(f"Translation memory write failed: {e}")
+            return translated
+
+        try:
+            return self.single_flight.do(key, _fetch)
+        except ProviderUnavailableError:
+            # Providers are shedding load or their circuits are open: serve a stale entry if we have one
+            stale = self.cache.get_stale(key)
+            if stale is not None:
+                logger.warning(f"Serving stale cached translation for {source_code or 'auto'} -> {target_code} (providers unavailable)")
+                return stale
+            raise
+
+    def get_stats(self):
+        """Returns translation service counters for monitoring."""
+        return {
+            'service_type': self.service_type,
+            'cache': self.cache.stats(),
+            'memory': self.memory.stats() if self.memory else None,
+            'phrasebook': self.phrasebook.stats() if self.phrasebook else None,
+            'single_flight': self.single_flight.stats(),
+            'rate_limits': self.rate_limiter.stats(),
+            'partial_rate_limits': self.partial_rate_limiter.stats(),
+            'batcher': self.batcher.stats(),
+            'providers': self.router.snapshot() if self.router else None,
+        }
+
+    def _provider_translate_batch(self, texts, source_code, target_code):
+        """Sends a list of texts to the best available provider in a single request."""
+        return self.router.translate_batch(texts, source_code, target_code)
+
     def _get_deepl_target_lang(self, lang_code):
         """
         Converts language code like 'en-US' to DeepL compatible format ('EN-US').
-        Handles potential variations.
+        Resolved through the shared language registry (memoized).
+        """
+        return deepl_target_code(lang_code)
+
+    def translate(self, text, source_lang, target_lang, room_id=None, sid=None, partial=False):
+        """
+        Translates text using the configured service.
+
+        Provider calls are charged to the room_id / sid budgets when given (the
+        partial-translation budgets if partial is set); an exhausted budget raises
+        RateLimitExceeded instead of returning a placeholder.
         """
-        if not lang_code:
-            return None
-        # DeepL generally uses uppercase country codes and supports variants.
-        # It accepts 'EN' but prefers 'EN-US'/'EN-GB' to avoid ambiguity/deprecation.
-        parts = lang_code.strip().split('-')
-        base_lang = parts[0].upper()
-        if len(parts) == 2:
-            country = parts[1].upper()
-            # For English, DeepL specifically wants EN-GB or EN-US
-            if base_lang == 'EN' and country in ['US', 'GB']:
-                return f"{base_lang}-{country}" # Return EN-US or EN-GB
-            # For Portuguese, PT-PT or PT-BR
-            if base_lang == 'PT' and country in ['PT', 'BR']:
-                 return f"{base_lang}-{country}" # Return PT-PT or PT-BR
-            # For Chinese, ZH-CN (Simplified) is common
-            if base_lang == 'ZH' and country == 'CN':
-                 return "ZH" # DeepL uses ZH for Simplified Chinese
-
-            # For other languages, DeepL might accept the full code or just the base.
-            # Let's try passing the full uppercase code first. Check DeepL docs for specifics.
-            # Example: 'lv-LV' -> 'LV-LV'. If this fails, try returning just base_lang.
-            return f"{base_lang}-{country}"
-        else:
-            # Handle base codes like 'en', 'lv'. Convert 'en' -> 'EN-US' (default) or 'EN-GB'.
-            if base_lang == 'EN':
-                logger.warning(f"Received base 'en' target code. Defaulting to 'EN-US'. Use 'en-US' or 'en-GB' for clarity.")
-                return "EN-US" # Or make this configurable?
-            # For others, return the uppercase base code.
-            return base_lang # e.g., 'lv' -> 'LV'
-
-    def translate(self, text, source_lang, target_lang):
-        """Translates text using the configured service."""
         if not text or not target_lang:
             logger.warning(f"Translation skipped: Text empty ({not text}), Target lang empty ({not target_lang})")
             return "" if text else "[No text to translate]" # Return empty if text was empty, else indicate missing target
 
         # --- Prepare language codes ---
         # Source language: DeepL often works best with auto-detect (None) or just the base code.
-        deepl_source_lang = source_lang.split('-')[0].upper() if source_lang else None
+        deepl_source_lang = deepl_source_code(source_lang)
         # Target language: Needs specific formatting.
         deepl_target_lang = self._get_deepl_target_lang(target_lang)
 
@@ -103,48 +288,106 @@ class TranslationService:
 
         logger.info(f"Translating text from {source_lang} ({deepl_source_lang or 'auto'}) to {target_lang} ({deepl_target_lang}) using {self.service_type} service")
 
-        if self.service_type == 'deepl' and self.translator:
+        if self.router:
             try:
-                # --- Use prepared DeepL codes ---
-                result = self.translator.translate_text(
-                    text,
-                    source_lang=deepl_source_lang, # Pass 'LV' or None
-                    target_lang=deepl_target_lang  # Pass 'EN-US', 'LV-LV', 'LV' etc.
-                )
+                # --- Use prepared DeepL-style codes ---
+                # Pass 'LV' or None as source, 'EN-US', 'LV' etc. as target
+                translated_text = self._translate_cached(text, deepl_source_lang, deepl_target_lang,
+                                                         room_id=room_id, sid=sid, partial=partial)
                 # --- End Use ---
-                translated_text = result.text
-                detected_source = result.detected_source_lang # This is just the base code, e.g., 'LV'
-                logger.info(f"DeepL translation successful. Detected source: {detected_source}. Result: {translated_text[:50]}...")
+                logger.info(f"Translation successful. Result: {translated_text[:50]}...")
                 return translated_text
+            except RateLimitExceeded:
+                raise
+            except ProviderUnavailableError as e:
+                # Failing fast while providers are unhealthy or saturated
+                logger.warning(f"Translation refused locally from {deepl_source_lang or 'auto'} to {deepl_target_lang}: {e}")
+                return f"[Translation temporarily unavailable: {e}]"
             except deepl.exceptions.DeepLException as e:
                 # Log the specific DeepL error
                 logger.error(f"DeepL API error during translation from {deepl_source_lang or 'auto'} to {deepl_target_lang}: {e}")
                 return f"[Translation error: {e}]"
             except Exception as e:
-                logger.error(f"Unexpected error during DeepL translation: {e}", exc_info=True)
+                logger.error(f"Unexpected error during translation: {e}", exc_info=True)
                 return "[Unexpected translation error]"
 
-        elif self.service_type == 'azure':
-            # --- Azure Translation Logic ---
-            # Ensure Azure logic also uses source_lang and target_lang correctly
-            logger.warning("Azure translation logic needs implementation or review.")
-            # Example structure (replace with actual Azure SDK calls)
-            try:
-                # azure_source = source_lang # Azure might need 'lv-LV'
-                # azure_target = target_lang # Azure might need 'en-US'
-                # translated_text = call_azure_translation(text, source=azure_source, target=azure_target)
-                # logger.info("Azure translation successful.")
-                # return translated_text
-                return "[Azure translation not implemented]" # Placeholder
-            except Exception as e:
-                logger.error(f"Error during Azure translation: {e}", exc_info=True)
-                return "[Azure translation error]"
-            # --- End Azure ---
-
         else:
+            # Zero-latency offline fallback from the phrasebook
+            offline = self._translate_offline(text, source_lang, target_lang)
+            if offline is not None:
+                return offline
             logger.warning("No translation service configured or available.")
             return "[Translation service not available]"
 
+    def _translate_offline(self, text, source_language, target_language):
+        """Translates known phrases with the phrasebook; None if nothing matched."""
+        if not self.phrasebook:
+            return None
+        translated, replacements = self.phrasebook.translate(text, source_language, target_language)
+        if not replacements:
+            return None
+        logger.info(f"Phrasebook translation ({replacements} phrases) to {target_language}: {translated[:50]}...")
+        return translated
+
+    def iter_translate_many(self, text, source_language, target_languages, room_id=None, sid=None, on_error=None,
+                            partial=False):
+        """
+        Translates text into several target languages concurrently.
+
+        Requests are issued through a bounded gevent pool, so all targets are
+        in flight at once instead of one DeepL round trip after another.
+
+        Args:
+            text (str): Text to translate
+            source_language (str): Source language code (e.g., 'lv-LV')
+            target_languages (list): Target language codes
+            room_id (str, optional): Room whose translation budget is charged
+            sid (str, optional): Socket whose translation budget is charged
+            on_error (callable, optional): fn(target_language, error) for targets
+                refused by the rate limiter; called from the iterating greenlet.
+                Such targets are not yielded.
+            partial (bool): Charge the partial-translation budgets instead of the regular ones
+
+        Yields:
+            tuple: (target_language, translated_text) in completion order
+        """
+        # Preserve order while dropping duplicates and empty codes
+        targets = [t for t in dict.fromkeys(target_languages or []) if t]
+        if not text or not targets:
+            return
+
+        def _translate_one(target_language):
+            if target_language == source_language:
+                return target_language, text, None
+            try:
+                return target_language, self.translate(text, source_language, target_language,
+                                                       room_id=room_id, sid=sid, partial=partial), None
+            except RateLimitExceeded as e:
+                logger.warning(f"Translation to {target_language} refused: {e}")
+                return target_language, None, e
+            except Exception as e:
+                logger.error(f"Error translating to {target_language}: {e}", exc_info=True)
+                return target_language, f"[Translation error: {e}]", None
+
+        pool = Pool(min(self.max_concurrency, len(targets)))
+        for target_language, translated, error in pool.imap_unordered(_translate_one, targets):
+            if error is not None:
+                if on_error:
+                    on_error(target_language, error)
+                continue
+            yield target_language, translated
+
+    def translate_many(self, text, source_language, target_languages, room_id=None, sid=None, on_error=None,
+                       partial=False):
+        """
+        Translates text into several target languages concurrently and waits for all of them.
+
+        Returns:
+            dict: Mapping of target language code to translated text (rate-limited targets are omitted)
+        """
+        return dict(self.iter_translate_many(text, source_language, target_languages,
+                                             room_id=room_id, sid=sid, on_error=on_error, partial=partial))
+
     def translate_text(self, text, target_language, source_language=None):
         """
         Translate text to the target language.
@@ -162,43 +405,93 @@ class TranslationService:
         
         # Convert language codes to format expected by DeepL
         target_lang_code = self._convert_language_code(target_language)
-        source_lang_code = self._convert_language_code(source_language) if source_language else None
+        source_lang_code = self._convert_language_code(source_language, is_source=True) if source_language else None
         
         try:
             logger.info(f"Translating text from {source_language} ({source_lang_code}) to {target_language} ({target_lang_code}) using {self.service_type} service")
             
-            if self.service_type == "deepl":
-                # For DeepL, we need to simplify source language codes
-                # DeepL only accepts basic language codes for source_lang (e.g., 'EN', not 'EN-US')
+            if self.router:
+                # Providers take DeepL-style codes; source codes are base codes only (e.g., 'EN', not 'EN-US')
                 if source_lang_code and '-' in source_lang_code:
                     source_lang_code = source_lang_code.split('-')[0]
                 
-                # Log the exact parameters being sent to DeepL
-                logger.debug(f"DeepL API request parameters: target_lang={target_lang_code}, source_lang={source_lang_code}")
+                # Log the exact parameters being sent to the provider
+                logger.debug(f"Translation request parameters: target_lang={target_lang_code}, source_lang={source_lang_code}")
                 
-                # DeepL API call
-                result = self.translator.translate_text(
-                    text,
-                    target_lang=target_lang_code,
-                    source_lang=source_lang_code
-                )
-                return result.text
+                # Long texts are translated sentence by sentence in parallel
+                if len(text) > self.segment_min_chars:
+                    return self.join_segments(self.iter_translate_segments(text, target_language, source_language))
+
+                # Provider call (served from the cache when possible)
+                return self._translate_cached(text, source_lang_code, target_lang_code)
             else:
-                # Azure translation or other service
-                # ... existing code ...
-                pass
+                # No provider configured: offline phrasebook (None if nothing matched)
+                return self._translate_offline(text, source_language, target_language)
                 
         except Exception as e:
-            error_msg = f"DeepL API error during translation from {source_lang_code} to {target_lang_code}: {str(e)}"
+            error_msg = f"Translation API error during translation from {source_lang_code} to {target_lang_code}: {str(e)}"
             logger.error(error_msg)
             return f"[Translation error: {str(e)}]"
 
-    def _convert_language_code(self, language_code):
+    def iter_translate_segments(self, text, target_language, source_language=None):
+        """
+        Splits text into sentences and translates them concurrently.
+
+        Each segment goes through the cache, translation memory and batcher
+        individually, so known sentences are reused and a failing segment
+        does not lose the rest of the text.
+
+        Args:
+            text (str): Text to translate
+            target_language (str): Target language code
+            source_language (str, optional): Source language code
+
+        Yields:
+            dict: {'index', 'source', 'translation', 'separator', 'error'} in completion order
+        """
+        segments = split_sentences(text)
+        if not segments:
+            return
+
+        if not self.router:
+            yield {'index': 0, 'source': text, 'translation': self.translate_text(text, target_language),
+                   'separator': '', 'error': False}
+            return
+
+        target_lang_code = self._convert_language_code(target_language)
+        source_lang_code = self._convert_language_code(source_language, is_source=True) if source_language else None
+
+        def _translate_segment(index):
+            segment, separator = segments[index]
+            result = {'index': index, 'source': segment, 'separator': separator, 'error': False}
+            if not segment.strip():
+                result['translation'] = segment
+                return result
+            try:
+                result['translation'] = self._translate_cached(segment, source_lang_code, target_lang_code)
+            except Exception as e:
+                logger.error(f"Error translating segment {index} to {target_lang_code}: {e}")
+                result['translation'] = f"[Translation error: {e}]"
+                result['error'] = True
+            return result
+
+        pool = Pool(min(self.max_concurrency, len(segments)))
+        for result in pool.imap_unordered(_translate_segment, range(len(segments))):
+            yield result
+
+    @staticmethod
+    def join_segments(segment_results):
+        """Stitches segment results back together in their original order."""
+        ordered = sorted(segment_results, key=lambda r: r['index'])
+        return "".join(r['translation'] + r['separator'] for r in ordered)
+
+    def _convert_language_code(self, language_code, is_source=False):
         """
         Convert language code to the format expected by the translation service.
         
         Args:
             language_code (str): Language code or name to convert
+            is_source (bool): Whether the code is used as the source language
             
         Returns:
             str: Converted language code
@@ -206,94 +499,10 @@ class TranslationService:
         if not language_code:
             return None
         
-        if self.service_type == "deepl":
-            # Map of language codes and names for DeepL
-            deepl_lang_map = {
-                # ISO codes
-                'en': 'EN',
-                'en-us': 'EN',  # Simplified to just 'EN' for DeepL
-                'en-gb': 'EN',  # Simplified to just 'EN' for DeepL
-                'de': 'DE',
-                'fr': 'FR',
-                'es': 'ES',
-                'it': 'IT',
-                'nl': 'NL',
-                'pl': 'PL',
-                'pt': 'PT',
-                'pt-br': 'PT-BR',
-                'pt-pt': 'PT-PT',
-                'ru': 'RU',
-                'ja': 'JA',
-                'zh': 'ZH',
-                'lv': 'LV',
-                'lv-lv': 'LV',
-                'lt': 'LT',
-                'lt-lt': 'LT',
-                'bg': 'BG',
-                'cs': 'CS',
-                'da': 'DA',
-                'el': 'EL',
-                'et': 'ET',
-                'fi': 'FI',
-                'hu': 'HU',
-                'id': 'ID',
-                'ko': 'KO',
-                'nb': 'NB',
-                'ro': 'RO',
-                'sk': 'SK',
-                'sl': 'SL',
-                'sv': 'SV',
-                'tr': 'TR',
-                'uk': 'UK',
-                
-                # Language names
-                'english': 'EN',
-                'german': 'DE',
-                'french': 'FR',
-                'spanish': 'ES',
-                'italian': 'IT',
-                'dutch': 'NL',
-                'polish': 'PL',
-                'portuguese': 'PT',
-                'russian': 'RU',
-                'japanese': 'JA',
-                'chinese': 'ZH',
-                'latvian': 'LV',
-                'lithuanian': 'LT',
-                'bulgarian': 'BG',
-                'czech': 'CS',
-                'danish': 'DA',
-                'greek': 'EL',
-                'estonian': 'ET',
-                'finnish': 'FI',
-                'hungarian': 'HU',
-                'indonesian': 'ID',
-                'korean': 'KO',
-                'norwegian': 'NB',
-                'romanian': 'RO',
-                'slovak': 'SK',
-                'slovenian': 'SL',
-                'swedish': 'SV',
-                'turkish': 'TR',
-                'ukrainian': 'UK'
-            }
-            
-            # Normalize to lowercase for lookup
-            normalized = language_code.lower()
-            
-            # Try the full code or name first
-            if normalized in deepl_lang_map:
-                return deepl_lang_map[normalized]
-            
-            # Try just the language part (before the hyphen)
-            if '-' in normalized:
-                lang_part = normalized.split('-')[0]
-                if lang_part in deepl_lang_map:
-                    return deepl_lang_map[lang_part]
-            
-            # Log warning for unmapped languages
-            logger.warning(f"No mapping found for language code/name: {language_code}, using as is")
-            return language_code
+        if self.router:
+            # Codes and names are resolved through the shared language registry
+            # (all providers take DeepL-style codes)
+            return deepl_source_code(language_code) if is_source else deepl_target_code(language_code)
         
         # For other services, return as is or implement specific conversion
         return language_code
@@ -2,6 +2,8 @@ import os
 import logging
 import azure.cognitiveservices.speech as speechsdk
 import uuid
+from app.utils.languages import DEFAULT_VOICE, default_voice
+from app.services.sdk_executor import get_sdk_executor
 
 logger = logging.getLogger(__name__)
 
@@ -15,64 +17,20 @@ class TTSService:
         
         if not self.speech_key:
             logger.warning("Azure Speech Key not found in environment variables")
-        
-        # Map of language codes to voice names
-        # This can be expanded with more voices as needed
-        self.voice_map = {
-            'en': 'en-US-JennyNeural',
-            'en-us': 'en-US-JennyNeural',
-            'en-gb': 'en-GB-SoniaNeural',
-            'fr': 'fr-FR-DeniseNeural',
-            'es': 'es-ES-ElviraNeural',
-            'de': 'de-DE-KatjaNeural',
-            'it': 'it-IT-ElsaNeural',
-            'ja': 'ja-JP-NanamiNeural',
-            'ko': 'ko-KR-SunHiNeural',
-            'pt': 'pt-PT-RaquelNeural',
-            'ru': 'ru-RU-SvetlanaNeural',
-            'zh': 'zh-CN-XiaoxiaoNeural',
-            'nl': 'nl-NL-ColetteNeural',
-            'pl': 'pl-PL-AgnieszkaNeural',
-            'lv': 'lv-LV-EveritaNeural',
-            'lt': 'lt-LT-OnaNeural',
-            'bg': 'bg-BG-KalinaNeural',
-            'cs': 'cs-CZ-VlastaNeural',
-            'da': 'da-DK-ChristelNeural',
-            'el': 'el-GR-AthinaNeural',
-            'et': 'et-EE-AnuNeural',
-            'fi': 'fi-FI-NooraNeural',
-            'hu': 'hu-HU-NoemiNeural',
-            'id': 'id-ID-GadisNeural',
-            'nb': 'nb-NO-IselinNeural',
-            'ro': 'ro-RO-AlinaNeural',
-            'sk': 'sk-SK-ViktoriaNeural',
-            'sl': 'sl-SI-PetraNeural',
-            'sv': 'sv-SE-SofieNeural',
-            'tr': 'tr-TR-EmelNeural',
-            'uk': 'uk-UA-PolinaNeural'
-        }
     
     def _get_voice_name(self, language_code):
         """Get the appropriate voice name for a language code."""
         if not language_code:
-            return 'en-US-JennyNeural'  # Default voice
-        
-        # Normalize to lowercase
-        normalized = language_code.lower()
-        
-        # Check if we have a direct mapping
-        if normalized in self.voice_map:
-            return self.voice_map[normalized]
+            return DEFAULT_VOICE  # Default voice
         
-        # Try just the language part (before the hyphen)
-        if '-' in normalized:
-            lang_part = normalized.split('-')[0]
-            if lang_part in self.voice_map:
-                return self.voice_map[lang_part]
+        # Voices come from the shared language registry
+        voice_name = default_voice(language_code, default=None)
+        if voice_name:
+            return voice_name
         
         # If no mapping found, use default
         logger.warning(f"No voice mapping found for language code: {language_code}, using default")
-        return 'en-US-JennyNeural'
+        return DEFAULT_VOICE
     
     def text_to_speech(self, text, language_code, output_dir="temp_audio"):
         """
@@ -125,8 +83,8 @@ class TTSService:
             
             logger.info(f"Starting TTS for language: {language_code} using voice: {voice_name}")
             
-            # Synthesize speech
-            result = synthesizer.speak_text_async(text).get()
+            # Synthesize speech (waits on a pool thread, not on the gevent hub)
+            result = get_sdk_executor().wait(synthesizer.speak_text_async(text))
             
             # Check result
             if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
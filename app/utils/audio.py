@@ -1,4 +1,32 @@
+import base64
+import itertools
+import logging
+import math
+import os
+import struct
 import subprocess
+import threading
+import time
+from collections import namedtuple
+
+import gevent
+import numpy as np
+from gevent import subprocess as gsubprocess
+from gevent.queue import Queue
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# PCM layout expected by Azure Speech push streams by default
+SPEECH_SAMPLE_RATE = 16000
+SPEECH_CHANNELS = 1
+SPEECH_SAMPLE_WIDTH = 2
+
+WavAudio = namedtuple('WavAudio', ['sample_rate', 'channels', 'bits_per_sample', 'data'])
+
+_WAVE_FORMAT_PCM = 1
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
 
 def convert_to_wav(input_path, output_path):
     """
@@ -9,4 +37,1019 @@ def convert_to_wav(input_path, output_path):
         "ffmpeg", "-y", "-i", input_path,
         "-ar", "16000", "-ac", "1", "-f", "wav", output_path
     ]
-    subprocess.run(command, check=True) 
\ No newline at end of file
+    subprocess.run(command, check=True)
+
+
+class TranscodeError(Exception):
+    """ffmpeg could not be started or failed to decode the input."""
+
+
+def ffmpeg_pcm_command(input_format=None, sample_rate=SPEECH_SAMPLE_RATE, channels=SPEECH_CHANNELS, low_latency=False):
+    """ffmpeg arguments that decode stdin and write raw 16-bit PCM to stdout."""
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin"]
+    if low_latency:
+        # Start decoding as soon as the container header is in, and flush output per packet
+        command += ["-fflags", "nobuffer", "-probesize", "4096", "-analyzeduration", "0"]
+    if input_format:
+        command += ["-f", input_format]
+    command += ["-i", "pipe:0", "-vn", "-ac", str(channels), "-ar", str(sample_rate),
+                "-f", "s16le", "-acodec", "pcm_s16le"]
+    if low_latency:
+        command += ["-flush_packets", "1"]
+    return command + ["pipe:1"]
+
+
+def transcode_stream(chunks, input_format=None, sample_rate=SPEECH_SAMPLE_RATE, channels=SPEECH_CHANNELS,
+                     read_size=16 * 1024, command=None):
+    """
+    Decodes audio through an ffmpeg pipe, yielding PCM as soon as ffmpeg produces it.
+
+    Input chunks are written to ffmpeg's stdin by a separate greenlet while
+    stdout is read here, so neither the input nor the output is ever held in
+    memory as a whole and nothing touches the filesystem.
+
+    Args:
+        chunks (iterable): Encoded audio as bytes-like chunks (e.g., an upload stream)
+        input_format (str, optional): ffmpeg input format if it cannot be probed (e.g., 'webm')
+        sample_rate (int): Output sample rate
+        channels (int): Output channel count
+        read_size (int): Maximum bytes read from ffmpeg per iteration
+        command (list, optional): Overrides the ffmpeg command line
+
+    Yields:
+        bytes: 16-bit little-endian PCM
+
+    Raises:
+        TranscodeError: if ffmpeg is missing or exits with an error
+    """
+    command = command or ffmpeg_pcm_command(input_format, sample_rate, channels)
+    try:
+        # gevent's subprocess keeps pipe I/O cooperative even without monkey patching
+        process = gsubprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError as e:
+        raise TranscodeError(f"Could not start ffmpeg: {e}")
+
+    def _feed():
+        try:
+            for chunk in chunks:
+                if chunk:
+                    process.stdin.write(chunk)
+        except (BrokenPipeError, OSError, ValueError):
+            # ffmpeg exited early; its exit status tells us why
+            pass
+        finally:
+            try:
+                process.stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+
+    last_error_line = []
+
+    def _drain_stderr():
+        # Read as it arrives so ffmpeg never blocks on a full stderr pipe; only the last line is kept
+        try:
+            for line in process.stderr:
+                line = line.decode('utf-8', 'replace').strip()
+                if line:
+                    last_error_line[:] = [line]
+        except (OSError, ValueError):
+            pass
+
+    writer = gevent.spawn(_feed)
+    stderr_reader = gevent.spawn(_drain_stderr)
+    completed = False
+    try:
+        while True:
+            data = process.stdout.read1(read_size) if hasattr(process.stdout, 'read1') else process.stdout.read(read_size)
+            if not data:
+                break
+            yield data
+        writer.join()
+        returncode = process.wait()
+        stderr_reader.join()
+        if returncode != 0:
+            raise TranscodeError(f"ffmpeg exited with {returncode}: "
+                                 f"{last_error_line[0] if last_error_line else 'no output'}")
+        completed = True
+    finally:
+        if not completed:
+            writer.kill(block=False)
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            stderr_reader.kill(block=False)
+        for pipe in (process.stdout, process.stderr):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+
+
+def _process_cpu_seconds(pid):
+    """User + system CPU time of a running process from /proc (None where unavailable)."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class PersistentTranscoder:
+    """
+    One long-lived ffmpeg process decoding a continuous compressed stream
+    (e.g., MediaRecorder WebM/Opus chunks) into 16kHz mono 16-bit PCM.
+
+    Container state stays inside the single ffmpeg process, so chunks that are
+    not independently decodable (every WebM chunk after the first) can be fed
+    as they arrive. write() only queues the chunk; a writer greenlet feeds
+    ffmpeg and a reader greenlet passes decoded PCM to sink as it is produced.
+    """
+
+    def __init__(self, sink, input_format='webm', sample_rate=SPEECH_SAMPLE_RATE, channels=SPEECH_CHANNELS,
+                 read_size=3200, max_buffered_bytes=2 * 1024 * 1024, command=None, name='transcoder'):
+        """
+        Args:
+            sink (callable): fn(pcm_bytes) called from the reader greenlet
+            input_format (str): ffmpeg input format of the chunks ('webm', 'ogg', ...)
+            sample_rate (int): Output sample rate
+            channels (int): Output channel count
+            read_size (int): Maximum PCM bytes handed to sink at once (3200 = 100ms at 16kHz)
+            max_buffered_bytes (int): Input backlog above which write() refuses chunks
+            command (list, optional): Overrides the ffmpeg command line
+            name (str): Label used in log messages
+        """
+        self.sink = sink
+        self.read_size = max(1, int(read_size))
+        self.max_buffered_bytes = max(0, int(max_buffered_bytes))
+        self.sample_rate = int(sample_rate)
+        self.channels = int(channels)
+        self.name = name
+        self.command = command or ffmpeg_pcm_command(input_format, sample_rate, channels, low_latency=True)
+
+        self._process = None
+        self._queue = Queue()
+        self._writer = None
+        self._reader = None
+        self._stderr_reader = None
+        self._last_stderr_line = None
+        self._closed = False
+        self._started_at = None
+        self._cpu_seconds = None
+
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.chunks_in = 0
+        self.buffered_bytes = 0
+        self.peak_buffered_bytes = 0
+        self.rejected_chunks = 0
+        self.sink_errors = 0
+        self.error = None
+
+    def start(self):
+        """Starts ffmpeg; raises TranscodeError if it cannot be launched."""
+        try:
+            self._process = gsubprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                              stderr=subprocess.PIPE)
+        except OSError as e:
+            raise TranscodeError(f"Could not start ffmpeg: {e}")
+        self._started_at = time.monotonic()
+        self._writer = gevent.spawn(self._write_loop)
+        self._reader = gevent.spawn(self._read_loop)
+        self._stderr_reader = gevent.spawn(self._stderr_loop)
+        logger.info(f"[{self.name}] Transcoder started (pid {self._process.pid})")
+        return self
+
+    @property
+    def running(self):
+        return self._process is not None and self._process.poll() is None and not self._closed
+
+    def write(self, chunk):
+        """
+        Queues a compressed chunk for decoding.
+
+        Returns:
+            bool: False if the transcoder is closed or its backlog is full
+        """
+        if not chunk:
+            return True
+        if not self.running:
+            return False
+        if self.max_buffered_bytes and self.buffered_bytes + len(chunk) > self.max_buffered_bytes:
+            self.rejected_chunks += 1
+            return False
+        self.chunks_in += 1
+        self.buffered_bytes += len(chunk)
+        self.peak_buffered_bytes = max(self.peak_buffered_bytes, self.buffered_bytes)
+        self._queue.put(chunk)
+        return True
+
+    def _write_loop(self):
+        stdin = self._process.stdin
+        try:
+            for chunk in self._queue:
+                if chunk is None:
+                    break
+                stdin.write(chunk)
+                stdin.flush()
+                self.buffered_bytes -= len(chunk)
+                self.bytes_in += len(chunk)
+        except (BrokenPipeError, OSError, ValueError) as e:
+            self.error = self.error or f"ffmpeg input closed: {e}"
+        finally:
+            try:
+                stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+
+    def _read_loop(self):
+        stdout = self._process.stdout
+        read = stdout.read1 if hasattr(stdout, 'read1') else stdout.read
+        while True:
+            cpu = _process_cpu_seconds(self._process.pid)
+            if cpu is not None:
+                self._cpu_seconds = cpu
+            try:
+                data = read(self.read_size)
+            except (OSError, ValueError):
+                break
+            if not data:
+                break
+            self.bytes_out += len(data)
+            try:
+                self.sink(data)
+            except Exception as e:
+                self.sink_errors += 1
+                logger.error(f"[{self.name}] Transcoder sink failed: {e}")
+
+    def _stderr_loop(self):
+        # Drained continuously so ffmpeg never blocks on a full stderr pipe; only the
+        # last line is kept for the error message
+        try:
+            for line in self._process.stderr:
+                line = line.decode('utf-8', 'replace').strip()
+                if line:
+                    self._last_stderr_line = line
+        except (OSError, ValueError):
+            pass
+
+    def close(self, timeout=2.0):
+        """
+        Flushes queued input, lets ffmpeg emit the remaining PCM and stops it.
+        The process is killed if it has not exited within timeout seconds.
+        """
+        if self._process is None or self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join(timeout)
+        self._reader.join(timeout)
+        if self._process.poll() is None:
+            logger.warning(f"[{self.name}] ffmpeg did not exit in {timeout}s; killing it")
+            self._process.kill()
+        self._writer.kill(block=False)
+        self._reader.kill(block=False)
+        returncode = self._process.wait()
+        self._stderr_reader.join(timeout)
+        self._stderr_reader.kill(block=False)
+        for pipe in (self._process.stdout, self._process.stderr):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+        if returncode not in (0, -9) and self._last_stderr_line:
+            self.error = self.error or self._last_stderr_line
+        logger.info(f"[{self.name}] Transcoder stopped (exit {returncode}): {self.stats()}")
+
+    def stats(self):
+        uptime = time.monotonic() - self._started_at if self._started_at else 0.0
+        audio_seconds = self.bytes_out / float(self.sample_rate * self.channels * SPEECH_SAMPLE_WIDTH)
+        return {
+            'running': self.running,
+            'chunks_in': self.chunks_in,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'audio_seconds': round(audio_seconds, 3),
+            'buffered_bytes': self.buffered_bytes,
+            'peak_buffered_bytes': self.peak_buffered_bytes,
+            'rejected_chunks': self.rejected_chunks,
+            'sink_errors': self.sink_errors,
+            'cpu_seconds': round(self._cpu_seconds, 3) if self._cpu_seconds is not None else None,
+            'cpu_percent': round(100.0 * self._cpu_seconds / uptime, 2) if self._cpu_seconds is not None and uptime else None,
+            'uptime_seconds': round(uptime, 3),
+            'error': self.error,
+        }
+
+
+class JitterBuffer:
+    """
+    Smooths streamed PCM into evenly paced, fixed-duration frames for a push stream.
+
+    Clients deliver audio in messages of arbitrary size and at uneven
+    intervals. write() only appends to the buffer. A dedicated greenlet wakes
+    once per frame interval and, once target_depth_ms of audio is buffered,
+    releases one frame per tick, so a network burst reaches the SDK at the
+    pace it was spoken. When the backlog grows beyond the target, at most
+    max_catchup_frames extra frames go out per tick to drain it gradually.
+
+    The target depth grows to the largest message seen (up to
+    MAX_TARGET_DEPTH_MS), so clients sending e.g. 250ms chunks do not drain the
+    buffer between messages. An underrun is counted when the buffer runs dry
+    while playing; it then waits for the target depth again. An overrun is
+    counted when the backlog exceeds max_depth_ms. The oldest frames are then
+    dropped, because late captions are worth less than current ones.
+    """
+
+    # Upper bound for the adaptive target depth, so a one-off burst does not add lasting latency
+    MAX_TARGET_DEPTH_MS = 500
+
+    def __init__(self, sink, frame_ms=100, sample_rate=SPEECH_SAMPLE_RATE, channels=SPEECH_CHANNELS,
+                 max_depth_ms=2000, target_depth_ms=200, max_catchup_frames=1, name='jitter'):
+        """
+        Args:
+            sink (callable): fn(pcm_bytes) receiving whole frames (e.g., audio_stream.write)
+            frame_ms (int): Frame duration in milliseconds
+            sample_rate (int): PCM sample rate
+            channels (int): PCM channel count
+            max_depth_ms (int): Backlog above which the oldest audio is dropped
+            target_depth_ms (int): Audio buffered before playout starts (and kept while playing)
+            max_catchup_frames (int): Extra frames released per tick while above the target depth
+            name (str): Label used in log messages
+        """
+        self.sink = sink
+        self.frame_ms = max(10, int(frame_ms))
+        self.frame_bytes = int(sample_rate * self.frame_ms / 1000) * SPEECH_SAMPLE_WIDTH * channels
+        self.max_depth_bytes = max(self.frame_bytes, int(sample_rate * max_depth_ms / 1000) * SPEECH_SAMPLE_WIDTH * channels)
+        self.max_catchup_frames = max(0, int(max_catchup_frames))
+        self._target_limit = max(self.frame_bytes, self._whole_frames(min(
+            self.max_depth_bytes // 2,
+            int(sample_rate * max(target_depth_ms, self.MAX_TARGET_DEPTH_MS) / 1000) * SPEECH_SAMPLE_WIDTH * channels)))
+        self.target_depth_bytes = min(self._target_limit, max(
+            self.frame_bytes, self._whole_frames(int(sample_rate * target_depth_ms / 1000) * SPEECH_SAMPLE_WIDTH * channels)))
+        self.name = name
+
+        self._buffer = bytearray()
+        self._closed = False
+        self._playing = False
+
+        self.bytes_in = 0
+        self.messages_in = 0
+        self.frames_out = 0
+        self.writes = 0
+        self.underruns = 0
+        self.overruns = 0
+        self.dropped_bytes = 0
+        self.peak_depth_bytes = 0
+        self.sink_errors = 0
+
+        self._greenlet = gevent.spawn(self._run)
+
+    @property
+    def depth_ms(self):
+        return len(self._buffer) * self.frame_ms // self.frame_bytes
+
+    def _whole_frames(self, size):
+        return -(-size // self.frame_bytes) * self.frame_bytes
+
+    def write(self, pcm):
+        """Appends PCM to the buffer; returns False once the buffer is closed."""
+        if self._closed:
+            return False
+        if not pcm:
+            return True
+        self._buffer += pcm
+        self.bytes_in += len(pcm)
+        self.messages_in += 1
+        # Keep at least one client message in reserve so the gaps between messages are covered
+        if len(pcm) > self.target_depth_bytes:
+            self.target_depth_bytes = min(self._target_limit, self._whole_frames(len(pcm)))
+        excess = len(self._buffer) - self.max_depth_bytes
+        if excess > 0:
+            # Drop whole frames from the front so the remaining audio stays frame-aligned
+            drop = -(-excess // self.frame_bytes) * self.frame_bytes
+            del self._buffer[:drop]
+            self.overruns += 1
+            self.dropped_bytes += drop
+            logger.warning(f"[{self.name}] Jitter buffer overrun; dropped {drop * self.frame_ms // self.frame_bytes}ms of audio")
+        self.peak_depth_bytes = max(self.peak_depth_bytes, len(self._buffer))
+        return True
+
+    def _emit(self, size):
+        chunk = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        try:
+            self.sink(chunk)
+        except Exception as e:
+            self.sink_errors += 1
+            logger.error(f"[{self.name}] Jitter buffer sink failed: {e}")
+        self.writes += 1
+
+    def _run(self):
+        interval = self.frame_ms / 1000.0
+        next_tick = time.monotonic()
+        while not self._closed:
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay < -interval:
+                # Fell behind (busy hub); resynchronise instead of bursting to catch up
+                next_tick = time.monotonic()
+                delay = 0
+            gevent.sleep(max(0.0, delay))
+            if self._closed:
+                break
+            frames = len(self._buffer) // self.frame_bytes
+            if not self._playing:
+                if len(self._buffer) < self.target_depth_bytes:
+                    continue
+                self._playing = True
+            if not frames:
+                self.underruns += 1
+                self._playing = False
+                continue
+            # One frame per tick, plus a bounded catch-up while the backlog is above the target
+            surplus = (len(self._buffer) - self.target_depth_bytes) // self.frame_bytes
+            release = min(frames, 1 + max(0, min(self.max_catchup_frames, surplus)))
+            self.frames_out += release
+            self._emit(release * self.frame_bytes)
+
+    def close(self):
+        """Stops the writer greenlet and flushes what is left, including a partial frame."""
+        if self._closed:
+            return
+        self._closed = True
+        self._greenlet.kill(block=True)
+        if self._buffer:
+            self.frames_out += -(-len(self._buffer) // self.frame_bytes)
+            self._emit(len(self._buffer))
+
+    def stats(self):
+        return {
+            'frame_ms': self.frame_ms,
+            'target_depth_ms': self.target_depth_bytes * self.frame_ms // self.frame_bytes,
+            'depth_ms': self.depth_ms,
+            'peak_depth_ms': self.peak_depth_bytes * self.frame_ms // self.frame_bytes,
+            'messages_in': self.messages_in,
+            'bytes_in': self.bytes_in,
+            'frames_out': self.frames_out,
+            'writes': self.writes,
+            'underruns': self.underruns,
+            'overruns': self.overruns,
+            'dropped_ms': self.dropped_bytes * self.frame_ms // self.frame_bytes,
+            'sink_errors': self.sink_errors,
+        }
+
+
+def _wav_layout(view):
+    """
+    Walks the RIFF chunks of a PCM WAV header.
+
+    Returns:
+        tuple: ((sample_rate, channels, bits_per_sample), data offset, declared data size or None
+        if the encoder left a placeholder), or None if this is not uncompressed integer PCM or
+        the data chunk is not within view
+    """
+    if len(view) < 12 or view[0:4] != b'RIFF' or view[8:12] != b'WAVE':
+        return None
+
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(view):
+        chunk_id = bytes(view[offset:offset + 4])
+        chunk_size = struct.unpack_from('<I', view, offset + 4)[0]
+        body = offset + 8
+        if chunk_id == b'fmt ' and chunk_size >= 16 and body + 16 <= len(view):
+            audio_format, channels, sample_rate, _, _, bits = struct.unpack_from('<HHIIHH', view, body)
+            if audio_format == _WAVE_FORMAT_EXTENSIBLE and chunk_size >= 40 and body + 26 <= len(view):
+                # The real format code leads the SubFormat GUID (float data is not PCM)
+                audio_format = struct.unpack_from('<H', view, body + 24)[0]
+            if audio_format not in (_WAVE_FORMAT_PCM, _WAVE_FORMAT_EXTENSIBLE):
+                return None
+            fmt = (sample_rate, channels, bits)
+        elif chunk_id == b'data':
+            if fmt is None:
+                return None
+            # Streaming encoders often write a placeholder size; take whatever is there
+            return fmt, body, None if chunk_size in (0, 0xFFFFFFFF) else chunk_size
+        # Chunks are padded to an even size
+        offset = body + chunk_size + (chunk_size & 1)
+    return None
+
+
+def parse_wav(buffer):
+    """
+    Reads the header of an in-memory PCM WAV file without copying its samples.
+
+    Args:
+        buffer (bytes | bytearray | memoryview): Complete WAV file contents
+
+    Returns:
+        WavAudio: Format fields and a memoryview of the sample data, or None if
+        the buffer is not an uncompressed PCM WAV file
+    """
+    view = memoryview(buffer).cast('B')
+    layout = _wav_layout(view)
+    if layout is None:
+        return None
+    (sample_rate, channels, bits), body, size = layout
+    end = len(view) if size is None else min(len(view), body + size)
+    return WavAudio(sample_rate, channels, bits, view[body:end])
+
+
+class PcmConverter:
+    """
+    Converts integer PCM (8/16/24/32-bit, any rate and channel count) to 16kHz mono
+    16-bit in process, as a cheaper alternative to an ffmpeg subprocess.
+
+    Channels are averaged. Other sample rates are resampled with a Kaiser-windowed
+    sinc filter whose stopband starts at half the lower of the two rates (60 dB), so
+    content above the target Nyquist frequency is removed rather than aliased. The
+    filter is evaluated as a polyphase table built once per converter, and output
+    positions are tracked as exact integer ratios, so the output does not depend on
+    how the input is split into chunks.
+    """
+
+    # Stopband attenuation in dB, and the transition band as a share of the lower Nyquist frequency
+    STOPBAND_DB = 60.0
+    TRANSITION = 0.15
+
+    def __init__(self, sample_rate, channels=1, sample_width=2, target_rate=SPEECH_SAMPLE_RATE):
+        """
+        Args:
+            sample_rate (int): Input samples per second
+            channels (int): Interleaved input channels
+            sample_width (int): Bytes per input sample (1 is unsigned, as in WAV)
+            target_rate (int): Output samples per second
+        """
+        if sample_width not in (1, 2, 3, 4) or channels < 1 or sample_rate <= 0:
+            raise ValueError(f"Unsupported PCM layout: {sample_rate}Hz, {channels}ch, {sample_width * 8}-bit")
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.target_rate = target_rate
+        self.frame_bytes = sample_width * channels
+        self._pending = b''
+
+        self.resampling = sample_rate != target_rate
+        if self.resampling:
+            self._half, self._table, self._phase_step = self._design_filter()
+            # Source samples not yet fully used, starting at absolute index _start (zero history before 0)
+            self._buffer = np.zeros(self._half, dtype=np.float32)
+            self._start = -self._half
+            self._received = 0
+            self._produced = 0
+
+    def _design_filter(self):
+        """Builds the polyphase table: one row of taps per distinct fractional output position."""
+        nyquist = min(self.sample_rate, self.target_rate) / 2.0
+        transition = self.TRANSITION * nyquist
+        cutoff = (nyquist - transition / 2.0) / self.sample_rate
+        width = transition / self.sample_rate
+        beta = 0.1102 * (self.STOPBAND_DB - 8.7)
+        half = int(np.ceil((self.STOPBAND_DB - 8.0) / (2.285 * 2.0 * np.pi * width) / 2.0))
+
+        # Output k sits at source position k * sample_rate / target_rate; its fractional part
+        # is a multiple of gcd / target_rate, so there are target_rate / gcd distinct phases
+        phase_step = math.gcd(self.sample_rate, self.target_rate)
+        fractions = np.arange(self.target_rate // phase_step) * phase_step / float(self.target_rate)
+        offsets = np.arange(-half + 1, half + 1)
+        t = fractions[:, None] - offsets[None, :]
+        window = np.i0(beta * np.sqrt(np.clip(1.0 - (t / half) ** 2, 0.0, 1.0))) / np.i0(beta)
+        table = 2.0 * cutoff * np.sinc(2.0 * cutoff * t) * window
+        # Unity gain at DC for every phase
+        table /= table.sum(axis=1, keepdims=True)
+        return half, table.astype(np.float32), phase_step
+
+    @property
+    def passthrough(self):
+        return (self.sample_rate, self.channels, self.sample_width) == (self.target_rate, 1, 2)
+
+    def _samples(self, data):
+        """Decodes complete frames to a float32 array in the 16-bit range, one value per channel."""
+        if self.sample_width == 1:
+            return (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0) * 256.0
+        if self.sample_width == 2:
+            return np.frombuffer(data, dtype='<i2').astype(np.float32)
+        if self.sample_width == 3:
+            raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+            # Assemble into the top 24 bits so the sign comes along, then scale down
+            return ((raw[:, 0] << 8) | (raw[:, 1] << 16) | (raw[:, 2] << 24)).astype(np.float32) / 65536.0
+        return np.frombuffer(data, dtype='<i4').astype(np.float32) / 65536.0
+
+    def _resample(self, limit):
+        """Computes outputs up to (not including) index limit from the buffered source samples."""
+        first = self._produced
+        # Output k needs source samples up to floor(k * rate / target) + half
+        last_available = self._start + len(self._buffer) - 1 - self._half
+        count = min(limit, ((last_available + 1) * self.target_rate - 1) // self.sample_rate + 1) - first
+        if count <= 0:
+            return np.zeros(0, dtype=np.float32)
+        positions = np.arange(first, first + count, dtype=np.int64) * self.sample_rate
+        base = positions // self.target_rate - self._start
+        phases = (positions % self.target_rate) // self._phase_step
+        taps = self._table[phases]
+        out = np.zeros(count, dtype=np.float32)
+        # Accumulate tap by tap so every output is summed in the same order regardless of chunking
+        for j in range(taps.shape[1]):
+            out += self._buffer[base + (j - self._half + 1)] * taps[:, j]
+        self._produced += count
+
+        # Drop source samples no later output needs
+        needed = (self._produced * self.sample_rate) // self.target_rate - self._half + 1
+        drop = min(max(0, needed - self._start), len(self._buffer))
+        self._buffer = self._buffer[drop:]
+        self._start += drop
+        return out
+
+    @staticmethod
+    def _to_pcm(samples):
+        return np.clip(np.rint(samples), -32768, 32767).astype('<i2').tobytes()
+
+    def convert(self, chunk):
+        """
+        Args:
+            chunk (bytes-like): Interleaved input PCM (need not end on a frame boundary)
+
+        Returns:
+            bytes: 16-bit mono PCM at target_rate
+        """
+        data = self._pending + bytes(chunk) if self._pending else memoryview(chunk).cast('B')
+        usable = len(data) - len(data) % self.frame_bytes
+        self._pending = bytes(data[usable:])
+        if not usable:
+            return b''
+        if self.passthrough:
+            return bytes(data[:usable])
+
+        mono = self._samples(data[:usable])
+        if self.channels > 1:
+            mono = mono.reshape(-1, self.channels).mean(axis=1)
+        if not self.resampling:
+            return self._to_pcm(mono)
+
+        self._buffer = np.concatenate((self._buffer, mono))
+        self._received += len(mono)
+        return self._to_pcm(self._resample(self._expected_outputs()))
+
+    def _expected_outputs(self):
+        return -(-self._received * self.target_rate // self.sample_rate)
+
+    def flush(self):
+        """Returns the output still held back by the filter delay once the input has ended."""
+        if not self.resampling or not self._received:
+            return b''
+        self._buffer = np.concatenate((self._buffer, np.zeros(self._half, dtype=np.float32)))
+        return self._to_pcm(self._resample(self._expected_outputs()))
+
+
+def decode_upload(stream, read_size=64 * 1024, command=None, run=None):
+    """
+    Returns 16kHz mono 16-bit PCM for an uploaded audio file, choosing the cheapest decoder.
+
+    The first read is sniffed for a RIFF/WAVE header:
+      - 16kHz mono 16-bit WAV: the samples pass straight through ('passthrough')
+      - other integer PCM WAV (rates, stereo, 8/24/32-bit): converted in process ('convert')
+      - anything else, e.g. compressed containers: decoded by ffmpeg ('ffmpeg')
+
+    Args:
+        stream: Readable binary file object positioned at the start of the upload
+        read_size (int): Bytes read per chunk
+        command (list, optional): Overrides the ffmpeg command line (see transcode_stream)
+        run (callable, optional): run(fn, *args) used for in-process conversion (e.g., on a
+            thread pool, see TranscodeExecutor); conversion runs inline if not given
+
+    Returns:
+        tuple: (decoder name, lazy iterable of PCM chunks)
+    """
+    head = stream.read(read_size)
+    rest = iter(lambda: stream.read(read_size), b'')
+    layout = _wav_layout(memoryview(head).cast('B'))
+    if layout is None:
+        return 'ffmpeg', transcode_stream(itertools.chain([head], rest), command=command)
+
+    (sample_rate, channels, bits), body, size = layout
+    try:
+        converter = PcmConverter(sample_rate, channels, bits // 8)
+    except ValueError:
+        return 'ffmpeg', transcode_stream(itertools.chain([head], rest), command=command)
+
+    def _data_chunks():
+        remaining = size
+        for chunk in itertools.chain([head[body:]], rest):
+            if remaining is not None:
+                # Ignore chunks that follow the samples (e.g., trailing LIST metadata)
+                chunk = chunk[:remaining]
+                remaining -= len(chunk)
+            if chunk:
+                yield chunk
+            if remaining == 0:
+                return
+
+    if converter.passthrough:
+        return 'passthrough', _data_chunks()
+    def _converted():
+        call = run or (lambda fn, *args: fn(*args))
+        for chunk in _data_chunks():
+            pcm = call(converter.convert, chunk)
+            if pcm:
+                yield pcm
+        tail = converter.flush()
+        if tail:
+            yield tail
+
+    return 'convert', _converted()
+
+
+def frame_activity(pcm, sample_rate=SPEECH_SAMPLE_RATE, frame_ms=20, energy_threshold_db=-45.0, zcr_threshold=0.25):
+    """
+    Classifies 16-bit mono PCM frames as speech or silence.
+
+    A frame is speech if its RMS level is above energy_threshold_db (dBFS), or
+    if it is within 10 dB of the threshold and has a zero-crossing rate above
+    zcr_threshold (quiet unvoiced sounds such as "s" and "f").
+
+    Args:
+        pcm (bytes | bytearray | memoryview): 16-bit little-endian mono samples
+        sample_rate (int): Samples per second
+        frame_ms (int): Frame length in milliseconds
+
+    Returns:
+        numpy.ndarray: One bool per complete frame (trailing partial frames are ignored)
+    """
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    samples = np.frombuffer(pcm, dtype='<i2', count=len(pcm) // 2)
+    frame_count = len(samples) // frame_len
+    if not frame_count:
+        return np.zeros(0, dtype=bool)
+    frames = samples[:frame_count * frame_len].reshape(frame_count, frame_len).astype(np.float32)
+
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    level_db = 20.0 * np.log10(np.maximum(rms, 1.0) / 32768.0)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / float(frame_len - 1 or 1)
+
+    return (level_db > energy_threshold_db) | ((level_db > energy_threshold_db - 10.0) & (zcr > zcr_threshold))
+
+
+class VoiceActivityDetector:
+    """
+    Per-session voice activity detection for 16kHz mono 16-bit PCM.
+
+    is_speech() decides whether a whole chunk is worth recognizing. filter()
+    is for continuous streams: it keeps speech and the first max_silence_ms of
+    every pause, and drops the rest of the pause. That silence is kept on
+    purpose: it keeps word endings intact, and the recognizer needs it to
+    detect the end of an utterance.
+    """
+
+    # Process-wide totals across all detectors, for monitoring
+    _totals = {'frames': 0, 'speech_frames': 0, 'dropped_frames': 0, 'chunks_skipped': 0}
+    _totals_lock = threading.Lock()
+
+    def __init__(self, sample_rate=SPEECH_SAMPLE_RATE, frame_ms=20, energy_threshold_db=-45.0,
+                 zcr_threshold=0.25, max_silence_ms=600):
+        """
+        Args:
+            sample_rate (int): Samples per second of the PCM input
+            frame_ms (int): Analysis frame length in milliseconds
+            energy_threshold_db (float): RMS level (dBFS) above which a frame is speech
+            zcr_threshold (float): Zero-crossing rate marking quiet unvoiced speech
+            max_silence_ms (int): Silence kept at the start of each pause in filter()
+        """
+        self.sample_rate = int(sample_rate)
+        self.frame_ms = max(1, int(frame_ms))
+        self.energy_threshold_db = float(energy_threshold_db)
+        self.zcr_threshold = float(zcr_threshold)
+        self.frame_bytes = max(1, int(self.sample_rate * self.frame_ms / 1000)) * 2
+        self.max_silence_frames = max(0, int(max_silence_ms)) // self.frame_ms
+
+        self._pending = b''
+        self._silent_run = self.max_silence_frames  # the stream starts in a pause
+
+        self.frames = 0
+        self.speech_frames = 0
+        self.dropped_frames = 0
+        self.chunks_skipped = 0
+
+    # Bounds for client-supplied settings, so a session cannot make filter() hold back unbounded audio
+    FRAME_MS_RANGE = (20, 500)
+    MAX_SILENCE_MS_RANGE = (0, 5000)
+
+    @classmethod
+    def from_options(cls, options, defaults=None):
+        """
+        Builds a detector from config defaults overridden by per-session options.
+
+        frame_ms and max_silence_ms are clamped to FRAME_MS_RANGE and MAX_SILENCE_MS_RANGE.
+        The sample rate is not a client option: the pipeline always produces 16kHz PCM.
+        """
+        settings = dict(defaults or {})
+        for key, value in (options or {}).items():
+            if key in ('frame_ms', 'energy_threshold_db', 'zcr_threshold', 'max_silence_ms'):
+                settings[key] = value
+        for key, (low, high) in (('frame_ms', cls.FRAME_MS_RANGE), ('max_silence_ms', cls.MAX_SILENCE_MS_RANGE)):
+            if key in settings:
+                settings[key] = min(high, max(low, int(settings[key])))
+        return cls(**settings)
+
+    def _classify(self, pcm):
+        return frame_activity(pcm, self.sample_rate, self.frame_ms, self.energy_threshold_db, self.zcr_threshold)
+
+    def _count(self, frames, speech, dropped, skipped=0):
+        self.frames += frames
+        self.speech_frames += speech
+        self.dropped_frames += dropped
+        self.chunks_skipped += skipped
+        with self._totals_lock:
+            totals = VoiceActivityDetector._totals
+            totals['frames'] += frames
+            totals['speech_frames'] += speech
+            totals['dropped_frames'] += dropped
+            totals['chunks_skipped'] += skipped
+
+    def is_speech(self, pcm):
+        """True if any frame of a complete chunk is speech; silent chunks are counted as dropped."""
+        activity = self._classify(pcm)
+        speech = int(np.count_nonzero(activity))
+        if speech:
+            self._count(len(activity), speech, 0)
+            return True
+        self._count(len(activity), 0, len(activity), skipped=1)
+        return False
+
+    def filter(self, pcm):
+        """
+        Returns the part of a streamed PCM chunk worth sending to the recognizer.
+
+        Partial frames are held back until the next call, so chunk boundaries
+        do not need to line up with frames. If everything is kept the result is
+        a view of the input rather than a copy.
+        """
+        # Buffers (e.g., memoryviews of binary socket frames) are only copied to join a held-back partial frame
+        data = self._pending + pcm if self._pending else memoryview(pcm).cast('B')
+        usable = len(data) - len(data) % self.frame_bytes
+        self._pending = bytes(data[usable:])
+        if not usable:
+            return b''
+
+        activity = self._classify(memoryview(data)[:usable])
+        # Length of the silent run each frame is in (0 for speech), continuing from the last chunk
+        index = np.arange(len(activity))
+        last_speech = np.maximum.accumulate(np.where(activity, index, -1))
+        silent_run = np.where(last_speech >= 0, index - last_speech, self._silent_run + index + 1)
+        keep = silent_run <= self.max_silence_frames
+        self._silent_run = int(silent_run[-1])
+
+        speech = int(np.count_nonzero(activity))
+        kept = int(np.count_nonzero(keep))
+        self._count(len(activity), speech, len(activity) - kept)
+        if kept == len(activity):
+            return data[:usable]
+        frames = np.frombuffer(data, dtype=np.uint8, count=usable).reshape(len(activity), self.frame_bytes)
+        return frames[keep].tobytes()
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'speech_frames': self.speech_frames,
+            'dropped_frames': self.dropped_frames,
+            'dropped_ms': self.dropped_frames * self.frame_ms,
+            'chunks_skipped': self.chunks_skipped,
+            'drop_rate': round(self.dropped_frames / self.frames, 4) if self.frames else 0.0,
+        }
+
+    @classmethod
+    def total_stats(cls):
+        with cls._totals_lock:
+            totals = dict(cls._totals)
+        totals['drop_rate'] = round(totals['dropped_frames'] / totals['frames'], 4) if totals['frames'] else 0.0
+        return totals
+
+
+def _pause_cut(activity, min_silence_frames):
+    """
+    Picks where to end a segment: the middle of the last pause of at least
+    min_silence_frames, else the middle of the longest pause ending in the
+    second half, else the end of the window.
+    """
+    index = np.arange(len(activity))
+    last_speech = np.maximum.accumulate(np.where(activity, index, -1))
+    # Length of the silent run ending at each frame (0 for speech frames)
+    run = index - last_speech
+    ends = np.flatnonzero(~activity & np.append(activity[1:], True))
+    if not len(ends):
+        return len(activity)
+    long_ends = ends[run[ends] >= min_silence_frames]
+    if len(long_ends):
+        end = long_ends[-1]
+    else:
+        late_ends = ends[ends >= len(activity) // 2]
+        if not len(late_ends):
+            return len(activity)
+        end = late_ends[np.argmax(run[late_ends])]
+    return max(1, int(end - run[end] + 1 + run[end] // 2))
+
+
+def split_at_silence(pcm_chunks, sample_rate=SPEECH_SAMPLE_RATE, max_segment_ms=30000, min_silence_ms=300,
+                     frame_ms=20, energy_threshold_db=-45.0, zcr_threshold=0.25):
+    """
+    Splits streamed 16-bit mono PCM into segments of at most max_segment_ms, cut inside pauses.
+
+    Each time max_segment_ms of audio is buffered, the segment ends in the middle of
+    its last pause of at least min_silence_ms, so words are not cut in half. Segments
+    without any speech are dropped (they still advance the offsets of later ones).
+
+    Args:
+        pcm_chunks (iterable): bytes-like PCM chunks (e.g., from transcode_stream)
+        sample_rate (int): Samples per second
+        max_segment_ms (int): Upper bound on segment length
+        min_silence_ms (int): Shortest pause preferred as a cut point
+        frame_ms, energy_threshold_db, zcr_threshold: Speech detection settings (see frame_activity)
+
+    Yields:
+        tuple: (offset_ms, pcm) per segment, in order; pcm is a memoryview of bytes
+    """
+    frame_bytes = max(1, int(sample_rate * frame_ms / 1000)) * SPEECH_SAMPLE_WIDTH
+    window_bytes = max(1, max_segment_ms // frame_ms) * frame_bytes
+    min_silence_frames = max(1, min_silence_ms // frame_ms)
+    buffer = bytearray()
+    offset_frames = 0
+
+    def _take(final):
+        nonlocal offset_frames
+        window = bytes(buffer[:window_bytes])
+        activity = frame_activity(window, sample_rate, frame_ms, energy_threshold_db, zcr_threshold)
+        cut = len(activity) if final else _pause_cut(activity, min_silence_frames)
+        cut_bytes = len(window) if final else cut * frame_bytes
+        del buffer[:cut_bytes]
+        segment = (offset_frames * frame_ms, memoryview(window)[:cut_bytes])
+        offset_frames += cut
+        return segment if activity[:cut].any() else None
+
+    for chunk in pcm_chunks:
+        buffer += chunk
+        while len(buffer) >= window_bytes:
+            segment = _take(final=False)
+            if segment:
+                yield segment
+    if buffer:
+        segment = _take(final=True)
+        if segment:
+            yield segment
+
+
+def decode_audio_payload(value):
+    """
+    Returns the audio carried by a socket message as a buffer.
+
+    Binary Socket.IO attachments (bytes) are wrapped in a memoryview and passed
+    on without copying; base64 strings from older clients are decoded.
+    """
+    if not value:
+        return None
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return memoryview(value).cast('B')
+    return base64.b64decode(value)
+
+
+def benchmark_audio_encodings(seconds=60, chunk_ms=100, sample_rate=16000):
+    """
+    Compares base64 text frames with binary Socket.IO attachments for audio chunks.
+
+    Builds the Socket.IO packets a client would send for `seconds` of 16-bit
+    mono PCM, then times the server side of each encoding (packet decode,
+    attachment reassembly, payload decoding and the VAD) with process CPU time:
+        benchmark_audio_encodings(seconds=300)
+
+    Returns:
+        dict: Per encoding, wire bytes per second of audio and CPU ms per minute of audio
+    """
+    from socketio import packet
+
+    chunk_samples = sample_rate * chunk_ms // 1000
+    rng = np.random.default_rng(0)
+    pcm = (rng.standard_normal(sample_rate * seconds) * 3000).astype('<i2').tobytes()
+    chunks = [pcm[i:i + chunk_samples * 2] for i in range(0, len(pcm), chunk_samples * 2)]
+
+    results = {}
+    for encoding in ('base64', 'binary'):
+        encoded = []
+        for chunk in chunks:
+            audio = base64.b64encode(chunk).decode('ascii') if encoding == 'base64' else chunk
+            frames = packet.Packet(packet.EVENT, data=['realtime_audio_chunk', {'audio_data': audio}]).encode()
+            encoded.append(frames if isinstance(frames, list) else [frames])
+        wire_bytes = sum(len(frame) for frames in encoded for frame in frames)
+
+        vad = VoiceActivityDetector(sample_rate=sample_rate)
+        started = time.process_time()
+        for frames in encoded:
+            pkt = packet.Packet(encoded_packet=frames[0])
+            for attachment in frames[1:]:
+                pkt.add_attachment(attachment)
+            vad.filter(decode_audio_payload(pkt.data[1]['audio_data']))
+        cpu_seconds = time.process_time() - started
+
+        results[encoding] = {
+            'wire_bytes_per_second': round(wire_bytes / seconds),
+            'cpu_ms_per_audio_minute': round(cpu_seconds * 1000 * 60 / seconds, 2),
+        }
+    return results
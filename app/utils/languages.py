@@ -0,0 +1,133 @@
+"""
+Language registry shared by translation, speech and TTS.
+
+Maps any supported language code, locale or English name (e.g. 'lv', 'lv-LV',
+'Latvian') to the codes each provider expects. The tables are built once at
+import time and lookups are memoized, so resolving a language on the hot
+translation path is a single dict/cache hit.
+"""
+from collections import namedtuple
+from functools import lru_cache
+from types import MappingProxyType
+
+Language = namedtuple('Language', [
+    'code',           # canonical lowercase code, e.g. 'en-gb' or 'lv'
+    'name',           # English name, lowercase
+    'deepl_source',   # DeepL source_lang (base codes only)
+    'deepl_target',   # DeepL target_lang
+    'azure_locale',   # Azure speech recognition locale
+    'voice',          # default Azure neural voice
+])
+
+DEFAULT_VOICE = 'en-US-JennyNeural'
+
+LANGUAGES = (
+    Language('en', 'english', 'EN', 'EN-US', 'en-US', 'en-US-JennyNeural'),
+    Language('en-us', 'american english', 'EN', 'EN-US', 'en-US', 'en-US-JennyNeural'),
+    Language('en-gb', 'british english', 'EN', 'EN-GB', 'en-GB', 'en-GB-SoniaNeural'),
+    Language('de', 'german', 'DE', 'DE', 'de-DE', 'de-DE-KatjaNeural'),
+    Language('fr', 'french', 'FR', 'FR', 'fr-FR', 'fr-FR-DeniseNeural'),
+    Language('es', 'spanish', 'ES', 'ES', 'es-ES', 'es-ES-ElviraNeural'),
+    Language('it', 'italian', 'IT', 'IT', 'it-IT', 'it-IT-ElsaNeural'),
+    Language('nl', 'dutch', 'NL', 'NL', 'nl-NL', 'nl-NL-ColetteNeural'),
+    Language('pl', 'polish', 'PL', 'PL', 'pl-PL', 'pl-PL-AgnieszkaNeural'),
+    Language('pt', 'portuguese', 'PT', 'PT-PT', 'pt-PT', 'pt-PT-RaquelNeural'),
+    Language('pt-pt', 'european portuguese', 'PT', 'PT-PT', 'pt-PT', 'pt-PT-RaquelNeural'),
+    Language('pt-br', 'brazilian portuguese', 'PT', 'PT-BR', 'pt-BR', 'pt-BR-FranciscaNeural'),
+    Language('ru', 'russian', 'RU', 'RU', 'ru-RU', 'ru-RU-SvetlanaNeural'),
+    Language('ja', 'japanese', 'JA', 'JA', 'ja-JP', 'ja-JP-NanamiNeural'),
+    Language('zh', 'chinese', 'ZH', 'ZH', 'zh-CN', 'zh-CN-XiaoxiaoNeural'),
+    Language('lv', 'latvian', 'LV', 'LV', 'lv-LV', 'lv-LV-EveritaNeural'),
+    Language('lt', 'lithuanian', 'LT', 'LT', 'lt-LT', 'lt-LT-OnaNeural'),
+    Language('bg', 'bulgarian', 'BG', 'BG', 'bg-BG', 'bg-BG-KalinaNeural'),
+    Language('cs', 'czech', 'CS', 'CS', 'cs-CZ', 'cs-CZ-VlastaNeural'),
+    Language('da', 'danish', 'DA', 'DA', 'da-DK', 'da-DK-ChristelNeural'),
+    Language('el', 'greek', 'EL', 'EL', 'el-GR', 'el-GR-AthinaNeural'),
+    Language('et', 'estonian', 'ET', 'ET', 'et-EE', 'et-EE-AnuNeural'),
+    Language('fi', 'finnish', 'FI', 'FI', 'fi-FI', 'fi-FI-NooraNeural'),
+    Language('hu', 'hungarian', 'HU', 'HU', 'hu-HU', 'hu-HU-NoemiNeural'),
+    Language('id', 'indonesian', 'ID', 'ID', 'id-ID', 'id-ID-GadisNeural'),
+    Language('ko', 'korean', 'KO', 'KO', 'ko-KR', 'ko-KR-SunHiNeural'),
+    Language('nb', 'norwegian', 'NB', 'NB', 'nb-NO', 'nb-NO-IselinNeural'),
+    Language('ro', 'romanian', 'RO', 'RO', 'ro-RO', 'ro-RO-AlinaNeural'),
+    Language('sk', 'slovak', 'SK', 'SK', 'sk-SK', 'sk-SK-ViktoriaNeural'),
+    Language('sl', 'slovenian', 'SL', 'SL', 'sl-SI', 'sl-SI-PetraNeural'),
+    Language('sv', 'swedish', 'SV', 'SV', 'sv-SE', 'sv-SE-SofieNeural'),
+    Language('tr', 'turkish', 'TR', 'TR', 'tr-TR', 'tr-TR-EmelNeural'),
+    Language('uk', 'ukrainian', 'UK', 'UK', 'uk-UA', 'uk-UA-PolinaNeural'),
+)
+
+# Extra spellings that should resolve to a registered language
+_ALIASES = {
+    'no': 'nb',
+    'nb-no': 'nb',
+    'zh-cn': 'zh',
+    'zh-hans': 'zh',
+}
+
+
+def _build_index():
+    index = {}
+    for language in LANGUAGES:
+        # Canonical codes always win; names and locales only fill gaps
+        index[language.code] = language
+    for language in LANGUAGES:
+        index.setdefault(language.name, language)
+        index.setdefault(language.azure_locale.lower(), language)
+    for alias, code in _ALIASES.items():
+        index.setdefault(alias, index[code])
+    return MappingProxyType(index)
+
+
+_INDEX = _build_index()
+
+
+@lru_cache(maxsize=1024)
+def resolve_language(code_or_name):
+    """
+    Resolves a language code, locale or English name to its registry entry.
+
+    Falls back to the base language of a regional code ('lv-XX' -> 'lv').
+    Returns None for unknown languages.
+    """
+    if not code_or_name or not isinstance(code_or_name, str):
+        return None
+    normalized = code_or_name.strip().lower().replace('_', '-')
+    language = _INDEX.get(normalized)
+    if language is None and '-' in normalized:
+        language = _INDEX.get(normalized.split('-')[0])
+    return language
+
+
+@lru_cache(maxsize=1024)
+def deepl_source_code(code_or_name):
+    """DeepL source_lang for the input (base code only), or None for auto-detect."""
+    if not code_or_name or code_or_name == 'auto':
+        return None
+    language = resolve_language(code_or_name)
+    if language:
+        return language.deepl_source
+    return code_or_name.strip().split('-')[0].upper()
+
+
+@lru_cache(maxsize=1024)
+def deepl_target_code(code_or_name):
+    """DeepL target_lang for the input, or None if no code was given."""
+    if not code_or_name:
+        return None
+    language = resolve_language(code_or_name)
+    if language:
+        return language.deepl_target
+    return code_or_name.strip().split('-')[0].upper()
+
+
+def azure_locale(code_or_name, default=None):
+    """Azure speech locale (e.g. 'lv-LV') for the input."""
+    language = resolve_language(code_or_name)
+    return language.azure_locale if language else default
+
+
+def default_voice(code_or_name, default=DEFAULT_VOICE):
+    """Default Azure neural voice for the input."""
+    language = resolve_language(code_or_name)
+    return language.voice if language else default
@@ -0,0 +1,62 @@
+import re
+
+# End of a sentence: terminal punctuation (plus closing quotes/brackets) followed by
+# whitespace, or CJK full-width terminators which are not followed by spaces
+_SENTENCE_BOUNDARY = re.compile(r'[.!?…]+["”’)\]]*\s+|[。！？]+\s*')
+
+
+def split_sentences(text, max_chars=2000):
+    """
+    Splits text into sentence segments for independent translation.
+
+    Args:
+        text (str): Text to split
+        max_chars (int): Sentences longer than this are further split on whitespace
+
+    Returns:
+        list: (segment, separator) tuples where separator is the whitespace that
+        followed the segment; ''.join(seg + sep) reproduces the input
+    """
+    if not text:
+        return []
+
+    pieces = []
+    start = 0
+    for match in _SENTENCE_BOUNDARY.finditer(text):
+        pieces.append(text[start:match.end()])
+        start = match.end()
+    if start < len(text):
+        pieces.append(text[start:])
+
+    segments = []
+    for piece in pieces:
+        core = piece.rstrip()
+        separator = piece[len(core):]
+        if not core:
+            # Whitespace-only piece: attach it to the previous separator
+            if segments:
+                segments[-1] = (segments[-1][0], segments[-1][1] + separator)
+            else:
+                segments.append(("", separator))
+            continue
+        segments.extend(_wrap_long(core, separator, max_chars))
+    return segments
+
+
+def _wrap_long(sentence, separator, max_chars):
+    """Splits an over-long sentence on whitespace into chunks of at most max_chars."""
+    if len(sentence) <= max_chars:
+        return [(sentence, separator)]
+    chunks = []
+    start = 0
+    while len(sentence) - start > max_chars:
+        cut = sentence.rfind(' ', start, start + max_chars)
+        if cut <= start:
+            cut = start + max_chars  # No whitespace to break on
+            chunks.append((sentence[start:cut], ""))
+            start = cut
+        else:
+            chunks.append((sentence[start:cut], " "))
+            start = cut + 1
+    chunks.append((sentence[start:], separator))
+    return chunks
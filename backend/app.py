@@ -5,6 +5,7 @@ import tempfile
 from app.services.speech_service import SpeechService
 from app.services.firebase_service import FirebaseService
 from app.services.translation_service import TranslationService
+from app.utils.languages import default_voice
 
 app = Flask(__name__)
 CORS(app)
@@ -86,19 +87,8 @@ def synthesize_speech():
     text = data['text']
     language = data.get('language', 'en')
     
-    # Map language code to voice name
-    voice_map = {
-        'en': 'en-US-JennyNeural',
-        'fr': 'fr-FR-DeniseNeural',
-        'es': 'es-ES-ElviraNeural',
-        'de': 'de-DE-KatjaNeural',
-        'lv': 'lv-LV-EveritaNeural',
-        'lt': 'lt-LT-OnaNeural',
-        'et': 'et-EE-AnuNeural',
-        'ru': 'ru-RU-SvetlanaNeural'
-    }
-    
-    voice = voice_map.get(language, 'en-US-JennyNeural')
+    # Map language code to voice name via the shared language registry
+    voice = default_voice(language)
     
     # Create a temporary file for the audio output
     with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_file: